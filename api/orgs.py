@@ -6,6 +6,10 @@ from datetime import datetime
 
 from db import orgs_collection, users_collection, org_licenses_collection
 from core.auth import get_current_user
+from core.org_scheduling import LICENSE_TIERS
+
+# Licence tiers set the org's share of processing workers (core/org_scheduling.py)
+LICENSE_TIER_PATTERN = "^(" + "|".join(LICENSE_TIERS) + ")$"
 
 router = APIRouter(prefix="/api/orgs", tags=["Orgs"])
 
@@ -20,6 +24,7 @@ class OrgCreate(BaseModel):
     total_video_credits: int = Field(..., gt=0, description="Total video credits for this org")
     admin_email: EmailStr
     admin_name: str
+    license_tier: str = Field("standard", pattern=LICENSE_TIER_PATTERN, description="Processing priority tier")
 
 
 class OrgModel(BaseModel):
@@ -30,6 +35,8 @@ class OrgModel(BaseModel):
     total_video_credits: int
     allocated_users: int = 0
     allocated_video_credits: int = 0
+    license_tier: str = "standard"
+    max_concurrent_jobs: Optional[int] = None
     created_by: Optional[str] = None
     created_at: Optional[datetime] = None
 
@@ -53,6 +60,7 @@ async def create_org(org: OrgCreate, user=Depends(get_current_user)):
         "total_video_credits": org.total_video_credits,
         "allocated_users": 0,
         "allocated_video_credits": 0,
+        "license_tier": org.license_tier,
         "created_by": str(user["email"]),
         "created_at": datetime.utcnow(),
     }
@@ -93,6 +101,8 @@ async def get_org(org_id: str, user=Depends(get_current_user)):
 class OrgUpdateLicense(BaseModel):
     add_users: Optional[int] = Field(0, ge=0, description="Number of additional users to add")
     add_video_credits: Optional[int] = Field(0, ge=0, description="Number of additional video credits to add")
+    license_tier: Optional[str] = Field(None, pattern=LICENSE_TIER_PATTERN, description="Change the processing priority tier")
+    max_concurrent_jobs: Optional[int] = Field(None, ge=0, description="Cap on concurrently running jobs (0 = tier default)")
 
 @router.patch("/{org_id}/license", response_model=OrgModel)
 async def update_org_license(org_id: str, update: OrgUpdateLicense, user=Depends(get_current_user)):
@@ -112,28 +122,28 @@ async def update_org_license(org_id: str, update: OrgUpdateLicense, user=Depends
     new_total_users = org.get("total_users", 0) + update.add_users
     new_total_video_credits = org.get("total_video_credits", 0) + update.add_video_credits
 
-    orgs_collection.update_one(
-        {"_id": oid},
-        {"$set": {
-            "total_users": new_total_users,
-            "total_video_credits": new_total_video_credits
-        }}
-    )
+    changes = {
+        "total_users": new_total_users,
+        "total_video_credits": new_total_video_credits
+    }
+    if update.license_tier is not None:
+        changes["license_tier"] = update.license_tier
+    if update.max_concurrent_jobs is not None:
+        changes["max_concurrent_jobs"] = update.max_concurrent_jobs or None
+    orgs_collection.update_one({"_id": oid}, {"$set": changes})
 
     # Record the purchase
-    if update.add_users > 0 or update.add_video_credits > 0:
+    if update.add_users > 0 or update.add_video_credits > 0 or update.license_tier is not None:
         org_licenses_collection.insert_one({
             "org_id": oid,
             "purchased_by": user["email"],
             "added_users": update.add_users,
             "added_video_credits": update.add_video_credits,
+            "license_tier": update.license_tier,
             "created_at": datetime.utcnow()
         })
 
-    org.update({
-        "total_users": new_total_users,
-        "total_video_credits": new_total_video_credits
-    })
+    org.update(changes)
     org["_id"] = str(org["_id"])
     return OrgModel(**org)
 
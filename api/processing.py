@@ -1,14 +1,82 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks,Depends
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
 from bson import ObjectId
+from bson.errors import InvalidId
 
-from db import videos_collection, users_collection, orgs_collection
-from processors.audio_processor import process_video_audio
-from processors.text_processor import process_video_text
-from processors.visual_processor import process_visual_analysis
+from db import videos_collection, users_collection, orgs_collection, processing_batches_collection
 from settings import settings
 from core.auth import get_current_user
+from core.admission import AdmissionController
+from core.job_queue import COMPLETED, DEAD, LEASED, QUEUED
+from core.org_scheduling import fair_job_queue
+from core.logger import logger
 router = APIRouter()
 
+# Endpoints only enqueue; the embedded consumer (main.py) or workers run the jobs
+job_queue = fair_job_queue()
+
+# Refuses new work with 429 + Retry-After while a modality is overloaded
+admission = AdmissionController(job_queue)
+
+# Bulk reprocessing runs after interactive requests
+BATCH_PRIORITY = -10
+
+MODALITIES = ("audio", "text", "image")
+
+
+def _job_payload(kind: str, video_id: str, video: dict, llm_mode: str = "sync") -> dict:
+    """Keyword arguments of the processor that runs a `kind` job for this video."""
+    s3_url = video["s3_url"]
+    if kind == "audio":
+        return {"video_id": video_id, "s3_bucket": settings.S3_BUCKET_NAME, "s3_key": s3_url.split("/")[-1]}
+    if kind == "text":
+        return {"video_id": video_id, "s3_url": s3_url, "description": video.get("description", ""), "llm_mode": llm_mode}
+    return {"video_id": video_id, "s3_url": s3_url, "description": video.get("description", "")}
+
+
+def admit(kind: str, incoming: int = 1) -> None:
+    """Raise 429 with Retry-After when `incoming` more `kind` jobs are not being admitted right now."""
+    if not settings.ADMISSION_CONTROL:
+        return
+    decision = admission.check(kind, incoming)
+    if not decision["allowed"]:
+        raise HTTPException(
+            status_code=429,
+            detail={"message": decision["reason"], "modality": kind, "retry_after": decision["retry_after"]},
+            headers={"Retry-After": str(decision["retry_after"])},
+        )
+
+
+def _queue_single(kind: str, video: dict, llm_mode: str = "sync", priority: int = 0) -> ObjectId:
+    """Flip one video's status_<kind> to processing and queue its job; undo the flip if queueing fails."""
+    field = f"status_{kind}"
+    # Conditional flip: of two concurrent requests only one matches, the other gets the same 400
+    result = videos_collection.update_one(
+        {"_id": video["_id"], field: {"$nin": ["processing", "completed"]}},
+        {"$set": {field: "processing"}, **({"$unset": {"image_progress": ""}} if kind == "image" else {})}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=400, detail=f"{kind.capitalize()} processing already in progress")
+
+    video_id = str(video["_id"])
+    try:
+        return job_queue.enqueue(
+            kind, _job_payload(kind, video_id, video, llm_mode),
+            priority=priority, video_id=video_id, org_id=video.get("org_id")
+        )
+    except Exception as e:
+        logger.error(f"Could not queue {kind} job for video {video_id}: {e}")
+        previous = video.get(field)
+        restore = {"$set": {field: previous}} if previous is not None else {"$unset": {field: ""}}
+        videos_collection.update_one({"_id": video["_id"], field: "processing"}, restore)
+        raise HTTPException(status_code=503, detail="Could not queue the job, please retry")
+
+
 async def verify_video_access(video_id: str, user: dict):
     """Verify user has access to video - only users can process videos"""
     # ✅ RBAC: Only users can process videos (admins/superadmins manage the system)
@@ -27,7 +95,7 @@ async def verify_video_access(video_id: str, user: dict):
 
 # --- Process audio ---
 @router.post("/{video_id}/process/audio", summary="Trigger audio analysis")
-async def process_audio(video_id: str, background_tasks: BackgroundTasks,user=Depends(get_current_user)):
+async def process_audio(video_id: str, user=Depends(get_current_user)):
     # ✅ RBAC: Verify access
     video = await verify_video_access(video_id, user)
     
@@ -35,22 +103,16 @@ async def process_audio(video_id: str, background_tasks: BackgroundTasks,user=De
     if video.get("status_audio") in ["processing", "completed"]:
         raise HTTPException(status_code=400, detail=f"Audio processing already {video['status_audio']}")
 
-    # Mark as processing
-    videos_collection.update_one(
-        {"_id": ObjectId(video_id)},
-        {"$set": {"status_audio": "processing"}}
-    )
+    admit("audio")
 
-    s3_url = video["s3_url"]
-    s3_key = s3_url.split("/")[-1]
-    background_tasks.add_task(process_video_audio, video_id, settings.S3_BUCKET_NAME, s3_key)
+    job_id = _queue_single("audio", video)
 
-    return {"message": f"Audio processing started for video {video_id}"}
+    return {"message": f"Audio processing queued for video {video_id}", "job_id": str(job_id)}
 
 
 # --- Process text ---
 @router.post("/{video_id}/process/text", summary="Trigger text analysis")
-async def process_text(video_id: str, background_tasks: BackgroundTasks, user=Depends(get_current_user)):
+async def process_text(video_id: str, batch: bool = False, user=Depends(get_current_user)):
     # ✅ RBAC: Verify access
     video = await verify_video_access(video_id, user)
     
@@ -58,22 +120,20 @@ async def process_text(video_id: str, background_tasks: BackgroundTasks, user=De
     if video.get("status_text") in ["processing", "completed"]:
         raise HTTPException(status_code=400, detail=f"Text processing already {video['status_text']}")
 
-    # Mark as processing
-    videos_collection.update_one(
-        {"_id": ObjectId(video_id)},
-        {"$set": {"status_text": "processing"}}
-    )
+    admit("text")
 
-    s3_url = video["s3_url"]
-    description = video.get("description", "")
-    background_tasks.add_task(process_video_text, video_id, s3_url, description)
+    # Bulk reprocessing and low-priority orgs defer the GPT step to the offline batch job
+    org = orgs_collection.find_one({"_id": video.get("org_id")}, {"text_llm_mode": 1}) or {}
+    llm_mode = "batch" if batch or org.get("text_llm_mode") == "batch" else "sync"
+
+    job_id = _queue_single("text", video, llm_mode, priority=BATCH_PRIORITY if batch else 0)
 
-    return {"message": f"Text processing started for video {video_id}"}
+    return {"message": f"Text processing queued for video {video_id}", "job_id": str(job_id)}
 
 
 # --- Process image ---
 @router.post("/{video_id}/process/image", summary="Trigger image analysis")
-async def process_image(video_id: str, background_tasks: BackgroundTasks,user=Depends(get_current_user)):
+async def process_image(video_id: str, user=Depends(get_current_user)):
     # ✅ RBAC: Verify access
     video = await verify_video_access(video_id, user)
     
@@ -81,14 +141,167 @@ async def process_image(video_id: str, background_tasks: BackgroundTasks,user=De
     if video.get("status_image") in ["processing", "completed"]:
         raise HTTPException(status_code=400, detail=f"Image processing already {video['status_image']}")
 
-    # Mark as processing
-    videos_collection.update_one(
-        {"_id": ObjectId(video_id)},
-        {"$set": {"status_image": "processing"}}
-    )
+    admit("image")
 
-    s3_url = video["s3_url"]
-    description = video.get("description", "")
-    background_tasks.add_task(process_visual_analysis, video_id, s3_url, description)
+    # A previous run's progress snapshot is dropped in the same write as the flip
+    job_id = _queue_single("image", video)
+
+    return {"message": f"Image processing queued for video {video_id}", "job_id": str(job_id)}
+
+
+# --- Process many videos ---
+class BatchProcessRequest(BaseModel):
+    video_ids: List[str] = Field(..., min_length=1, description="Videos to process")
+    modalities: List[str] = Field(default_factory=lambda: list(MODALITIES), description="Any of audio, text, image")
+    llm_batch: bool = Field(False, description="Defer the text GPT step to the offline batch job")
+
+
+def _restore_statuses(videos: Dict, plan: Dict, batch_id: ObjectId) -> None:
+    """Undo this batch's status flips (used when its jobs could not be queued)."""
+    ops = []
+    for vid, kinds in plan.items():
+        if not kinds:
+            continue
+        restore, unset = {}, {"processing_batch_id": ""}
+        for kind in kinds:
+            previous = videos[vid].get(f"status_{kind}")
+            if previous is None:
+                unset[f"status_{kind}"] = ""
+            else:
+                restore[f"status_{kind}"] = previous
+        update = {"$set": restore, "$unset": unset} if restore else {"$unset": unset}
+        ops.append(UpdateOne({"_id": vid, "processing_batch_id": batch_id}, update))
+    if ops:
+        videos_collection.bulk_write(ops, ordered=False)
+
+
+@router.post("/process/batch", summary="Trigger analyses for many videos")
+async def process_batch(request: BatchProcessRequest, user=Depends(get_current_user)):
+    # ✅ RBAC: Only users can process videos
+    if user["role"] != "user":
+        raise HTTPException(status_code=403, detail="Only users can process videos. Admins and superadmins manage the system.")
+
+    modalities = list(dict.fromkeys(request.modalities))
+    unknown = [m for m in modalities if m not in MODALITIES]
+    if unknown or not modalities:
+        raise HTTPException(status_code=400, detail=f"Unknown modalities {unknown}; use any of {list(MODALITIES)}")
+    try:
+        video_ids = list(dict.fromkeys(ObjectId(v) for v in request.video_ids))
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid video id")
+    if len(video_ids) > settings.PROCESS_BATCH_MAX_VIDEOS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PROCESS_BATCH_MAX_VIDEOS} videos per batch")
+
+    # One query checks that every video exists and belongs to the user
+    projection = {"user_email": 1, "org_id": 1, "s3_url": 1, "description": 1, **{f"status_{m}": 1 for m in modalities}}
+    videos = {v["_id"]: v for v in videos_collection.find({"_id": {"$in": video_ids}}, projection)}
+    missing = [str(v) for v in video_ids if v not in videos]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Videos not found", "video_ids": missing})
+    foreign = [str(v) for v in video_ids if videos[v]["user_email"] != user["email"]]
+    if foreign:
+        raise HTTPException(status_code=403, detail={"message": "Not authorized to access these videos", "video_ids": foreign})
+
+    # Same rule as the single-video endpoint: batch if asked for, or if the org defers GPT
+    llm_modes = dict.fromkeys(videos, "batch" if request.llm_batch else "sync")
+    if "text" in modalities and not request.llm_batch:
+        org_ids = list({v.get("org_id") for v in videos.values()})
+        batch_orgs = {o["_id"] for o in orgs_collection.find({"_id": {"$in": org_ids}, "text_llm_mode": "batch"}, {"_id": 1})}
+        llm_modes.update({vid: "batch" for vid, v in videos.items() if v.get("org_id") in batch_orgs})
+
+    batch_id = ObjectId()
+    plan, skipped = {}, []
+    for vid in video_ids:
+        plan[vid] = []
+        for kind in modalities:
+            status = videos[vid].get(f"status_{kind}")
+            if status in ("processing", "completed"):
+                skipped.append({"video_id": str(vid), "modality": kind, "status": status})
+            else:
+                plan[vid].append(kind)
+
+    # Checked before any status flips, with every job the batch would add of each modality
+    for kind in modalities:
+        incoming = sum(kind in kinds for kinds in plan.values())
+        if incoming:
+            admit(kind, incoming)
+
+    # One bulk write flips the statuses; each update re-checks them, so a concurrent request wins cleanly.
+    # Flipping image also drops a previous run's image_progress in the same write
+    ops = [
+        UpdateOne(
+            {"_id": vid, **{f"status_{kind}": {"$nin": ["processing", "completed"]} for kind in kinds}},
+            {"$set": {**{f"status_{kind}": "processing" for kind in kinds}, "processing_batch_id": batch_id},
+             **({"$unset": {"image_progress": ""}} if "image" in kinds else {})}
+        )
+        for vid, kinds in plan.items() if kinds
+    ]
+    if ops:
+        result = videos_collection.bulk_write(ops, ordered=False)
+        if result.modified_count != len(ops):
+            flipped = {v["_id"] for v in videos_collection.find(
+                {"_id": {"$in": [vid for vid, kinds in plan.items() if kinds]}, "processing_batch_id": batch_id}, {"_id": 1}
+            )}
+            for vid, kinds in plan.items():
+                if kinds and vid not in flipped:
+                    skipped.extend({"video_id": str(vid), "modality": kind, "status": "processing"} for kind in kinds)
+                    plan[vid] = []
+
+    jobs = [
+        {"kind": kind, "payload": _job_payload(kind, str(vid), videos[vid], llm_modes[vid]),
+         "priority": BATCH_PRIORITY, "video_id": str(vid), "org_id": videos[vid].get("org_id"), "batch_id": batch_id}
+        for vid, kinds in plan.items() for kind in kinds
+    ]
+    try:
+        job_ids = job_queue.enqueue_many(jobs)
+    except Exception as e:
+        logger.error(f"Could not queue batch {batch_id}: {e}")
+        _restore_statuses(videos, plan, batch_id)
+        raise HTTPException(status_code=503, detail="Could not queue the batch, please retry")
+
+    processing_batches_collection.insert_one({
+        "_id": batch_id,
+        "user_email": user["email"],
+        "video_ids": video_ids,
+        "modalities": modalities,
+        "jobs": len(job_ids),
+        "skipped": len(skipped),
+        "created_at": datetime.utcnow(),
+    })
+
+    return {"batch_id": str(batch_id), "jobs_queued": len(job_ids), "skipped": skipped}
+
+
+@router.get("/process/batch/{batch_id}", summary="Progress of a processing batch")
+async def get_batch_progress(batch_id: str, user=Depends(get_current_user)):
+    try:
+        oid = ObjectId(batch_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid batch id")
+
+    batch = processing_batches_collection.find_one({"_id": oid})
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if batch["user_email"] != user["email"]:
+        raise HTTPException(status_code=403, detail="Not authorized to access this batch")
+
+    by_kind = job_queue.stats({"batch_id": oid})
+    totals = Counter()
+    for counts in by_kind.values():
+        totals.update(counts)
+    done = totals[COMPLETED] + totals[DEAD]
 
-    return {"message": f"Image processing started for video {video_id}"}
\ No newline at end of file
+    return {
+        "batch_id": batch_id,
+        "created_at": batch["created_at"].isoformat(),
+        "videos": len(batch["video_ids"]),
+        "modalities": batch["modalities"],
+        "jobs": batch["jobs"],
+        "skipped": batch["skipped"],
+        "queued": totals[QUEUED],
+        "running": totals[LEASED],
+        "completed": totals[COMPLETED],
+        "failed": totals[DEAD],
+        "percent": round(100.0 * done / batch["jobs"], 1) if batch["jobs"] else 100.0,
+        "by_modality": by_kind,
+    }
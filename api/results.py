@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException,Depends
+from fastapi.responses import JSONResponse
 from bson import ObjectId
 
 from db import audio_analysis_collection, text_analysis_collection, image_analysis_collection,videos_collection, users_collection
 from core.auth import get_current_user
+from processors.visual_encoding import decode_visual_insights
 router = APIRouter()
 
 
@@ -83,7 +85,16 @@ async def get_image_results(video_id: str, user=Depends(get_current_user)):
     if status == "pending":
         raise HTTPException(status_code=404, detail="Image analysis not started yet")
     if status == "processing":
-        raise HTTPException(status_code=202, detail="Image analysis still in progress")
+        progress = video.get("image_progress")
+        if not progress:
+            raise HTTPException(status_code=202, detail="Image analysis still in progress")
+        # Partial state: frames done/total, ETA and the averages so far
+        progress = {**progress, "updated_at": progress["updated_at"].isoformat()} if progress.get("updated_at") else progress
+        return JSONResponse(status_code=202, content={
+            "video_id": video_id,
+            "status": "processing",
+            "progress": progress
+        })
     if status == "failed":
         raise HTTPException(status_code=500, detail="Image analysis failed")
 
@@ -93,7 +104,7 @@ async def get_image_results(video_id: str, user=Depends(get_current_user)):
 
     return {
         "video_id": str(result["video_id"]),
-        "visual_insights": result["visual_insights"],
+        "visual_insights": decode_visual_insights(result["visual_insights"]),
         "s3_url": result["s3_url"],
         "description": result["description"]
     }
\ No newline at end of file
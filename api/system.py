@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from core.admission import AdmissionController
+from core.auth import get_current_user
+from core.org_scheduling import fair_job_queue
+from core.rate_limiter import outbound_limiter
+
+router = APIRouter(prefix="/api/system", tags=["System"])
+
+
+@router.get("/rate-limits", summary="Outbound API limiter state for this process")
+async def get_rate_limits(user=Depends(get_current_user)):
+    if user.get("role") != "superadmin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superadmins can view system metrics")
+
+    return {"providers": outbound_limiter.metrics()}
+
+
+@router.get("/job-queue", summary="Job counts, per-org queue wait and admission load")
+async def get_job_queue(hours: float = Query(24, gt=0, description="Queue-wait window"), user=Depends(get_current_user)):
+    if user.get("role") != "superadmin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superadmins can view system metrics")
+
+    queue = fair_job_queue()
+    return {
+        "jobs": queue.stats(),
+        "queue_wait_by_org": queue.wait_stats(since=datetime.utcnow() - timedelta(hours=hours)),
+        "load": AdmissionController(queue, cache_sec=0).snapshot(),
+    }
@@ -0,0 +1,74 @@
+"""
+Speedup of segment-parallel decoding (VisualAnalyzer decode_workers) against
+the single-capture decoder, for increasing worker counts.
+
+Decode dominates when Rekognition is fast, so by default the fake client has
+no latency and every run is decode-bound. Each run is checked against the
+decode_workers=1 run: the insights must be identical.
+
+    python -m benchmarks.decode_scaling --width 1920 --height 1080 --duration 120 --workers 1 2 4 8
+
+Speedup is capped by the cores available to this process (reported as
+usable_cores); worker counts above it only add process start-up cost.
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.synthetic_video import make_synthetic_video
+from local_testing.fake_rekognition import FakeRekognitionClient
+from processors.visual_processor import VisualAnalyzer
+
+
+def _insights(results):
+    return {k: v for k, v in results.items() if k != "processing_stats"}
+
+
+def _run(path, workers, segment_sec, latency, quality_fps):
+    analyzer = VisualAnalyzer(frame_selection_mode="sequential", rekognition_client=FakeRekognitionClient(latency=latency),
+                              decode_workers=workers, decode_segment_sec=segment_sec, quality_fps=quality_fps,
+                              archive_responses=False)
+    started = time.perf_counter()
+    results = analyzer.process_video(path)
+    return results, time.perf_counter() - started
+
+
+def run_benchmark(worker_counts=(1, 2, 4), width=1920, height=1080, fps=30, duration=60.0, segment_sec=20.0,
+                  latency=0.0, quality_fps=None):
+    path = make_synthetic_video(width=width, height=height, fps=fps, duration=duration)
+    rows = []
+    try:
+        baseline, baseline_time = None, None
+        for workers in worker_counts:
+            results, elapsed = _run(path, workers, segment_sec, latency, quality_fps)
+            if baseline is None:
+                baseline, baseline_time = results, elapsed
+            rows.append({
+                "decode_workers": workers,
+                "wall_time_sec": round(elapsed, 3),
+                "speedup": round(baseline_time / elapsed, 2) if elapsed else 0.0,
+                "segments": results["processing_stats"]["decode"].get("segments", 1),
+                "decoded_frames": len(results["quality_timeline"]["time"]),
+                "matches_serial": _insights(results) == _insights(baseline),
+            })
+    finally:
+        os.remove(path)
+    usable = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return {"usable_cores": usable, "video": f"{width}x{height}@{fps}fps/{duration:g}s", "runs": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling of segment-parallel frame decoding with worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--segment-sec", type=float, default=20.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every detect_faces call")
+    parser.add_argument("--quality-fps", type=float, default=None, help="local quality sampling rate (decode load)")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.workers, args.width, args.height, args.fps, args.duration, args.segment_sec,
+                                   args.latency, args.quality_fps), indent=2))
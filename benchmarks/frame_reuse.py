@@ -0,0 +1,95 @@
+"""
+Offline comparison of near-duplicate frame reuse against analysing every frame.
+
+Runs VisualAnalyzer.process_video twice on the same video: once with reuse
+disabled (threshold 0) and once with the given threshold. It reports calls
+saved and the reuse rate, plus how far the reused run drifts from the
+baseline: per-frame mean absolute error of the scored metrics, agreement of
+the dominant emotion, and the change in every overall average.
+
+    python -m benchmarks.frame_reuse --video talk.mp4 --threshold 2.0
+    python -m benchmarks.frame_reuse --fake --static-sec 20 --duration 40
+
+Without --fake this calls the real Rekognition API (two full passes, so
+it is billed). The stub derives responses from the encoded bytes, so with
+--fake the accuracy numbers only exercise the plumbing; use a real video and
+client to judge the threshold.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from benchmarks.synthetic_video import make_synthetic_video
+from local_testing.fake_rekognition import FakeRekognitionClient
+from processors.visual_processor import VisualAnalyzer
+
+PER_FRAME_METRICS = [
+    ("eye_contact_analysis", "eye_contact_confidence"),
+    ("eye_contact_analysis", "eye_stability"),
+    ("posture_analysis", "head_orientation_score"),
+    ("posture_analysis", "posture_stability"),
+    ("facial_expressions", "score"),
+    ("facial_expressions", "nervousness_score"),
+    ("technical_quality", "average_score"),
+]
+
+
+def _analyze(video_path, threshold, fake):
+    client = FakeRekognitionClient() if fake else None
+    analyzer = VisualAnalyzer(frame_selection_mode="sequential", rekognition_client=client,
+                              duplicate_threshold=threshold)
+    return analyzer.process_video(video_path)
+
+
+def compare(baseline, reused):
+    report = {}
+    for section, key in PER_FRAME_METRICS:
+        a = np.array([f["analysis"][key] for f in baseline[section]], dtype=float)
+        b = np.array([f["analysis"][key] for f in reused[section]], dtype=float)
+        report[f"{section}.{key}_mae"] = round(float(np.mean(np.abs(a - b))), 4) if a.size else 0.0
+
+    types_a = [f["analysis"]["type"] for f in baseline["facial_expressions"]]
+    types_b = [f["analysis"]["type"] for f in reused["facial_expressions"]]
+    report["emotion_type_agreement"] = round(float(np.mean([x == y for x, y in zip(types_a, types_b)])), 4) if types_a else 1.0
+
+    averages = {}
+    for key, value in baseline["overall_averages"].items():
+        if isinstance(value, (int, float)):
+            averages[key] = round(reused["overall_averages"][key] - value, 4)
+    report["overall_average_deltas"] = averages
+    return report
+
+
+def run_comparison(video_path=None, threshold=2.0, fake=False, duration=30.0, static_sec=10.0):
+    cleanup = video_path is None
+    if cleanup:
+        video_path = make_synthetic_video(duration=duration, static_sec=static_sec)
+    try:
+        baseline = _analyze(video_path, 0.0, fake)
+        reused = _analyze(video_path, threshold, fake)
+    finally:
+        if cleanup:
+            os.remove(video_path)
+
+    return {
+        "threshold": threshold,
+        "frames": len(baseline["eye_contact_analysis"]),
+        "baseline_calls": baseline["processing_stats"]["rekognition_calls"],
+        "reuse_calls": reused["processing_stats"]["rekognition_calls"],
+        "frame_reuse": reused["processing_stats"]["frame_reuse"],
+        "accuracy": compare(baseline, reused),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the accuracy cost of near-duplicate Rekognition reuse")
+    parser.add_argument("--video", default=None, help="video to analyse (a synthetic clip if omitted)")
+    parser.add_argument("--threshold", type=float, default=2.0, help="mean absolute thumbnail difference, 0-255")
+    parser.add_argument("--fake", action="store_true", help="use the local Rekognition stub instead of AWS")
+    parser.add_argument("--duration", type=float, default=30.0, help="synthetic clip length in seconds")
+    parser.add_argument("--static-sec", type=float, default=10.0, help="frozen intro of the synthetic clip")
+    args = parser.parse_args()
+
+    print(json.dumps(run_comparison(args.video, args.threshold, args.fake, args.duration, args.static_sec), indent=2))
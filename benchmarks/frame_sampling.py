@@ -0,0 +1,88 @@
+"""
+Sampled-frames/sec for VisualAnalyzer's frame sampler on 30 and 60 fps inputs.
+
+Compares the legacy loop (cap.read() on every frame with a list lookup) with
+the grab()-only sampler, forced seeking, and the default policy (grab for
+short gaps, seek for long ones):
+
+    python -m benchmarks.frame_sampling --duration 60 --width 1280 --height 720
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+
+from benchmarks.synthetic_video import make_synthetic_video
+from processors.visual_processor import VisualAnalyzer
+
+
+def _legacy_sample(video_path, target_frames):
+    cap = cv2.VideoCapture(video_path)
+    targets = list(target_frames)
+    frame_id = sampled = 0
+    while cap.isOpened() and targets:
+        ret, _ = cap.read()
+        if not ret:
+            break
+        if frame_id in targets:
+            sampled += 1
+            targets.remove(frame_id)
+        frame_id += 1
+    cap.release()
+    return sampled
+
+
+def _sampler_sample(video_path, target_frames, seek_min_gap_sec=None):
+    analyzer = VisualAnalyzer() if seek_min_gap_sec is None else VisualAnalyzer(seek_min_gap_sec=seek_min_gap_sec)
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    sampled = sum(1 for _ in analyzer._iter_sampled_frames(cap, target_frames, fps))
+    cap.release()
+    return sampled
+
+
+def run_benchmark(fps_values=(30, 60), duration=30.0, width=1280, height=720, sample_every_sec=1.0):
+    report = []
+    for fps in fps_values:
+        path = make_synthetic_video(width=width, height=height, fps=fps, duration=duration)
+        try:
+            total_frames = int(cv2.VideoCapture(path).get(cv2.CAP_PROP_FRAME_COUNT))
+            target_frames = list(range(0, total_frames, max(1, int(fps * sample_every_sec))))
+            strategies = {
+                "legacy_read_all": lambda: _legacy_sample(path, target_frames),
+                "grab_only": lambda: _sampler_sample(path, target_frames, duration + 1.0),
+                "always_seek": lambda: _sampler_sample(path, target_frames, 0.0),
+                "default": lambda: _sampler_sample(path, target_frames),
+            }
+            for name, fn in strategies.items():
+                started = time.perf_counter()
+                sampled = fn()
+                elapsed = time.perf_counter() - started
+                report.append({
+                    "fps": fps,
+                    "resolution": f"{width}x{height}",
+                    "strategy": name,
+                    "sampled_frames": sampled,
+                    "wall_time_sec": round(elapsed, 3),
+                    "sampled_frames_per_sec": round(sampled / elapsed, 2) if elapsed else 0.0,
+                })
+        finally:
+            os.remove(path)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark frame sampling strategies")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--sample-every", type=float, default=1.0, help="seconds between sampled frames")
+    args = parser.parse_args()
+
+    rows = run_benchmark(duration=args.duration, width=args.width, height=args.height, sample_every_sec=args.sample_every)
+    for row in rows:
+        print(f"{row['fps']:>3} fps  {row['strategy']:<16} {row['sampled_frames']:>5} frames  "
+              f"{row['wall_time_sec']:>7.3f}s  {row['sampled_frames_per_sec']:>8.2f} sampled fps")
+    print(json.dumps(rows, indent=2))
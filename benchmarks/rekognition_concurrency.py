@@ -0,0 +1,85 @@
+"""
+Wall time of VisualAnalyzer.process_video against a stubbed Rekognition client
+with injected latency, for increasing in-flight limits.
+
+Every run is checked against the serial run (max_in_flight=1): the per-frame
+results and overall averages must be identical, since scoring stays in
+timestamp order however many requests are outstanding.
+
+    python -m benchmarks.rekognition_concurrency --duration 60 --latency 0.25 --in-flight 1 4 8 16
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.synthetic_video import make_synthetic_video
+from core.rate_limiter import outbound_limiter
+from local_testing.fake_rekognition import FakeRekognitionClient
+from processors.visual_processor import VisualAnalyzer
+from settings import settings
+
+
+def _insights(results):
+    # processing_stats carries timings, which legitimately differ between runs
+    return {k: v for k, v in results.items() if k != "processing_stats"}
+
+
+def _run(video_path, max_in_flight, latency, throttle_rate):
+    client = FakeRekognitionClient(latency=latency, throttle_rate=throttle_rate, seed=7)
+    analyzer = VisualAnalyzer(frame_selection_mode="sequential", max_in_flight=max_in_flight, rekognition_client=client)
+    started = time.perf_counter()
+    results = analyzer.process_video(video_path)
+    return results, time.perf_counter() - started, client.stats
+
+
+def run_benchmark(in_flight_values=(1, 4, 8, 16), duration=30.0, latency=0.25, throttle_rate=0.0,
+                  width=640, height=360):
+    # Keep the shared limiter from capping the stub below the values under test
+    settings.REKOGNITION_MAX_CONCURRENCY = max(settings.REKOGNITION_MAX_CONCURRENCY, max(in_flight_values))
+    settings.REKOGNITION_MAX_RPS = max(settings.REKOGNITION_MAX_RPS, 1000)
+    outbound_limiter.limits["rekognition"] = {
+        "rate": settings.REKOGNITION_MAX_RPS, "concurrency": settings.REKOGNITION_MAX_CONCURRENCY,
+    }
+    outbound_limiter._limiters.clear()
+
+    path = make_synthetic_video(width=width, height=height, fps=30, duration=duration)
+    report = []
+    try:
+        baseline = None
+        for max_in_flight in in_flight_values:
+            results, elapsed, stats = _run(path, max_in_flight, latency, throttle_rate)
+            if baseline is None:
+                baseline = results
+            frames = len(results["eye_contact_analysis"])
+            report.append({
+                "max_in_flight": max_in_flight,
+                "frames": frames,
+                "wall_time_sec": round(elapsed, 3),
+                "frames_per_sec": round(frames / elapsed, 2) if elapsed else 0.0,
+                "observed_max_in_flight": stats["max_in_flight"],
+                "rekognition_calls": stats["calls"],
+                "throttled": stats["throttled"],
+                "avg_bytes_per_call": results["processing_stats"]["avg_bytes_per_call"],
+                "avg_call_latency_ms": results["processing_stats"]["avg_call_latency_ms"],
+                "matches_serial": _insights(results) == _insights(baseline),
+            })
+    finally:
+        os.remove(path)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipelined Rekognition calls in VisualAnalyzer")
+    parser.add_argument("--duration", type=float, default=30.0, help="synthetic video length in seconds")
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds added to every detect_faces call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with ThrottlingException")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    rows = run_benchmark(in_flight_values=args.in_flight, duration=args.duration, latency=args.latency,
+                         throttle_rate=args.throttle_rate)
+    for row in rows:
+        print(f"in_flight={row['max_in_flight']:>3}  {row['frames']:>4} frames  {row['wall_time_sec']:>7.3f}s  "
+              f"{row['frames_per_sec']:>7.2f} fps  matches_serial={row['matches_serial']}")
+    print(json.dumps(rows, indent=2))
@@ -0,0 +1,92 @@
+"""
+Streaming frames from a presigned URL against downloading the object first.
+
+Serves a synthetic video from the local S3 stand-in at a capped bandwidth and
+analyses it through _analyze_downloaded and _analyze_streamed, the two input
+paths process_visual_analysis chooses between. The report gives wall time,
+time to the first decoded frame, temp disk used, bytes read from "S3" and
+whether both paths produced the same insights. A last run cuts the stream's
+connection part way through a ranged GET (the one after --cut-after-ranges,
+at --cut-at of its body; later ranges are refused as expired) and checks that the stream path gives up, so the caller downloads, rather
+than returning an analysis of part of the video.
+
+    python -m benchmarks.streaming_input --duration 60 --bandwidth-mb 8
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.synthetic_video import make_synthetic_video
+from local_testing.fake_rekognition import FakeRekognitionClient
+from local_testing.fake_s3 import FakeS3Client, FakeS3Server
+from processors.visual_processor import _analyze_downloaded, _analyze_streamed
+
+BUCKET, KEY = "bench-bucket", "videos/synthetic.mp4"
+
+
+def _insights(results):
+    return {k: v for k, v in results.items() if k != "processing_stats"}
+
+
+def _run(name, analyze, server, client, analyzer_kwargs):
+    server.reset_stats()
+    started = time.perf_counter()
+    results = analyze(analyzer_kwargs, BUCKET, KEY, s3=client)
+    elapsed = time.perf_counter() - started
+    stats = results["processing_stats"]
+    return results, {
+        "input": name,
+        "wall_time_sec": round(elapsed, 3),
+        "time_to_first_frame_sec": stats["time_to_first_frame_sec"],
+        "temp_disk_bytes": stats["input"]["temp_disk_bytes"],
+        "bytes_read": server.stats["bytes_sent"],
+        "http_requests": server.stats["requests"],
+        "frames": len(results["eye_contact_analysis"]),
+    }
+
+
+def run_benchmark(duration=30.0, bandwidth_mb=8.0, width=1280, height=720, frame_selection_mode="sequential",
+                  cut_after_ranges=2, cut_at=0.5):
+    path = make_synthetic_video(width=width, height=height, fps=30, duration=duration)
+    server = FakeS3Server(bandwidth=bandwidth_mb * 1024 * 1024 if bandwidth_mb else None).start()
+    try:
+        server.put_file(BUCKET, KEY, path)
+        client = FakeS3Client(server)
+        analyzer_kwargs = dict(frame_selection_mode=frame_selection_mode, rekognition_client=FakeRekognitionClient())
+
+        downloaded, download_row = _run("download", _analyze_downloaded, server, client, analyzer_kwargs)
+        streamed, stream_row = _run("stream", _analyze_streamed, server, client, analyzer_kwargs)
+        if streamed is None:
+            raise RuntimeError("this OpenCV build could not open the presigned URL")
+
+        server.reset_stats()
+        server.ranges_served, server.cut_after_ranges, server.cut_fraction = 0, cut_after_ranges, cut_at
+        try:
+            cut = _analyze_streamed(analyzer_kwargs, BUCKET, KEY, s3=client)
+        finally:
+            server.cut_after_ranges = None
+        return {
+            "object_bytes": os.path.getsize(path),
+            "bandwidth_mb_per_sec": bandwidth_mb,
+            "runs": [download_row, stream_row],
+            "results_match": _insights(streamed) == _insights(downloaded),
+            "cut_stream": {"cut_after_ranges": cut_after_ranges, "cut_at": cut_at,
+                           "http_requests": server.stats["requests"], "falls_back_to_download": cut is None},
+        }
+    finally:
+        server.stop()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare streamed and downloaded video input for the visual pipeline")
+    parser.add_argument("--duration", type=float, default=30.0, help="synthetic video length in seconds")
+    parser.add_argument("--bandwidth-mb", type=float, default=8.0, help="fake S3 bandwidth in MB/s (0 = unthrottled)")
+    parser.add_argument("--mode", default="sequential", help="frame_selection_mode to analyse with")
+    parser.add_argument("--cut-after-ranges", type=int, default=2, help="ranged GETs served whole before the cut one")
+    parser.add_argument("--cut-at", type=float, default=0.5, help="fraction of the cut GET's body sent before it drops")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.duration, args.bandwidth_mb, frame_selection_mode=args.mode,
+                                   cut_after_ranges=args.cut_after_ranges, cut_at=args.cut_at), indent=2))
@@ -0,0 +1,54 @@
+"""
+Synthetic talking-head style test videos for the visual benchmarks.
+
+Each frame has a textured, slowly drifting background and a cartoon face
+(skin-tone ellipse, eyes, mouth) that sways and nods, so encoders and decoders
+see realistic motion and the frames are not trivially compressible.
+"""
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+
+def make_synthetic_video(path=None, width=1280, height=720, fps=30, duration=10.0, seed=0, static_sec=0.0):
+    """
+    Write an mp4 (mp4v) to path (a temp file if omitted) and return the path.
+
+    static_sec > 0 freezes the scene for that long at the start, which is
+    useful for exercising near-duplicate frame handling.
+    """
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".mp4", prefix=f"synthetic_{width}x{height}_{fps}fps_")
+        os.close(handle)
+
+    rng = np.random.default_rng(seed)
+    texture = rng.integers(40, 90, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    texture = cv2.resize(texture, (width + 64, height + 64), interpolation=cv2.INTER_LINEAR)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot open VideoWriter for {path}")
+
+    total_frames = int(round(fps * duration))
+    for i in range(total_frames):
+        t = max(0.0, i / fps - static_sec)
+        dx = int(32 + 24 * np.sin(t * 0.7))
+        dy = int(32 + 24 * np.cos(t * 0.5))
+        frame = texture[dy:dy + height, dx:dx + width].copy()
+
+        cx = int(width / 2 + width * 0.08 * np.sin(t * 1.3))
+        cy = int(height / 2 + height * 0.04 * np.sin(t * 2.1))
+        face_w, face_h = int(width * 0.12), int(height * 0.24)
+        cv2.ellipse(frame, (cx, cy), (face_w, face_h), 0, 0, 360, (120, 160, 210), -1)
+        eye_dy = -face_h // 4
+        for side in (-1, 1):
+            cv2.circle(frame, (cx + side * face_w // 3, cy + eye_dy), max(2, face_w // 10), (40, 30, 30), -1)
+        mouth_open = int(face_h * (0.05 + 0.05 * abs(np.sin(t * 6.0))))
+        cv2.ellipse(frame, (cx, cy + face_h // 2), (face_w // 3, max(1, mouth_open)), 0, 0, 360, (60, 50, 140), -1)
+
+        writer.write(frame)
+
+    writer.release()
+    return path
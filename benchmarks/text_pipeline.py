@@ -0,0 +1,147 @@
+"""
+Replayable throughput benchmark for the text pipeline.
+
+Starts the local fake AssemblyAI and OpenAI servers (recorded fixture,
+configurable latency / error rate), drives N concurrent process_video_text
+jobs on one event loop the way the API schedules them, and reports:
+
+  * p50 / p95 / max end-to-end job latency (submission to stored result)
+  * event-loop blocking (lag of a 10 ms heartbeat task)
+  * HTTP requests vs TCP connections per fake server (connection reuse)
+
+    python -m benchmarks.text_pipeline --jobs 20 --openai-latency 0.8 --assemblyai-latency 0.05
+
+Analysis documents go to an in-memory sink unless --use-mongo is given.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from local_testing.fake_assemblyai import FakeAssemblyAIServer
+from local_testing.fake_openai import FakeOpenAIServer
+from settings import settings
+import processors.text_processor as text_processor
+
+
+class InMemoryCollection:
+    """Just enough of a pymongo collection for process_video_text's writes."""
+
+    def __init__(self):
+        self.docs = []
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+    def update_one(self, query, update, upsert=False):
+        self.docs.append({"query": query, "update": update})
+
+
+async def _monitor_loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def _timed_job(video_id: str, s3_url: str, submitted_at: float, latencies: list, failures: list):
+    try:
+        await text_processor.process_video_text(video_id, s3_url, "Quarterly planning pitch")
+    except Exception as e:
+        failures.append(str(e))
+    latencies.append(time.perf_counter() - submitted_at)
+
+
+async def _run(jobs: int):
+    latencies, lag_samples, failures = [], [], []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(stop, lag_samples))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _timed_job(
+            str(ObjectId()),
+            f"https://{settings.S3_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/bench-{i}.mp4",
+            started,
+            latencies,
+            failures,
+        )
+        for i in range(jobs)
+    ])
+    wall_time = time.perf_counter() - started
+
+    stop.set()
+    await monitor
+    return latencies, lag_samples, failures, wall_time
+
+
+def run_benchmark(jobs=10, assemblyai_latency=0.05, openai_latency=0.5, transcribe_delay=1.0,
+                  error_rate=0.0, poll_interval=0.25, use_mongo=False):
+    assemblyai = FakeAssemblyAIServer(transcribe_delay=transcribe_delay, latency=assemblyai_latency,
+                                      error_rate=error_rate, seed=1).start()
+    openai = FakeOpenAIServer(latency=openai_latency, error_rate=error_rate, seed=2).start()
+
+    settings.ASSEMBLYAI_API_URL = assemblyai.url
+    settings.OPENAI_API_URL = openai.url
+    settings.ASSEMBLYAI_POLL_INTERVAL = poll_interval
+
+    sink = InMemoryCollection()
+    if not use_mongo:
+        text_processor.text_analysis_collection = sink
+        text_processor.videos_collection = InMemoryCollection()
+
+    try:
+        latencies, lag_samples, failures, wall_time = asyncio.run(_run(jobs))
+    finally:
+        assemblyai.stop()
+        openai.stop()
+
+    lags = np.array(lag_samples) if lag_samples else np.zeros(1)
+    return {
+        "jobs": jobs,
+        "failed_jobs": len(failures),
+        "wall_time_sec": round(wall_time, 3),
+        "throughput_jobs_per_sec": round(jobs / wall_time, 3) if wall_time else 0.0,
+        "latency_p50_sec": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p95_sec": round(float(np.percentile(latencies, 95)), 3),
+        "latency_max_sec": round(float(np.max(latencies)), 3),
+        "event_loop_blocked_sec": round(float(lags.sum()), 3),
+        "event_loop_max_lag_sec": round(float(lags.max()), 3),
+        "event_loop_blocked_ratio": round(float(lags.sum()) / wall_time, 3) if wall_time else 0.0,
+        "assemblyai": {**assemblyai.stats, "requests_per_connection": _reuse(assemblyai.stats)},
+        "openai": {**openai.stats, "requests_per_connection": _reuse(openai.stats)},
+    }
+
+
+def _reuse(stats):
+    return round(stats["requests"] / stats["connections"], 2) if stats["connections"] else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark process_video_text against local fake APIs")
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--assemblyai-latency", type=float, default=0.05, help="seconds added to every AssemblyAI request")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="seconds added to every OpenAI request")
+    parser.add_argument("--transcribe-delay", type=float, default=1.0, help="seconds until a transcript completes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--use-mongo", action="store_true", help="write results to the configured MongoDB")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        jobs=args.jobs,
+        assemblyai_latency=args.assemblyai_latency,
+        openai_latency=args.openai_latency,
+        transcribe_delay=args.transcribe_delay,
+        error_rate=args.error_rate,
+        poll_interval=args.poll_interval,
+        use_mongo=args.use_mongo,
+    )
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,151 @@
+"""
+End-to-end throughput of VisualAnalyzer.process_video without AWS.
+
+For every combination of resolution, fps and duration a synthetic talking-head
+clip is written with cv2.VideoWriter and analysed against FakeRekognitionClient
+with injected latency. Each configuration runs in its own spawned process, so
+peak RSS is that run's alone. Reported per configuration:
+
+  wall_time_sec           total process_video time
+  video_fps               source frames covered per wall second (x realtime = video_fps / fps)
+  decoded_fps             frames decoded to BGR per wall second
+  avg_bytes_per_frame     encoded JPEG bytes per Rekognition call
+  calls_per_sec           Rekognition calls per wall second
+  peak_rss_mb             peak resident memory of the run
+
+Save a run and compare later ones against it; metrics that get worse by more
+than --tolerance are flagged and the exit status is 1:
+
+    python -m benchmarks.visual_pipeline --resolutions 640x360 1280x720 --fps 30 60 --durations 30 --save base.json
+    python -m benchmarks.visual_pipeline --resolutions 640x360 1280x720 --fps 30 60 --durations 30 --compare base.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+# metric -> True if higher is better
+METRICS = {
+    "wall_time_sec": False,
+    "video_fps": True,
+    "decoded_fps": True,
+    "avg_bytes_per_frame": False,
+    "calls_per_sec": True,
+    "peak_rss_mb": False,
+}
+
+
+def _config_name(config):
+    return f"{config['width']}x{config['height']}@{config['fps']}fps/{config['duration']:g}s/{config['mode']}"
+
+
+def _run_config(config):
+    """Runs in a fresh process: make the clip, analyse it, measure."""
+    from benchmarks.synthetic_video import make_synthetic_video
+    from local_testing.fake_rekognition import FakeRekognitionClient
+    from processors.visual_processor import VisualAnalyzer
+
+    path = make_synthetic_video(width=config["width"], height=config["height"], fps=config["fps"],
+                                duration=config["duration"])
+    try:
+        client = FakeRekognitionClient(latency=config["latency"], seed=7)
+        analyzer = VisualAnalyzer(frame_selection_mode=config["mode"], rekognition_client=client,
+                                  max_in_flight=config["max_in_flight"], archive_responses=False)
+        started = time.perf_counter()
+        results = analyzer.process_video(path)
+        elapsed = time.perf_counter() - started
+    finally:
+        os.remove(path)
+
+    stats = results["processing_stats"]
+    total_frames = int(config["fps"] * config["duration"])
+    decoded = len(results["quality_timeline"]["time"])
+    return {
+        "config": _config_name(config),
+        "frames_analysed": len(results["eye_contact_analysis"]),
+        "rekognition_calls": client.stats["calls"],
+        "wall_time_sec": round(elapsed, 3),
+        "video_fps": round(total_frames / elapsed, 1) if elapsed else 0.0,
+        "decoded_fps": round(decoded / elapsed, 1) if elapsed else 0.0,
+        "avg_bytes_per_frame": stats["avg_bytes_per_call"],
+        "calls_per_sec": round(client.stats["calls"] / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_benchmark(resolutions=((640, 360), (1280, 720)), fps_values=(30,), durations=(30.0,), latency=0.2,
+                  max_in_flight=8, mode="sequential"):
+    configs = [
+        {"width": w, "height": h, "fps": fps, "duration": d, "latency": latency,
+         "max_in_flight": max_in_flight, "mode": mode}
+        for (w, h) in resolutions for fps in fps_values for d in durations
+    ]
+    rows = []
+    for config in configs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            rows.append(pool.submit(_run_config, config).result())
+    return rows
+
+
+def compare(rows, baseline_rows, tolerance=0.1):
+    """Per-config relative change of every metric against the baseline, flagging regressions."""
+    baseline = {row["config"]: row for row in baseline_rows}
+    report, regressions = [], []
+    for row in rows:
+        base = baseline.get(row["config"])
+        if base is None:
+            report.append({"config": row["config"], "note": "not in baseline"})
+            continue
+        changes = {}
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            changes[metric] = round(change, 3)
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(f"{row['config']}: {metric} {old} -> {new} ({change:+.1%})")
+        report.append({"config": row["config"], "relative_change": changes})
+    return report, regressions
+
+
+def _resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark VisualAnalyzer.process_video against a fake Rekognition")
+    parser.add_argument("--resolutions", type=_resolution, nargs="+", default=[(640, 360), (1280, 720)])
+    parser.add_argument("--fps", type=int, nargs="+", default=[30])
+    parser.add_argument("--durations", type=float, nargs="+", default=[30.0])
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every detect_faces call")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--mode", default="sequential", help="frame_selection_mode")
+    parser.add_argument("--save", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown tolerated by --compare")
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.resolutions, args.fps, args.durations, args.latency, args.max_in_flight, args.mode)
+    for row in rows:
+        print(f"{row['config']:<32} {row['wall_time_sec']:>8.2f}s  {row['video_fps']:>8.1f} video fps  "
+              f"{row['decoded_fps']:>7.1f} decoded fps  {row['avg_bytes_per_frame']:>9.0f} B/frame  "
+              f"{row['calls_per_sec']:>6.2f} calls/s  {row['peak_rss_mb']:>7.1f} MB")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report, regressions = compare(rows, json.load(f), args.tolerance)
+        print(json.dumps(report, indent=2))
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
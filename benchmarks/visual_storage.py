@@ -0,0 +1,96 @@
+"""
+Stored size and BSON encode/decode time of visual_insights, plain per-frame
+layout against the compact encoding in processors/visual_encoding.py.
+
+Insights are built the way process_video builds them (scoring, stability windows,
+averages) from stubbed Rekognition responses. No video is decoded, so long
+videos are cheap to simulate. BSON encode/decode time stands in for the
+serialisation share of a Mongo write/read. --mongo-uri also times a real
+insert_one/find_one round trip against a scratch collection.
+
+    python -m benchmarks.visual_storage --minutes 10 60 180
+"""
+import argparse
+import json
+import time
+
+import bson
+
+from local_testing.fake_rekognition import face_details_for
+from processors.visual_encoding import TIP_TABLES, TIP_TABLE_VERSION, decode_visual_insights, encode_visual_insights
+from processors.visual_processor import VisualAnalyzer
+
+
+def make_insights(seconds, no_face_ratio=0.1):
+    analyzer = VisualAnalyzer(frame_selection_mode="sequential", rekognition_client=object())
+    frames = []
+    for t in range(seconds):
+        response = {"FaceDetails": face_details_for(str(t).encode("utf-8"), no_face_ratio)}
+        analysis = analyzer._score_frame(None, response)
+        if analysis is None:
+            frames.append((float(t), analyzer._get_default_response(expression="no_face"), False))
+        else:
+            frames.append((float(t), analysis, True))
+    return analyzer._build_results(frames)
+
+
+def _timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        value = fn()
+    return value, (time.perf_counter() - started) / repeat * 1000
+
+
+def _inline_tips(encoded):
+    inline = 0
+    for section in encoded["sections"].values():
+        for field, column in section["columns"].items():
+            if field.endswith("_tip"):
+                inline += sum(isinstance(v, str) for v in column)
+    return inline
+
+
+def _mongo_round_trip(uri, document, repeat):
+    from pymongo import MongoClient
+    collection = MongoClient(uri)["visual_storage_benchmark"]["insights"]
+    try:
+        def write():
+            collection.delete_many({})
+            collection.insert_one({"visual_insights": document})
+        _, write_ms = _timed(write, repeat)
+        _, read_ms = _timed(lambda: collection.find_one({}), repeat)
+    finally:
+        collection.drop()
+    return round(write_ms, 2), round(read_ms, 2)
+
+
+def run_benchmark(minutes=(10, 60), repeat=5, mongo_uri=None):
+    report = []
+    for m in minutes:
+        insights = make_insights(int(m * 60))
+        encoded = encode_visual_insights(insights)
+        row = {"minutes": m, "frames": len(insights["eye_contact_analysis"])}
+        for name, document in (("plain", insights), ("compact", encoded)):
+            data, encode_ms = _timed(lambda: bson.encode({"visual_insights": document}), repeat)
+            _, decode_ms = _timed(lambda: bson.decode(data), repeat)
+            row[name] = {"bson_bytes": len(data), "encode_ms": round(encode_ms, 2), "decode_ms": round(decode_ms, 2)}
+            if mongo_uri:
+                row[name]["mongo_write_ms"], row[name]["mongo_read_ms"] = _mongo_round_trip(mongo_uri, document, repeat)
+
+        _, rehydrate_ms = _timed(lambda: decode_visual_insights(encoded), repeat)
+        row["compact"]["rehydrate_ms"] = round(rehydrate_ms, 2)
+        row["size_ratio"] = round(row["compact"]["bson_bytes"] / row["plain"]["bson_bytes"], 3)
+        row["round_trip_exact"] = decode_visual_insights(bson.decode(bson.encode(encoded))) == insights
+        row["inline_tips"] = _inline_tips(encoded)
+        report.append(row)
+    return {"tip_table": TIP_TABLE_VERSION, "tip_table_size": len(TIP_TABLES[TIP_TABLE_VERSION]), "runs": report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare plain and compact visual_insights storage")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60], help="simulated video lengths")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mongo-uri", default=None, help="also time insert_one/find_one against this server")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.minutes, args.repeat, args.mongo_uri), indent=2))
@@ -0,0 +1,136 @@
+"""
+Admission control for the processing endpoints.
+
+A request adding n jobs of a modality is refused when
+  * its backlog (queued jobs) plus n would pass ADMISSION_<KIND>_MAX_QUEUED, or
+  * its workers are saturated (running jobs / live worker capacity at least
+    ADMISSION_SATURATION) and the backlog would take longer than
+    ADMISSION_MAX_WAIT_SEC to drain at the modality's throughput.
+
+Throughput is jobs completed per second over ADMISSION_THROUGHPUT_WINDOW_SEC,
+and capacity is the concurrency that live consumers report to the job queue
+(a pool shared by several modalities is split evenly across them). Running
+jobs are those holding a live lease.
+When nothing has completed within the window (a cold start, or jobs longer
+than the window), throughput is estimated as capacity divided by
+ADMISSION_<KIND>_EXPECTED_JOB_SEC. With neither (no live worker, or the
+expected duration set to 0) the drain time is unknown, and only the backlog
+limit applies. A refusal carries retry_after: the time the backlog needs, at
+that throughput, to get back under the limit it hit. The value is clamped to
+[ADMISSION_MIN_RETRY_AFTER, ADMISSION_MAX_RETRY_AFTER], and is the maximum
+when the throughput is unknown. One load snapshot is shared by all requests
+for ADMISSION_CACHE_SEC, so admission costs at most a few aggregations per
+that interval.
+"""
+import math
+import threading
+import time
+from typing import Dict
+
+from core.job_queue import JobQueue
+from core.logger import logger
+from settings import settings
+
+
+def _max_queued() -> Dict[str, int]:
+    return {
+        "audio": settings.ADMISSION_AUDIO_MAX_QUEUED,
+        "text": settings.ADMISSION_TEXT_MAX_QUEUED,
+        "image": settings.ADMISSION_IMAGE_MAX_QUEUED,
+    }
+
+
+def _expected_job_sec() -> Dict[str, float]:
+    return {
+        "audio": settings.ADMISSION_AUDIO_EXPECTED_JOB_SEC,
+        "text": settings.ADMISSION_TEXT_EXPECTED_JOB_SEC,
+        "image": settings.ADMISSION_IMAGE_EXPECTED_JOB_SEC,
+    }
+
+
+class AdmissionController:
+    def __init__(self, queue: JobQueue, max_queued: Dict[str, int] = None, saturation: float = None,
+                 max_wait: float = None, throughput_window: float = None, cache_sec: float = None,
+                 expected_job_sec: Dict[str, float] = None):
+        self.queue = queue
+        self.max_queued = max_queued or _max_queued()
+        self.expected_job_sec = _expected_job_sec() if expected_job_sec is None else expected_job_sec
+        self.saturation = settings.ADMISSION_SATURATION if saturation is None else saturation
+        self.max_wait = settings.ADMISSION_MAX_WAIT_SEC if max_wait is None else max_wait
+        self.throughput_window = settings.ADMISSION_THROUGHPUT_WINDOW_SEC if throughput_window is None else throughput_window
+        self.cache_sec = settings.ADMISSION_CACHE_SEC if cache_sec is None else cache_sec
+        # A worker that missed three capacity reports is considered gone
+        self.worker_ttl = 3 * settings.JOB_HEARTBEAT_INTERVAL
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Per modality: queued, running, capacity, saturation, throughput_per_sec and
+        throughput_source ("observed", "expected" or None when it is unknown).
+        """
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_at < self.cache_sec:
+                return self._snapshot
+
+            load = self.queue.load(self.throughput_window, self.worker_ttl)
+            snapshot = {}
+            for kind in set(self.max_queued) | set(load):
+                row = load.get(kind, {"queued": 0, "running": 0, "completed": 0, "capacity": 0})
+                throughput, source = row["completed"] / self.throughput_window, "observed"
+                if throughput <= 0:
+                    expected = self.expected_job_sec.get(kind) or 0
+                    throughput = row["capacity"] / expected if row["capacity"] and expected > 0 else 0.0
+                    source = "expected" if throughput > 0 else None
+                snapshot[kind] = {
+                    "queued": row["queued"],
+                    "running": row["running"],
+                    "capacity": round(row["capacity"], 3),
+                    # None: no live worker consumes this modality
+                    "saturation": round(row["running"] / row["capacity"], 3) if row["capacity"] else None,
+                    "throughput_per_sec": throughput,
+                    "throughput_source": source,
+                }
+            self._snapshot, self._snapshot_at = snapshot, time.monotonic()
+            return snapshot
+
+    def _retry_after(self, excess: float, throughput: float) -> int:
+        if throughput <= 0:
+            return settings.ADMISSION_MAX_RETRY_AFTER
+        seconds = math.ceil(excess / throughput)
+        return int(min(settings.ADMISSION_MAX_RETRY_AFTER, max(settings.ADMISSION_MIN_RETRY_AFTER, seconds)))
+
+    def check(self, kind: str, incoming: int = 1) -> Dict:
+        """
+        Whether `incoming` new jobs of `kind` (all of one request) may be queued:
+        {"allowed": bool, "retry_after": seconds or None, "reason": str or None, **load}
+        """
+        load = self.snapshot().get(kind)
+        if load is None:
+            return {"allowed": True, "retry_after": None, "reason": None}
+
+        queued, throughput = load["queued"], load["throughput_per_sec"]
+        # The request's last job waits behind the current backlog and the rest of the request
+        ahead = queued + incoming - 1
+        decision = {"allowed": True, "retry_after": None, "reason": None, **load}
+        limit = self.max_queued.get(kind)
+        if limit and incoming > limit:
+            decision.update(allowed=False, reason=f"{incoming} {kind} jobs in one request exceed the backlog "
+                                                  f"limit of {limit}; split the request",
+                            retry_after=settings.ADMISSION_MAX_RETRY_AFTER)
+        elif limit and queued + incoming > limit:
+            decision.update(allowed=False, reason=f"{kind} backlog of {queued} jobs has no room for {incoming} more "
+                                                  f"under its limit of {limit}",
+                            retry_after=self._retry_after(queued + incoming - limit, throughput))
+        elif throughput > 0 and (load["saturation"] or 0.0) >= self.saturation:
+            # Unknown throughput leaves only the backlog limit above: refusing on an
+            # infinite wait would turn away even one queued job with the maximum Retry-After
+            if ahead and ahead / throughput > self.max_wait:
+                decision.update(allowed=False,
+                                reason=f"{kind} workers are saturated and the backlog of {ahead} jobs "
+                                       f"needs more than {self.max_wait:.0f}s to drain",
+                                retry_after=self._retry_after(ahead - self.max_wait * throughput, throughput))
+        if not decision["allowed"]:
+            logger.warning("Admission refused for %s: %s (retry after %ss)", kind, decision["reason"], decision["retry_after"])
+        return decision
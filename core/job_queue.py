@@ -0,0 +1,577 @@
+"""
+Durable job queue on a MongoDB collection.
+
+Every job is one document in `jobs`:
+
+    {"kind": "audio" | "text" | "image", "payload": {...}, "status": ...,
+     "priority": int, "video_id": ObjectId, "org_id": ..., "attempts": int,
+     "max_attempts": int, "available_at": datetime, "lease_owner": str,
+     "lease_expires_at": datetime, "last_error": str, ...}
+
+Status moves queued -> leased -> completed. A failed attempt goes back to
+queued with an exponential backoff on available_at, and a job that has used up
+max_attempts is dead-lettered (status "dead") and kept for inspection or
+requeue_dead. Claiming is a single find_one_and_update, so two consumers never
+lease the same job. A lease that is not renewed by heartbeat within the
+visibility timeout expires, and the job can be claimed again. This is how jobs
+from a crashed or restarted worker are recovered. A handler that raises
+JobPending is requeued for later without using an attempt (defer).
+
+The queue only needs a pymongo-compatible collection, so the whole lifecycle
+runs against a local MongoDB or mongomock:
+
+    queue = JobQueue(collection=mongomock.MongoClient().db.jobs, clock=fake_clock)
+"""
+import asyncio
+import inspect
+import math
+import os
+import random
+import socket
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from core.logger import logger
+
+QUEUED, LEASED, COMPLETED, DEAD = "queued", "leased", "completed", "dead"
+
+# Claim order: highest priority first, then the earliest fair-queuing finish tag (unset
+# without an org policy; backfill_virtual_tags keeps a queue from mixing tagged and
+# untagged jobs, since an unset tag would sort first), then oldest
+CLAIM_SORT = [("priority", DESCENDING), ("virtual_finish", ASCENDING), ("available_at", ASCENDING), ("_id", ASCENDING)]
+
+# job_queue_state document holding the fair-queuing virtual clock
+VIRTUAL_TIME_ID = "virtual_time"
+
+MAX_ERRORS_KEPT = 5
+
+
+def _settings():
+    """App settings, imported only when a default is needed, so the queue runs without credentials."""
+    from settings import settings
+    return settings
+
+
+class JobPending(Exception):
+    """
+    Raised by a handler whose work carries on elsewhere (e.g. an external async job).
+    The job is requeued after `delay` seconds without using an attempt, with `payload`
+    merged into its payload, so the next run resumes instead of starting over.
+    """
+
+    def __init__(self, delay: float, payload: Dict = None):
+        super().__init__(delay, payload)
+        self.delay = delay
+        self.payload = payload or {}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """
+    Enqueue, lease, heartbeat, complete and retry/dead-letter jobs in one collection.
+
+    With a `policy` (core.org_scheduling.OrgPolicy), jobs are scheduled by weighted
+    fair queuing across org_id (start-time fair queuing): every org has a finish
+    clock in state_collection, each enqueued job advances it by 1 / weight, and
+    jobs are claimed in finish-tag order within a priority level. An org that
+    floods the queue only pushes its own tags out, so another org's new job lands
+    near the front. The org's tier priority is added to the job priority, and
+    orgs at their max_concurrent cap are skipped while claiming.
+    """
+
+    def __init__(self, collection=None, visibility_timeout: float = None, max_attempts: int = None,
+                 backoff_base: float = None, backoff_max: float = None, backoff_jitter: float = 0.2,
+                 clock: Callable[[], datetime] = datetime.utcnow, on_dead: Callable[[Dict, Any], None] = None,
+                 policy=None, state_collection=None, capped_orgs_ttl: float = None):
+        if collection is None:
+            from db import jobs_collection, job_queue_state_collection
+            collection = jobs_collection
+            state_collection = job_queue_state_collection if state_collection is None else state_collection
+        if policy is not None and state_collection is None:
+            raise ValueError("fair queuing keeps its virtual clock in state_collection")
+        self.collection = collection
+        self.policy = policy
+        self.state_collection = state_collection
+        self.visibility_timeout = _settings().JOB_VISIBILITY_TIMEOUT if visibility_timeout is None else visibility_timeout
+        self.max_attempts = _settings().JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.backoff_base = _settings().JOB_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = _settings().JOB_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.backoff_jitter = backoff_jitter
+        self.clock = clock
+        self.on_dead = on_dead
+        if capped_orgs_ttl is None and policy is not None:
+            capped_orgs_ttl = _settings().JOB_CAPPED_ORGS_TTL
+        self.capped_orgs_ttl = capped_orgs_ttl or 0.0
+        self._running_by_org = None  # (counted_at, {org_id: live leases}) behind _capped_orgs
+
+    def ensure_indexes(self) -> None:
+        """Create the queue's indexes and, under fair queuing, tag queued jobs left untagged (at startup)."""
+        self.collection.create_index([("status", ASCENDING), ("kind", ASCENDING)] + CLAIM_SORT[:3])
+        self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self.collection.create_index([("video_id", ASCENDING)])
+        self.collection.create_index([("batch_id", ASCENDING)], sparse=True)
+        self.collection.create_index([("started_at", ASCENDING)], sparse=True)
+        self.collection.create_index([("completed_at", ASCENDING)], sparse=True)
+        self.backfill_virtual_tags()
+
+    def backfill_virtual_tags(self) -> int:
+        """
+        A null virtual_finish sorts ahead of every tag, so untagged queued jobs (enqueued
+        before fair queuing was switched on) would jump the fair order. With a policy they
+        get tags now, oldest first, as if each had just been enqueued by its org. Each job
+        is taken with find_one_and_update before its org's share is charged, so processes
+        starting together never charge an org twice for one job. A queue without a policy
+        leaves tags alone. Returns the number of jobs tagged.
+        """
+        if self.policy is None:
+            return 0
+        virtual_now = (self.state_collection.find_one({"_id": VIRTUAL_TIME_ID}) or {}).get("value", 0.0)
+        tagged = 0
+        while True:
+            # Provisional tag at the virtual time takes the job; its own tag follows
+            doc = self.collection.find_one_and_update(
+                {"status": QUEUED, "virtual_finish": None},
+                {"$set": {"virtual_start": virtual_now, "virtual_finish": virtual_now}},
+                projection={"org_id": 1},
+                sort=[("available_at", ASCENDING), ("_id", ASCENDING)],
+            )
+            if doc is None:
+                break
+            self._tag_fair_shares([doc])
+            self.collection.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"virtual_start": doc["virtual_start"], "virtual_finish": doc["virtual_finish"]}}
+            )
+            tagged += 1
+        if tagged:
+            logger.info("Backfilled fair-queuing tags on %d queued jobs", tagged)
+        return tagged
+
+    # ---------- PRODUCER ----------
+    def _job_doc(self, kind: str, payload: Dict, priority: int = 0, video_id: str = None, org_id=None,
+                 max_attempts: int = None, delay: float = 0.0, batch_id=None) -> Dict:
+        now = self.clock()
+        if self.policy is not None:
+            priority += self.policy.terms(org_id)["priority"]
+        return {
+            "kind": kind,
+            "payload": payload,
+            "status": QUEUED,
+            "priority": priority,
+            "video_id": ObjectId(video_id) if video_id else None,
+            "org_id": org_id,
+            "batch_id": batch_id,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "available_at": now + timedelta(seconds=delay),
+            "created_at": now,
+            "updated_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "errors": [],
+        }
+
+    def _tag_fair_shares(self, docs: List[Dict]) -> None:
+        """Give each org's new jobs consecutive tags 1/weight apart, starting no earlier than virtual time."""
+        virtual_now = (self.state_collection.find_one({"_id": VIRTUAL_TIME_ID}) or {}).get("value", 0.0)
+        by_org: Dict[Any, List[Dict]] = {}
+        for doc in docs:
+            by_org.setdefault(doc["org_id"], []).append(doc)
+
+        for org_id, org_docs in by_org.items():
+            step = 1.0 / max(self.policy.terms(org_id)["weight"], 1e-6)
+            key = f"org:{org_id}"
+            # An org coming back from idle starts at the current virtual time, with no credit saved up
+            self.state_collection.update_one({"_id": key}, {"$max": {"last_finish": virtual_now}}, upsert=True)
+            state = self.state_collection.find_one_and_update(
+                {"_id": key}, {"$inc": {"last_finish": step * len(org_docs)}}, return_document=ReturnDocument.AFTER
+            )
+            start = state["last_finish"] - step * len(org_docs)
+            for i, doc in enumerate(org_docs):
+                doc["virtual_start"] = start + i * step
+                doc["virtual_finish"] = start + (i + 1) * step
+
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0, video_id: str = None, org_id=None,
+                max_attempts: int = None, delay: float = 0.0, batch_id=None) -> ObjectId:
+        doc = self._job_doc(kind, payload, priority, video_id, org_id, max_attempts, delay, batch_id)
+        if self.policy is not None:
+            self._tag_fair_shares([doc])
+        job_id = self.collection.insert_one(doc).inserted_id
+        logger.info("Enqueued %s job %s (video %s, priority %d)", kind, job_id, video_id, doc["priority"])
+        return job_id
+
+    def enqueue_many(self, jobs: List[Dict]) -> List[ObjectId]:
+        """Enqueue several jobs (each a dict of enqueue's keyword arguments) with one insert_many."""
+        if not jobs:
+            return []
+        docs = [self._job_doc(**job) for job in jobs]
+        if self.policy is not None:
+            self._tag_fair_shares(docs)
+        job_ids = self.collection.insert_many(docs).inserted_ids
+        logger.info("Enqueued %d jobs", len(job_ids))
+        return job_ids
+
+    # ---------- CONSUMER ----------
+    def claim(self, kinds: Iterable[str] = None, worker_id: str = None) -> Optional[Dict]:
+        """
+        Lease the next runnable job: queued and due, or leased with an expired lease.
+        Returns the job with attempts already incremented, or None if nothing is runnable.
+        """
+        worker_id = worker_id or default_worker_id()
+        while True:
+            now = self.clock()
+            query = {"$or": [
+                {"status": QUEUED, "available_at": {"$lte": now}},
+                {"status": LEASED, "lease_expires_at": {"$lte": now}},
+            ]}
+            if kinds is not None:
+                query["kind"] = {"$in": list(kinds)}
+            if self.policy is not None:
+                capped = self._capped_orgs(now)
+                if capped:
+                    query["org_id"] = {"$nin": capped}
+
+            job = self.collection.find_one_and_update(
+                query,
+                {"$set": {"status": LEASED, "lease_owner": worker_id, "leased_at": now,
+                          "lease_expires_at": now + timedelta(seconds=self.visibility_timeout), "updated_at": now},
+                 "$inc": {"attempts": 1}},
+                sort=CLAIM_SORT,
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                return None
+            if job["attempts"] <= job["max_attempts"]:
+                if self._running_by_org is not None:
+                    counts = self._running_by_org[1]
+                    counts[job.get("org_id")] = counts.get(job.get("org_id"), 0) + 1
+                self._started(job, now)
+                return job
+            # The previous holder's lease ran out on its last attempt
+            self._dead_letter(job, "lease expired on final attempt")
+
+    def _capped_orgs(self, now: datetime) -> List:
+        """
+        Orgs already running as many jobs as their cap allows. The per-org counts are
+        recounted at most every capped_orgs_ttl seconds, and this queue's own claims are
+        added as it makes them. The cap is soft: claims on other workers within the TTL
+        can overshoot it, and an org whose jobs finish stays skipped until the recount.
+        """
+        if self._running_by_org is None or (now - self._running_by_org[0]).total_seconds() >= self.capped_orgs_ttl:
+            running = self.collection.aggregate([
+                {"$match": {"status": LEASED, "lease_expires_at": {"$gt": now}}},
+                {"$group": {"_id": "$org_id", "n": {"$sum": 1}}},
+            ])
+            self._running_by_org = (now, {row["_id"]: row["n"] for row in running})
+        counts = self._running_by_org[1]
+        return [org_id for org_id, n in list(counts.items()) if 0 < self.policy.terms(org_id)["max_concurrent"] <= n]
+
+    def _started(self, job: Dict, now: datetime) -> None:
+        """Record the queue wait on a job's first start and advance the fair-queuing virtual clock."""
+        if job["attempts"] == 1 and job.get("started_at") is None:
+            job["started_at"] = now
+            job["queue_wait_sec"] = round((now - job["available_at"]).total_seconds(), 3)
+            self.collection.update_one(
+                {"_id": job["_id"]}, {"$set": {"started_at": now, "queue_wait_sec": job["queue_wait_sec"]}}
+            )
+        if self.policy is not None and job.get("virtual_start") is not None:
+            self.state_collection.update_one(
+                {"_id": VIRTUAL_TIME_ID}, {"$max": {"value": job["virtual_start"]}}, upsert=True
+            )
+
+    def heartbeat(self, job: Dict) -> bool:
+        """Extend the lease; False if it was lost (expired and claimed by another worker)."""
+        now = self.clock()
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": LEASED, "lease_owner": job["lease_owner"]},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=self.visibility_timeout), "updated_at": now}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, job: Dict) -> bool:
+        now = self.clock()
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": LEASED, "lease_owner": job["lease_owner"]},
+            {"$set": {"status": COMPLETED, "completed_at": now, "updated_at": now, "lease_expires_at": None}}
+        )
+        if result.matched_count != 1:
+            logger.warning("Job %s finished after its lease was lost", job["_id"])
+        return result.matched_count == 1
+
+    def defer(self, job: Dict, delay: float, payload: Dict = None) -> bool:
+        """Requeue a leased job after `delay` seconds, giving back its attempt and merging `payload` into its payload."""
+        now = self.clock()
+        update = {"status": QUEUED, "available_at": now + timedelta(seconds=delay), "updated_at": now,
+                  "lease_owner": None, "lease_expires_at": None}
+        update.update({f"payload.{key}": value for key, value in (payload or {}).items()})
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": LEASED, "lease_owner": job["lease_owner"]},
+            {"$set": update, "$inc": {"attempts": -1}}
+        )
+        if result.matched_count != 1:
+            logger.warning("Job %s was deferred after its lease was lost", job["_id"])
+            return False
+        logger.info("Job %s (%s) deferred for %.0fs", job["_id"], job["kind"], delay)
+        return True
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(1.0 - self.backoff_jitter, 1.0)
+
+    def fail(self, job: Dict, error: Any) -> str:
+        """Record a failed attempt; returns "retry" (requeued with backoff), "dead" or "lost"."""
+        if job["attempts"] >= job["max_attempts"]:
+            return DEAD if self._dead_letter(job, error) else "lost"
+
+        now = self.clock()
+        delay = self.backoff(job["attempts"])
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": LEASED, "lease_owner": job["lease_owner"]},
+            {"$set": {"status": QUEUED, "available_at": now + timedelta(seconds=delay), "updated_at": now,
+                      "lease_owner": None, "lease_expires_at": None, "last_error": str(error)},
+             "$push": {"errors": {"$each": [self._error_entry(job, error, now)], "$slice": -MAX_ERRORS_KEPT}}}
+        )
+        if result.matched_count != 1:
+            return "lost"
+        logger.warning("Job %s (%s) attempt %d/%d failed, retrying in %.0fs: %s",
+                       job["_id"], job["kind"], job["attempts"], job["max_attempts"], delay, error)
+        return "retry"
+
+    def _dead_letter(self, job: Dict, error: Any) -> bool:
+        now = self.clock()
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": LEASED, "lease_owner": job["lease_owner"]},
+            {"$set": {"status": DEAD, "dead_at": now, "updated_at": now, "lease_expires_at": None,
+                      "last_error": str(error)},
+             "$push": {"errors": {"$each": [self._error_entry(job, error, now)], "$slice": -MAX_ERRORS_KEPT}}}
+        )
+        if result.matched_count != 1:
+            return False
+        logger.error("Job %s (%s) dead-lettered after %d attempts: %s", job["_id"], job["kind"], job["attempts"], error)
+        if self.on_dead is not None:
+            try:
+                self.on_dead(job, error)
+            except Exception as hook_error:
+                logger.error("Dead-letter hook failed for job %s: %s", job["_id"], str(hook_error))
+        return True
+
+    @staticmethod
+    def _error_entry(job: Dict, error: Any, now: datetime) -> Dict:
+        entry = {"attempt": job["attempts"], "error": str(error), "at": now}
+        if isinstance(error, BaseException) and error.__traceback__ is not None:
+            entry["traceback"] = "".join(traceback.format_exception(type(error), error, error.__traceback__))[-4000:]
+        return entry
+
+    # ---------- ADMIN ----------
+    def requeue_dead(self, job_id, reset_attempts: bool = True) -> bool:
+        now = self.clock()
+        update = {"$set": {"status": QUEUED, "available_at": now, "updated_at": now, "lease_owner": None}}
+        if reset_attempts:
+            update["$set"]["attempts"] = 0
+        result = self.collection.update_one({"_id": ObjectId(job_id), "status": DEAD}, update)
+        return result.matched_count == 1
+
+    def stats(self, match: Dict = None) -> Dict[str, Dict[str, int]]:
+        """{kind: {status: count}}, optionally over the jobs matching a filter."""
+        pipeline = [{"$group": {"_id": {"kind": "$kind", "status": "$status"}, "n": {"$sum": 1}}}]
+        if match:
+            pipeline.insert(0, {"$match": match})
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in self.collection.aggregate(pipeline):
+            counts.setdefault(row["_id"]["kind"], {})[row["_id"]["status"]] = row["n"]
+        return counts
+
+    def register_worker(self, worker_id: str, kinds: Iterable[str], concurrency: int, running: int) -> None:
+        """
+        Report a consumer's capacity; load() counts workers seen within its worker_ttl.
+        A consumer serving several kinds from one pool (the embedded one) has its
+        concurrency split evenly across them, so the pool is not counted once per kind.
+        """
+        if self.state_collection is None:
+            return
+        now = self.clock()
+        kinds = list(kinds)
+        share = concurrency / max(1, len(kinds))
+        for kind in kinds:
+            self.state_collection.update_one(
+                {"_id": f"worker:{worker_id}:{kind}"},
+                {"$set": {"type": "worker", "worker_id": worker_id, "kind": kind, "concurrency": share,
+                          "running": running, "seen_at": now}},
+                upsert=True,
+            )
+
+    def unregister_worker(self, worker_id: str, kinds: Iterable[str]) -> None:
+        if self.state_collection is not None:
+            self.state_collection.delete_many({"type": "worker", "worker_id": worker_id, "kind": {"$in": list(kinds)}})
+
+    def load(self, throughput_window: float, worker_ttl: float) -> Dict[str, Dict[str, int]]:
+        """
+        Per kind: queued and running jobs, jobs completed within throughput_window
+        seconds, and the concurrency of workers that reported within worker_ttl seconds.
+        Only live leases count as running; a job whose lease expired (its worker
+        crashed) is waiting to be claimed again, so it counts as queued.
+        """
+        now = self.clock()
+        load: Dict[str, Dict[str, int]] = {}
+
+        def row(kind):
+            return load.setdefault(kind, {"queued": 0, "running": 0, "completed": 0, "capacity": 0})
+
+        live_lease = {"$and": [{"$eq": ["$status", LEASED]}, {"$gt": ["$lease_expires_at", now]}]}
+        for r in self.collection.aggregate([
+            {"$match": {"status": {"$in": [QUEUED, LEASED]}}},
+            {"$group": {"_id": {"kind": "$kind", "running": live_lease}, "n": {"$sum": 1}}},
+        ]):
+            row(r["_id"]["kind"])["running" if r["_id"]["running"] else "queued"] += r["n"]
+        for r in self.collection.aggregate([
+            {"$match": {"status": COMPLETED, "completed_at": {"$gte": now - timedelta(seconds=throughput_window)}}},
+            {"$group": {"_id": "$kind", "n": {"$sum": 1}}},
+        ]):
+            row(r["_id"])["completed"] += r["n"]
+        if self.state_collection is not None:
+            workers = self.state_collection.find(
+                {"type": "worker", "seen_at": {"$gte": now - timedelta(seconds=worker_ttl)}}, {"kind": 1, "concurrency": 1}
+            )
+            for worker in workers:
+                row(worker["kind"])["capacity"] += worker["concurrency"]
+        return load
+
+    def wait_stats(self, since: datetime = None) -> Dict[str, Dict[str, float]]:
+        """Queue wait, from a job becoming available to its first start, per org: {org_id: {...}}."""
+        match = {"queue_wait_sec": {"$exists": True}}
+        if since is not None:
+            match["started_at"] = {"$gte": since}
+        waits: Dict[str, List[float]] = {}
+        for doc in self.collection.find(match, {"org_id": 1, "queue_wait_sec": 1}):
+            waits.setdefault(str(doc.get("org_id")), []).append(doc["queue_wait_sec"])
+
+        stats = {}
+        for org_id, values in waits.items():
+            values.sort()
+            stats[org_id] = {
+                "jobs": len(values),
+                "avg_wait_sec": round(sum(values) / len(values), 1),
+                "p50_wait_sec": round(_percentile(values, 0.50), 1),
+                "p95_wait_sec": round(_percentile(values, 0.95), 1),
+                "max_wait_sec": round(values[-1], 1),
+            }
+        return stats
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def run_handler(handler: Callable, payload: Dict) -> Any:
+    """Call a job handler; coroutine handlers get their own event loop in the calling thread."""
+    result = handler(**payload)
+    if inspect.isawaitable(result):
+        return asyncio.run(result)
+    return result
+
+
+async def run_in_thread(handler: Callable, payload: Dict) -> Any:
+    return await asyncio.to_thread(run_handler, handler, payload)
+
+
+class JobConsumer:
+    """
+    Asyncio consumer: keeps up to `concurrency` jobs of the given kinds running,
+    with a heartbeat renewing each lease meanwhile. `runner(handler, payload)`
+    decides where a job executes; by default each one gets a worker thread.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable], kinds: Iterable[str] = None,
+                 concurrency: int = 2, poll_interval: float = None, heartbeat_interval: float = None,
+                 worker_id: str = None, runner: Callable[[Callable, Dict], Awaitable] = run_in_thread):
+        self.queue = queue
+        self.runner = runner
+        self.handlers = handlers
+        self.kinds = list(kinds) if kinds is not None else list(handlers)
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = _settings().JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.heartbeat_interval = _settings().JOB_HEARTBEAT_INTERVAL if heartbeat_interval is None else heartbeat_interval
+        self.worker_id = worker_id or default_worker_id()
+        self.running = 0
+        self._stopping = False
+        self._tasks = set()
+
+    async def run(self) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info("Job consumer %s started for %s (concurrency %d)", self.worker_id, self.kinds, self.concurrency)
+        reporter = asyncio.create_task(self._report())
+        try:
+            await self._consume(slots)
+        finally:
+            reporter.cancel()
+            await asyncio.to_thread(self.queue.unregister_worker, self.worker_id, self.kinds)
+
+    async def _consume(self, slots: asyncio.Semaphore) -> None:
+        while not self._stopping:
+            await slots.acquire()
+            try:
+                job = await asyncio.to_thread(self.queue.claim, self.kinds, self.worker_id)
+            except Exception as e:
+                logger.error("Job claim failed: %s", str(e))
+                job = None
+            if job is None:
+                slots.release()
+                await asyncio.sleep(self.poll_interval)
+                continue
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    async def drain(self) -> None:
+        """Wait for running jobs, including any claimed just before stop()."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _report(self) -> None:
+        """Keep this consumer's capacity visible to admission control."""
+        while True:
+            try:
+                await asyncio.to_thread(self.queue.register_worker, self.worker_id, self.kinds, self.concurrency,
+                                        self.running)
+            except Exception as e:
+                logger.warning("Could not report worker %s: %s", self.worker_id, str(e))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _heartbeat(self, job: Dict) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if not await asyncio.to_thread(self.queue.heartbeat, job):
+                    logger.warning("Lost the lease on job %s", job["_id"])
+                    return
+            except Exception as e:
+                logger.warning("Heartbeat failed for job %s: %s", job["_id"], str(e))
+
+    async def _execute(self, job: Dict) -> None:
+        self.running += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await self.runner(self.handlers[job["kind"]], job["payload"])
+        except JobPending as pending:
+            await asyncio.to_thread(self.queue.defer, job, pending.delay, pending.payload)
+        except Exception as e:
+            await asyncio.to_thread(self.queue.fail, job, e)
+        else:
+            await asyncio.to_thread(self.queue.complete, job)
+        finally:
+            heartbeat.cancel()
+            self.running -= 1
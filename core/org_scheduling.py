@@ -0,0 +1,70 @@
+"""
+Per-org scheduling terms for the job queue, derived from the org's licence tier.
+
+    weight          share of workers under contention (fair queuing weight)
+    priority        added to every job's priority, so a higher tier is claimed first
+    max_concurrent  cap on the org's jobs running at once (0 = uncapped)
+
+The tier is organisations.license_tier (default "standard"), and
+organisations.max_concurrent_jobs overrides the tier's cap for one org. Jobs
+without an org use the standard tier.
+"""
+import time
+from typing import Dict
+
+from core.job_queue import JobQueue
+from settings import settings
+
+DEFAULT_TIER = "standard"
+
+LICENSE_TIERS = {
+    "standard": {
+        "weight": settings.JOB_TIER_STANDARD_WEIGHT,
+        "priority": settings.JOB_TIER_STANDARD_PRIORITY,
+        "max_concurrent": settings.JOB_TIER_STANDARD_MAX_CONCURRENT,
+    },
+    "premium": {
+        "weight": settings.JOB_TIER_PREMIUM_WEIGHT,
+        "priority": settings.JOB_TIER_PREMIUM_PRIORITY,
+        "max_concurrent": settings.JOB_TIER_PREMIUM_MAX_CONCURRENT,
+    },
+    "enterprise": {
+        "weight": settings.JOB_TIER_ENTERPRISE_WEIGHT,
+        "priority": settings.JOB_TIER_ENTERPRISE_PRIORITY,
+        "max_concurrent": settings.JOB_TIER_ENTERPRISE_MAX_CONCURRENT,
+    },
+}
+
+
+class OrgPolicy:
+    """Looks up an org's scheduling terms, caching each org for `ttl` seconds."""
+
+    def __init__(self, collection=None, tiers: Dict[str, Dict] = None, ttl: float = None):
+        if collection is None:
+            from db import orgs_collection
+            collection = orgs_collection
+        self.collection = collection
+        self.tiers = tiers or LICENSE_TIERS
+        self.ttl = settings.JOB_ORG_POLICY_TTL if ttl is None else ttl
+        self._cache = {}
+
+    def terms(self, org_id) -> Dict:
+        cached = self._cache.get(org_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        org = {}
+        if org_id is not None:
+            org = self.collection.find_one({"_id": org_id}, {"license_tier": 1, "max_concurrent_jobs": 1}) or {}
+        terms = dict(self.tiers.get(org.get("license_tier") or DEFAULT_TIER, self.tiers[DEFAULT_TIER]))
+        if org.get("max_concurrent_jobs") is not None:
+            terms["max_concurrent"] = int(org["max_concurrent_jobs"])
+        self._cache[org_id] = (time.monotonic() + self.ttl, terms)
+        return terms
+
+
+def fair_job_queue(**kwargs) -> JobQueue:
+    """The processing queue, with org fair queuing unless JOB_FAIR_QUEUING is off."""
+    if settings.JOB_FAIR_QUEUING and "policy" not in kwargs:
+        kwargs["policy"] = OrgPolicy()
+    return JobQueue(**kwargs)
@@ -0,0 +1,262 @@
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from botocore.config import Config
+
+from core.logger import logger
+from settings import settings
+
+# Error codes AWS uses when a caller exceeds its request quota
+AWS_THROTTLE_CODES = {
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "TooManyRequestsException",
+    "LimitExceededException",
+    "RequestLimitExceeded",
+}
+
+# Config for boto3 clients called through OutboundLimiter.call: the limiter owns retries
+BOTO_NO_RETRY = Config(retries={"total_max_attempts": 1})
+
+
+def is_throttled_response(response) -> bool:
+    """HTTP responses (requests) that ask the caller to slow down."""
+    return getattr(response, "status_code", None) in (429, 503)
+
+
+def is_throttle_exception(exc: Exception) -> bool:
+    """botocore ClientError carrying one of the AWS throttling codes."""
+    error = getattr(exc, "response", None)
+    if isinstance(error, dict):
+        return error.get("Error", {}).get("Code") in AWS_THROTTLE_CODES
+    return False
+
+
+class TokenBucket:
+    """Classic token bucket; rate is adjustable at runtime by the AIMD controller."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take one token, returning how long the caller must wait before using it."""
+        with self.lock:
+            self._refill()
+            self.tokens -= 1.0
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def set_rate(self, rate: float, burst: float = None) -> None:
+        """Change the rate (and burst); tokens accrued so far are credited at the old rate."""
+        with self.lock:
+            self._refill()
+            self.rate = rate
+            if burst is not None:
+                self.burst = burst
+                self.tokens = min(self.tokens, burst)
+
+
+class ProviderLimiter:
+    """
+    Rate and concurrency control for one (provider, API key) pair.
+
+    Requests first wait for a token-bucket slot, then for a concurrency slot.
+    Both limits follow AIMD: every success nudges them up additively towards the
+    configured ceiling, every throttling response cuts them multiplicatively.
+    """
+
+    def __init__(self, name: str, max_rate: float, max_concurrency: int,
+                 min_rate: float = 0.2, min_concurrency: int = 1, decrease_factor: float = 0.5):
+        self.name = name
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.decrease_factor = decrease_factor
+
+        self.bucket = TokenBucket(rate=max_rate, burst=max(1.0, max_rate))
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+        # Metrics
+        self.total_requests = 0
+        self.total_throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque()  # monotonic start times over the last 60s
+
+    # ---------- ADMISSION ----------
+    def acquire(self) -> float:
+        """Blocks the calling thread; async code must call through asyncio.to_thread."""
+        started = time.monotonic()
+        delay = self.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+        with self.cond:
+            while self.in_flight >= int(self.concurrency_limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+            waited = time.monotonic() - started
+            self.total_requests += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self._recent.append(time.monotonic())
+        return waited
+
+    def release(self, outcome: str) -> None:
+        with self.cond:
+            self.in_flight -= 1
+            if outcome == "success":
+                # Additive increase: roughly +1 concurrency per window of successful calls
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1.0 / max(1.0, self.concurrency_limit))
+                # The burst grows back with the rate, so a recovered limiter regains its full burst
+                rate = min(self.max_rate, self.bucket.rate + self.max_rate * 0.05)
+                self.bucket.set_rate(rate, burst=max(1.0, rate))
+            elif outcome == "throttled":
+                self.total_throttled += 1
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * self.decrease_factor)
+                rate = max(self.min_rate, self.bucket.rate * self.decrease_factor)
+                self.bucket.set_rate(rate, burst=max(1.0, rate))
+            self.cond.notify_all()
+
+    # ---------- METRICS ----------
+    def metrics(self) -> Dict[str, Any]:
+        with self.cond:
+            cutoff = time.monotonic() - 60.0
+            while self._recent and self._recent[0] < cutoff:
+                self._recent.popleft()
+            return {
+                "current_rate_limit_per_sec": round(self.bucket.rate, 2),
+                "observed_rate_per_sec": round(len(self._recent) / 60.0, 2),
+                "concurrency_limit": int(self.concurrency_limit),
+                "in_flight": self.in_flight,
+                "total_requests": self.total_requests,
+                "total_throttled": self.total_throttled,
+                "avg_queue_wait_ms": round(self.total_wait / self.total_requests * 1000, 1) if self.total_requests else 0.0,
+                "max_queue_wait_ms": round(self.max_wait * 1000, 1),
+            }
+
+
+class _Slot:
+    def __init__(self):
+        self.outcome = "success"
+
+    def throttled(self):
+        self.outcome = "throttled"
+
+    def neutral(self):
+        self.outcome = "neutral"
+
+
+class OutboundLimiter:
+    """Process-wide registry of ProviderLimiters keyed by provider and API key."""
+
+    def __init__(self, limits: Dict[str, Dict[str, float]], max_retries: int = 4, backoff_base: float = 0.5):
+        self.limits = limits
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, provider: str, key: Optional[str]) -> ProviderLimiter:
+        # Never keep raw API keys around, only a short fingerprint
+        key_id = hashlib.sha256(key.encode("utf-8")).hexdigest()[:8] if key else "default"
+        name = f"{provider}:{key_id}"
+        with self._lock:
+            if name not in self._limiters:
+                config = self.limits.get(provider, {"rate": 5.0, "concurrency": 4})
+                self._limiters[name] = ProviderLimiter(name, config["rate"], int(config["concurrency"]))
+            return self._limiters[name]
+
+    @contextmanager
+    def slot(self, provider: str, key: Optional[str] = None):
+        """Hold one rate + concurrency slot for the duration of an outbound call."""
+        limiter = self._limiter(provider, key)
+        limiter.acquire()
+        slot = _Slot()
+        try:
+            yield slot
+        except Exception as e:
+            if is_throttle_exception(e):
+                slot.throttled()
+            elif slot.outcome == "success":
+                slot.neutral()
+            raise
+        finally:
+            limiter.release(slot.outcome)
+
+    def call(self, provider: str, fn: Callable[[], Any], key: Optional[str] = None,
+             is_throttled: Callable[[Any], bool] = None, max_retries: int = None) -> Any:
+        """
+        Run fn through the provider's limiter, retrying with exponential backoff
+        while the provider reports throttling. If retries run out, the last
+        throttled result is returned (or the last throttling exception raised)
+        so callers keep their existing error handling.
+
+        Waiting and backoff block the calling thread, so async code runs this
+        through asyncio.to_thread. Wrapped boto3 clients must have their own
+        retries disabled (see BOTO_NO_RETRY), or each attempt here multiplies
+        into several.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            try:
+                with self.slot(provider, key) as slot:
+                    result = fn()
+                    if is_throttled is not None and is_throttled(result):
+                        slot.throttled()
+                        retry_after = _retry_after_seconds(result)
+                    else:
+                        return result
+            except Exception as e:
+                if not is_throttle_exception(e) or attempt == max_retries:
+                    raise
+
+            if attempt == max_retries:
+                return result
+
+            delay = retry_after if retry_after is not None else self.backoff_base * (2 ** attempt)
+            delay = delay * (1.0 + random.random() * 0.25)
+            logger.warning("%s throttled, retrying in %.2fs (attempt %d/%d)", provider, delay, attempt + 1, max_retries)
+            time.sleep(delay)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.metrics() for name, limiter in limiters.items()}
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+outbound_limiter = OutboundLimiter(
+    limits={
+        "openai": {"rate": settings.OPENAI_MAX_RPS, "concurrency": settings.OPENAI_MAX_CONCURRENCY},
+        "assemblyai": {"rate": settings.ASSEMBLYAI_MAX_RPS, "concurrency": settings.ASSEMBLYAI_MAX_CONCURRENCY},
+        "rekognition": {"rate": settings.REKOGNITION_MAX_RPS, "concurrency": settings.REKOGNITION_MAX_CONCURRENCY},
+    },
+    max_retries=settings.OUTBOUND_MAX_RETRIES,
+)
@@ -6,7 +6,13 @@ db = mongo_client[settings.DATABASE_NAME]
 videos_collection = db['videos']
 audio_analysis_collection = db['audio_analysis']
 text_analysis_collection = db['text_analysis']
+text_batch_requests_collection = db['text_batch_requests']
+text_batches_collection = db['text_batches']
 image_analysis_collection = db['image_analysis']
+rekognition_archive_collection = db['rekognition_archive']
+jobs_collection = db['jobs']
+job_queue_state_collection = db['job_queue_state']
+processing_batches_collection = db['processing_batches']
 users_collection = db["users"]
 orgs_collection = db["organisations"]
 org_licenses_collection = db["licenses"]
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Local stand-in for the AssemblyAI transcript API (POST /v2/transcript,
+GET /v2/transcript/{id}).
+
+Every job returns the recorded fixture transcript once `transcribe_delay`
+seconds have passed since submission; until then polls report "processing".
+
+Run standalone with `python -m local_testing.fake_assemblyai --port 8402`.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+
+from local_testing.fake_http import FakeHTTPServer
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "assemblyai_transcript.json")
+
+
+class FakeAssemblyAIServer(FakeHTTPServer):
+    base_path = "/v2"
+
+    def __init__(self, host="127.0.0.1", port=0, transcribe_delay=0.0, fixture_path=DEFAULT_FIXTURE, **kwargs):
+        super().__init__(host=host, port=port, **kwargs)
+        self.transcribe_delay = transcribe_delay
+        with open(fixture_path) as f:
+            self.fixture = json.load(f)
+        self.jobs = {}
+        self._jobs_lock = threading.Lock()
+
+    def handle(self, handler, method, path, body):
+        parts = path.strip("/").split("/")
+
+        if method == "POST" and path == "/v2/transcript":
+            payload = json.loads(body or b"{}")
+            if not payload.get("audio_url"):
+                return 400, {"error": "audio_url is required"}
+            transcript_id = uuid.uuid4().hex
+            with self._jobs_lock:
+                self.jobs[transcript_id] = {"submitted_at": time.time(), "audio_url": payload["audio_url"]}
+            return 200, {"id": transcript_id, "status": "queued", "audio_url": payload["audio_url"]}
+
+        if method == "GET" and len(parts) == 3 and parts[:2] == ["v2", "transcript"]:
+            job = self.jobs.get(parts[2])
+            if job is None:
+                return 404, {"error": "transcript not found"}
+            if time.time() - job["submitted_at"] < self.transcribe_delay:
+                return 200, {"id": parts[2], "status": "processing"}
+            return 200, {**self.fixture, "id": parts[2], "audio_url": job["audio_url"]}
+
+        return 404, {"error": f"unknown path {path}"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the AssemblyAI transcript API")
+    parser.add_argument("--port", type=int, default=8402)
+    parser.add_argument("--transcribe-delay", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+
+    fake = FakeAssemblyAIServer(port=args.port, transcribe_delay=args.transcribe_delay, fixture_path=args.fixture,
+                                latency=args.latency, error_rate=args.error_rate)
+    print(f"Fake AssemblyAI listening on {fake.url}")
+    fake.serve_forever()
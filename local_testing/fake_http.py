@@ -0,0 +1,149 @@
+"""
+Shared plumbing for the local stand-in API servers.
+
+Each fake runs a ThreadingHTTPServer on a background thread and can inject a
+fixed per-request latency, a random error rate and a bandwidth cap on response
+bodies. It also counts requests, TCP connections and body bytes sent, so
+callers can see whether HTTP keep-alive is being reused and how much was read.
+A handle() override can set handler.cut_body_at to drop the connection after
+that many body bytes, as a network failure would.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+
+
+class FakeHTTPServer:
+    # Path prefix the real API is mounted under, e.g. "/v1"
+    base_path = ""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, error_status=500, seed=None,
+                 bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth  # response body bytes per second per request; None = unthrottled
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.request_log = []
+        self.stats = {"connections": 0, "requests": 0, "injected_errors": 0, "bytes_sent": 0}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{self.base_path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"connections": 0, "requests": 0, "injected_errors": 0, "bytes_sent": 0}
+            self.request_log = []
+
+    # ---------- OVERRIDES ----------
+    def handle(self, handler, method, path, body):
+        """
+        Return (status, payload) where payload is a dict (JSON) or bytes, or
+        (status, payload, headers) to add response headers.
+        """
+        return 404, {"error": f"unknown path {path}"}
+
+    # ---------- HTTP ----------
+    def _should_fail(self):
+        with self._lock:
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.stats["injected_errors"] += 1
+            return fail
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.stats["connections"] += 1
+
+            def _dispatch(self, method):
+                self.cut_body_at = None
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                with server._lock:
+                    server.stats["requests"] += 1
+                    server.request_log.append((method, self.path))
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server._should_fail():
+                    status, payload, headers = server.error_status, {"error": "injected failure"}, {}
+                else:
+                    status, payload, *extra = server.handle(self, method, self.path, body)
+                    headers = extra[0] if extra else {}
+                self._send(status, payload, headers, with_body=method != "HEAD")
+
+            def _send(self, status, payload, headers=None, with_body=True):
+                if isinstance(payload, (bytes, bytearray)):
+                    data, content_type = bytes(payload), "application/octet-stream"
+                else:
+                    data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if self.close_connection:
+                    # Say so, or clients like FFmpeg try to reuse the socket for their next range
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                if with_body:
+                    self._write_body(data)
+
+            def _write_body(self, data):
+                if self.cut_body_at is not None:
+                    # Content-Length still promises the whole body; the client sees a short read
+                    data = data[:self.cut_body_at]
+                    self.close_connection = True
+                chunk = 64 * 1024 if server.bandwidth else len(data) or 1
+                try:
+                    for start in range(0, len(data), chunk):
+                        self.wfile.write(data[start:start + chunk])
+                        with server._lock:
+                            server.stats["bytes_sent"] += len(data[start:start + chunk])
+                        if server.bandwidth:
+                            time.sleep(chunk / server.bandwidth)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Clients that seek drop the connection mid-body
+                    self.close_connection = True
+
+            def do_HEAD(self):
+                self._dispatch("HEAD")
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        return Handler
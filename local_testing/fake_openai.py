@@ -0,0 +1,168 @@
+"""
+Local stand-in for the OpenAI endpoints used by the text pipeline.
+
+Serves /v1/chat/completions and the batch flow (/v1/files, /v1/batches,
+/v1/files/{id}/content) from canned GPT insights so the sync and batch modes
+can be exercised without network access:
+
+    server = FakeOpenAIServer(batch_delay=1.0).start()
+    settings.OPENAI_API_URL = server.url
+    ...
+    server.stop()
+
+Run standalone with `python -m local_testing.fake_openai --port 8401`.
+"""
+from email.parser import BytesParser
+from email.policy import default as default_policy
+import argparse
+import json
+import time
+import uuid
+
+from local_testing.fake_http import FakeHTTPServer
+
+DEFAULT_INSIGHTS = {
+    "clarity": 78,
+    "confidence_level": "medium",
+    "emotional_tone": "positive",
+    "repetition_score": 22,
+    "choice_of_words": {
+        "appreciated": ["clear structure"],
+        "avoided": [{"word": "basically", "alternative": "in short"}],
+    },
+    "swot_feedback": {
+        "strengths": ["Confident opening"],
+        "weaknesses": ["Some filler words"],
+        "opportunities": ["Add a concrete example"],
+        "threats": ["Pace may lose listeners"],
+    },
+    "strategic_way_forward": {
+        "short_term": ["Pause instead of using fillers"],
+        "long_term": ["Record and review weekly"],
+    },
+}
+
+
+def chat_completion_body(insights=None):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "model": "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": json.dumps(insights or DEFAULT_INSIGHTS)},
+            "finish_reason": "stop",
+        }],
+    }
+
+
+class FakeOpenAIServer(FakeHTTPServer):
+    base_path = "/v1"
+
+    def __init__(self, host="127.0.0.1", port=0, batch_delay=0.0, insights=None, fail_custom_ids=None, **kwargs):
+        super().__init__(host=host, port=port, **kwargs)
+        self.batch_delay = batch_delay
+        self.insights = insights or DEFAULT_INSIGHTS
+        self.fail_custom_ids = set(fail_custom_ids or [])
+        self.files = {}
+        self.batches = {}
+
+    # ---------- BATCH STATE ----------
+    def _create_batch(self, input_file_id):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "input_file_id": input_file_id,
+                "status": "validating",
+                "created_at": time.time(),
+                "output_file_id": None,
+                "error_file_id": None,
+            }
+        return self.batches[batch_id]
+
+    def _refresh_batch(self, batch_id):
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            if batch is None or batch["status"] == "completed":
+                return batch
+            if time.time() - batch["created_at"] < self.batch_delay:
+                batch["status"] = "in_progress"
+                return batch
+
+            output_lines = []
+            for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item["custom_id"] in self.fail_custom_ids:
+                    response = {"status_code": 500, "body": {"error": {"message": "injected failure"}}}
+                else:
+                    response = {"status_code": 200, "body": chat_completion_body(self.insights)}
+                output_lines.append(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": item["custom_id"],
+                    "response": response,
+                    "error": None,
+                }))
+
+            output_file_id = f"file-{uuid.uuid4().hex[:12]}"
+            self.files[output_file_id] = "\n".join(output_lines).encode("utf-8")
+            batch["output_file_id"] = output_file_id
+            batch["status"] = "completed"
+            return batch
+
+    # ---------- HTTP ----------
+    def handle(self, handler, method, path, body):
+        parts = path.strip("/").split("/")
+
+        if method == "POST" and path == "/v1/chat/completions":
+            return 200, chat_completion_body(self.insights)
+
+        if method == "POST" and path == "/v1/files":
+            message = BytesParser(policy=default_policy).parsebytes(
+                f"Content-Type: {handler.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body
+            )
+            content = None
+            for part in message.iter_parts():
+                if part.get_param("name", header="content-disposition") == "file":
+                    content = part.get_payload(decode=True)
+            if content is None:
+                return 400, {"error": {"message": "file part missing"}}
+            file_id = f"file-{uuid.uuid4().hex[:12]}"
+            self.files[file_id] = content
+            return 200, {"id": file_id, "object": "file", "purpose": "batch"}
+
+        if method == "POST" and path == "/v1/batches":
+            payload = json.loads(body or b"{}")
+            if payload.get("input_file_id") not in self.files:
+                return 400, {"error": {"message": "unknown input_file_id"}}
+            return 200, self._create_batch(payload["input_file_id"])
+
+        if method == "GET" and len(parts) == 3 and parts[:2] == ["v1", "batches"]:
+            batch = self._refresh_batch(parts[2])
+            if batch is None:
+                return 404, {"error": {"message": "batch not found"}}
+            return 200, batch
+
+        if method == "GET" and len(parts) == 4 and parts[:2] == ["v1", "files"] and parts[3] == "content":
+            content = self.files.get(parts[2])
+            if content is None:
+                return 404, {"error": {"message": "file not found"}}
+            return 200, content
+
+        return 404, {"error": {"message": f"unknown path {path}"}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat and batch APIs")
+    parser.add_argument("--port", type=int, default=8401)
+    parser.add_argument("--batch-delay", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeOpenAIServer(port=args.port, batch_delay=args.batch_delay, latency=args.latency, error_rate=args.error_rate)
+    print(f"Fake OpenAI listening on {fake.url}")
+    fake.serve_forever()
@@ -0,0 +1,186 @@
+"""
+Local stand-in for the boto3 Rekognition client used by VisualAnalyzer.
+
+detect_faces returns a canned single-face response whose pose, gaze and
+emotions are derived from a checksum of the image bytes, so the same frame
+always yields the same FaceDetails regardless of call order or concurrency.
+Latency and throttling can be injected to exercise the pipelined visual mode:
+
+    client = FakeRekognitionClient(latency=0.2)
+    analyzer = VisualAnalyzer(rekognition_client=client, max_in_flight=8)
+
+start_face_detection / get_face_detection emulate a Rekognition Video job on
+an S3 object: the job stays IN_PROGRESS for job_delay seconds, then pages
+through faces reported every sample_interval_ms of video_duration seconds.
+A repeated ClientRequestToken returns the job it first started, as the real
+service does. fail_jobs makes jobs end FAILED, and lost_starts drops the
+response of the first n accepted starts (raised as a throttle, so the caller
+retries) to exercise that idempotency.
+"""
+import random
+import threading
+import time
+import uuid
+import zlib
+
+from botocore.exceptions import ClientError
+
+EMOTION_TYPES = ["CALM", "HAPPY", "CONFUSED", "SURPRISED", "SAD", "FEAR", "ANGRY", "DISGUSTED"]
+LANDMARK_TYPES = [
+    "eyeLeft", "eyeRight", "nose", "mouthLeft", "mouthRight", "leftEyeBrowLeft",
+    "leftEyeBrowRight", "rightEyeBrowLeft", "rightEyeBrowRight", "mouthUp", "mouthDown", "chinBottom",
+]
+
+
+def face_details_for(image_bytes, no_face_ratio=0.0):
+    """Deterministic FaceDetails for one encoded image."""
+    rng = random.Random(zlib.crc32(image_bytes))
+    if rng.random() < no_face_ratio:
+        return []
+
+    weights = [rng.random() for _ in EMOTION_TYPES]
+    weights[0] += 1.5  # mostly calm, like a typical presenter
+    total = sum(weights)
+    emotions = sorted(
+        ({"Type": t, "Confidence": round(w / total * 100, 3)} for t, w in zip(EMOTION_TYPES, weights)),
+        key=lambda e: e["Confidence"],
+        reverse=True,
+    )
+
+    landmark_count = 12 - rng.randint(0, 3)
+    return [{
+        "BoundingBox": {"Width": 0.25, "Height": 0.4, "Left": 0.38, "Top": 0.2},
+        "Confidence": round(rng.uniform(90.0, 99.99), 3),
+        "Emotions": emotions,
+        "Pose": {
+            "Yaw": round(rng.uniform(-25, 25), 3),
+            "Pitch": round(rng.uniform(-20, 20), 3),
+            "Roll": round(rng.uniform(-10, 10), 3),
+        },
+        "EyeDirection": {
+            "Yaw": round(rng.uniform(-15, 15), 3),
+            "Pitch": round(rng.uniform(-12, 12), 3),
+            "Confidence": 95.0,
+        },
+        "Landmarks": [
+            {"Type": t, "X": round(rng.random(), 4), "Y": round(rng.random(), 4)}
+            for t in LANDMARK_TYPES[:landmark_count]
+        ],
+        "Quality": {
+            "Brightness": round(rng.uniform(40, 90), 3),
+            "Sharpness": round(rng.uniform(50, 95), 3),
+        },
+    }]
+
+
+class FakeRekognitionClient:
+    def __init__(self, latency=0.0, throttle_rate=0.0, no_face_ratio=0.0, seed=None,
+                 job_delay=0.0, video_duration=30.0, sample_interval_ms=200, fail_jobs=False, lost_starts=0):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.no_face_ratio = no_face_ratio
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "throttled": 0, "bytes_received": 0, "max_in_flight": 0}
+        self._in_flight = 0
+
+        self.job_delay = job_delay
+        self.video_duration = video_duration
+        self.sample_interval_ms = sample_interval_ms
+        self.fail_jobs = fail_jobs
+        self.lost_starts = lost_starts
+        self.jobs = {}
+        self._tokens = {}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"calls": 0, "throttled": 0, "bytes_received": 0, "max_in_flight": 0}
+
+    def detect_faces(self, Image, Attributes=None):
+        image_bytes = Image["Bytes"]
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["bytes_received"] += len(image_bytes)
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            throttle = self._rng.random() < self.throttle_rate
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if throttle:
+                with self._lock:
+                    self.stats["throttled"] += 1
+                raise ClientError(
+                    {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                    "DetectFaces",
+                )
+            return {"FaceDetails": face_details_for(image_bytes, self.no_face_ratio)}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    # ---------- REKOGNITION VIDEO ----------
+    def start_face_detection(self, Video, FaceAttributes="DEFAULT", ClientRequestToken=None, **kwargs):
+        s3_object = Video["S3Object"]
+        with self._lock:
+            self.stats["calls"] += 1
+            job_id = self._tokens.get(ClientRequestToken) if ClientRequestToken else None
+            if job_id is None:
+                job_id = uuid.uuid4().hex
+                self.jobs[job_id] = {
+                    "started_at": time.time(),
+                    "object": f"{s3_object['Bucket']}/{s3_object['Name']}",
+                    "attributes": FaceAttributes,
+                }
+                if ClientRequestToken:
+                    self._tokens[ClientRequestToken] = job_id
+            lost = self.lost_starts > 0
+            if lost:
+                self.lost_starts -= 1
+        if lost:
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                "StartFaceDetection",
+            )
+        return {"JobId": job_id}
+
+    def _video_faces(self, job):
+        faces = []
+        for timestamp in range(0, int(self.video_duration * 1000), self.sample_interval_ms):
+            for face in face_details_for(f"{job['object']}@{timestamp}".encode("utf-8"), self.no_face_ratio):
+                face.pop("EyeDirection", None)  # not part of Rekognition Video's FaceDetail
+                faces.append({"Timestamp": timestamp, "Face": face})
+        return faces
+
+    def get_face_detection(self, JobId, MaxResults=1000, NextToken=None, **kwargs):
+        with self._lock:
+            self.stats["calls"] += 1
+        job = self.jobs.get(JobId)
+        if job is None:
+            raise ClientError(
+                {"Error": {"Code": "ResourceNotFoundException", "Message": "Job not found"}},
+                "GetFaceDetection",
+            )
+        if time.time() - job["started_at"] < self.job_delay:
+            return {"JobStatus": "IN_PROGRESS"}
+        if self.fail_jobs:
+            return {"JobStatus": "FAILED", "StatusMessage": "Unsupported codec"}
+
+        faces = self._video_faces(job)
+        start = int(NextToken or 0)
+        page = {
+            "JobStatus": "SUCCEEDED",
+            "VideoMetadata": {
+                "Codec": "h264",
+                "DurationMillis": int(self.video_duration * 1000),
+                "Format": "QuickTime / MOV",
+                "FrameRate": 30.0,
+                "FrameHeight": 720,
+                "FrameWidth": 1280,
+            },
+            "Faces": faces[start:start + MaxResults],
+        }
+        if start + MaxResults < len(faces):
+            page["NextToken"] = str(start + MaxResults)
+        return page
@@ -0,0 +1,124 @@
+"""
+Local stand-in for the S3 object reads the visual pipeline makes.
+
+FakeS3Server serves objects at /{bucket}/{key} with HEAD and ranged GETs
+(`Range: bytes=a-b`, `bytes=a-`, `bytes=-n`), the way a presigned S3 URL does.
+FFmpeg relies on these to seek to the moov atom and to sampled frames.
+With cut_after_ranges=n, the ranged GET after the first n has its connection
+dropped cut_fraction of the way through its body, and every later ranged GET
+gets 403, like a presigned URL that expired while a stream was being read.
+Plain GETs (the download path) are unaffected. FakeS3Client mirrors the boto3 calls used against it: generate_presigned_url,
+head_object and download_file.
+
+    server = FakeS3Server(bandwidth=20 * 1024 * 1024).start()
+    server.put_file("bucket", "videos/talk.mp4", "talk.mp4")
+    client = FakeS3Client(server)
+
+Run standalone with `python -m local_testing.fake_s3 --port 8404 --file bucket/key=talk.mp4`.
+"""
+import argparse
+import re
+import threading
+import types
+import urllib.request
+from urllib.parse import unquote, urlsplit
+
+from botocore.exceptions import ClientError
+
+from local_testing.fake_http import FakeHTTPServer
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class FakeS3Server(FakeHTTPServer):
+    def __init__(self, host="127.0.0.1", port=0, cut_after_ranges=None, cut_fraction=0.5, **kwargs):
+        super().__init__(host=host, port=port, **kwargs)
+        self.cut_after_ranges = cut_after_ranges
+        self.cut_fraction = cut_fraction
+        self.ranges_served = 0
+        self.objects = {}
+        self._objects_lock = threading.Lock()
+
+    def put_object(self, bucket, key, data):
+        with self._objects_lock:
+            self.objects[(bucket, key)] = bytes(data)
+
+    def put_file(self, bucket, key, path):
+        with open(path, "rb") as f:
+            self.put_object(bucket, key, f.read())
+
+    def handle(self, handler, method, path, body):
+        bucket, _, key = unquote(urlsplit(path).path).lstrip("/").partition("/")
+        data = self.objects.get((bucket, key))
+        if data is None:
+            return 404, {"Code": "NoSuchKey", "Key": key}
+
+        size = len(data)
+        headers = {"Accept-Ranges": "bytes"}
+        requested = handler.headers.get("Range")
+        if method == "HEAD" or not requested:
+            return 200, data, headers  # HEAD sends only the headers
+
+        match = RANGE_PATTERN.match(requested.strip())
+        if not match or match.groups() == ("", ""):
+            return 416, b"", {**headers, "Content-Range": f"bytes */{size}"}
+        first, last = match.groups()
+        if first == "":
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = int(first), min(size - 1, int(last)) if last else size - 1
+        if start >= size or start > end:
+            return 416, b"", {**headers, "Content-Range": f"bytes */{size}"}
+        with self._objects_lock:
+            self.ranges_served += 1
+            served = self.ranges_served
+        if self.cut_after_ranges is not None and served > self.cut_after_ranges:
+            if served > self.cut_after_ranges + 1:
+                return 403, {"Code": "AccessDenied", "Message": "Request has expired"}
+            handler.cut_body_at = int((end + 1 - start) * self.cut_fraction)
+        return 206, data[start:end + 1], {**headers, "Content-Range": f"bytes {start}-{end}/{size}"}
+
+
+class FakeS3Client:
+    exceptions = types.SimpleNamespace(ClientError=ClientError)
+
+    def __init__(self, server):
+        self.server = server
+
+    def _url(self, bucket, key):
+        host, port = self.server._httpd.server_address[:2]
+        return f"http://{host}:{port}/{bucket}/{key}"
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600, **kwargs):
+        return f"{self._url(Params['Bucket'], Params['Key'])}?X-Amz-Expires={ExpiresIn}&X-Amz-Signature=fake"
+
+    def head_object(self, Bucket, Key):
+        data = self.server.objects.get((Bucket, Key))
+        if data is None:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": len(data)}
+
+    def download_file(self, Bucket, Key, Filename):
+        self.head_object(Bucket, Key)
+        with urllib.request.urlopen(self._url(Bucket, Key)) as response, open(Filename, "wb") as f:
+            while True:
+                chunk = response.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for S3 object reads with ranged GETs")
+    parser.add_argument("--port", type=int, default=8404)
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes per second per request")
+    parser.add_argument("--file", action="append", default=[], help="bucket/key=path to serve")
+    args = parser.parse_args()
+
+    server = FakeS3Server(port=args.port, bandwidth=args.bandwidth)
+    for spec in args.file:
+        target, _, path = spec.partition("=")
+        bucket, _, key = target.partition("/")
+        server.put_file(bucket, key, path)
+    print(f"Fake S3 listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,171 @@
+"""
+Walks the job queue through its whole lifecycle against a throwaway collection:
+priorities, atomic claims, heartbeat, lease expiry, retry with backoff,
+dead-lettering, requeue, the async consumer and the fair-queuing tag
+backfill. Time is driven by FakeClock, so no step waits for a real timeout.
+Every queue setting is passed explicitly, so no credentials or env vars are needed.
+
+    python -m local_testing.job_queue_lifecycle                      # mongomock
+    python -m local_testing.job_queue_lifecycle --mongo-uri mongodb://localhost:27017
+
+Every step is checked; the first mismatch raises AssertionError.
+"""
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from core.job_queue import COMPLETED, DEAD, LEASED, QUEUED, JobConsumer, JobQueue
+
+
+class FakeClock:
+    def __init__(self, start=None):
+        self.now = start or datetime(2024, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def _collection(mongo_uri=None):
+    if mongo_uri:
+        from pymongo import MongoClient
+        return MongoClient(mongo_uri)["job_queue_lifecycle"][f"jobs_{uuid.uuid4().hex[:8]}"]
+    import mongomock
+    return mongomock.MongoClient()["job_queue_lifecycle"]["jobs"]
+
+
+def run_lifecycle(collection):
+    clock = FakeClock()
+    dead = []
+    queue = JobQueue(collection=collection, visibility_timeout=60, max_attempts=2, backoff_base=10,
+                     backoff_max=100, backoff_jitter=0.0, clock=clock, on_dead=lambda job, e: dead.append(job["_id"]))
+    queue.ensure_indexes()
+    steps = []
+
+    low = queue.enqueue("text", {"n": 1}, priority=-10)
+    high = queue.enqueue("audio", {"n": 2}, priority=5)
+    later = queue.enqueue("image", {"n": 3}, delay=30)
+
+    job = queue.claim(worker_id="w1")
+    assert job["_id"] == high and job["status"] == LEASED and job["attempts"] == 1
+    steps.append("highest priority claimed first")
+
+    assert queue.claim(kinds=["image"], worker_id="w2") is None
+    steps.append("delayed job not claimable before available_at")
+
+    clock.advance(50)
+    assert queue.heartbeat(job)
+    clock.advance(50)
+    assert queue.claim(kinds=["audio"], worker_id="w2") is None
+    steps.append("heartbeat keeps the lease past the visibility timeout")
+
+    clock.advance(61)
+    stolen = queue.claim(kinds=["audio"], worker_id="w2")
+    assert stolen["_id"] == high and stolen["attempts"] == 2 and stolen["lease_owner"] == "w2"
+    assert not queue.heartbeat(job) and not queue.complete(job)
+    steps.append("expired lease reclaimed by another worker; the old holder is fenced off")
+
+    assert queue.fail(stolen, RuntimeError("boom")) == DEAD and dead == [high]
+    assert collection.find_one({"_id": high})["status"] == DEAD
+    steps.append("failure on the last attempt dead-letters and runs on_dead")
+
+    job = queue.claim(kinds=["text"], worker_id="w1")
+    assert job["_id"] == low
+    assert queue.fail(job, ValueError("transient")) == "retry"
+    doc = collection.find_one({"_id": low})
+    assert doc["status"] == QUEUED and doc["available_at"] == clock() + timedelta(seconds=10)
+    assert queue.claim(kinds=["text"], worker_id="w1") is None
+    clock.advance(10)
+    job = queue.claim(kinds=["text"], worker_id="w1")
+    assert job["_id"] == low and job["attempts"] == 2
+    assert queue.complete(job) and collection.find_one({"_id": low})["status"] == COMPLETED
+    steps.append("failed attempt retried after backoff, then completed")
+
+    job = queue.claim(kinds=["image"], worker_id="w1")
+    assert job["_id"] == later
+    clock.advance(61)
+    job = queue.claim(kinds=["image"], worker_id="w2")
+    assert job["attempts"] == 2
+    clock.advance(61)
+    assert queue.claim(kinds=["image"], worker_id="w3") is None
+    assert collection.find_one({"_id": later})["status"] == DEAD and dead == [high, later]
+    steps.append("lease expiring on the final attempt dead-letters at the next claim")
+
+    assert queue.requeue_dead(later)
+    assert queue.claim(kinds=["image"], worker_id="w1")["attempts"] == 1
+    steps.append("dead job requeued with fresh attempts")
+
+    assert queue.stats() == {"audio": {DEAD: 1}, "text": {COMPLETED: 1}, "image": {LEASED: 1}}
+    steps.append("stats by kind and status")
+
+    ran = []
+
+    def handler(n):
+        ran.append(n)
+        if n == 2:
+            raise RuntimeError("always fails")
+
+    consumer_queue = JobQueue(collection=collection, visibility_timeout=60, max_attempts=2, backoff_base=0,
+                              backoff_max=0, backoff_jitter=0.0, on_dead=lambda job, e: dead.append(job["_id"]))
+    ok = consumer_queue.enqueue("consume", {"n": 1})
+    bad = consumer_queue.enqueue("consume", {"n": 2})
+    consumer = JobConsumer(consumer_queue, {"consume": handler}, concurrency=2, poll_interval=0.01,
+                           heartbeat_interval=0.01, worker_id="c1")
+
+    async def consume():
+        task = asyncio.create_task(consumer.run())
+        while collection.count_documents({"kind": "consume", "status": {"$in": [QUEUED, LEASED]}}):
+            await asyncio.sleep(0.01)
+        consumer.stop()
+        await consumer.drain()
+        task.cancel()
+
+    asyncio.run(consume())
+    assert collection.find_one({"_id": ok})["status"] == COMPLETED
+    assert collection.find_one({"_id": bad})["status"] == DEAD and dead[-1] == bad
+    assert sorted(ran) == [1, 2, 2]
+    steps.append("consumer completes good jobs and dead-letters a failing one after its retries")
+
+    plain = JobQueue(collection=collection, visibility_timeout=60, max_attempts=2, backoff_base=10, backoff_max=100,
+                     clock=clock)
+    fair = JobQueue(collection=collection, state_collection=collection.database[f"{collection.name}_state"],
+                    policy=EqualShares(), visibility_timeout=60, max_attempts=2, backoff_base=10, backoff_max=100,
+                    clock=clock, capped_orgs_ttl=0)
+    flood = [fair.enqueue("fair", {}, org_id="a") for _ in range(3)]
+    fair.enqueue("fair", {}, org_id="b")
+    untagged = plain.enqueue("fair", {}, org_id="b")
+    rival = JobQueue(collection=collection, state_collection=fair.state_collection, policy=EqualShares(),
+                     visibility_timeout=60, max_attempts=2, backoff_base=10, backoff_max=100, clock=clock,
+                     capped_orgs_ttl=0)
+    assert fair.backfill_virtual_tags() == 1 and rival.backfill_virtual_tags() == 0
+    assert collection.find_one({"_id": untagged})["virtual_finish"] == 2.0
+    assert fair.state_collection.find_one({"_id": "org:b"})["last_finish"] == 2.0
+    claimed = [fair.claim(kinds=["fair"], worker_id="w1")["_id"] for _ in range(4)]
+    assert claimed[0] == flood[0] and claimed.index(untagged) == 3
+    assert plain.backfill_virtual_tags() == 0 and collection.find_one({"_id": flood[2]})["virtual_finish"] == 3.0
+    steps.append("untagged jobs get their org's next fair-queuing tag once; a queue without a policy keeps tags")
+    return steps
+
+
+class EqualShares:
+    """Org policy stand-in: every org weight 1, no priority boost, no concurrency cap."""
+
+    def terms(self, org_id):
+        return {"weight": 1.0, "priority": 0, "max_concurrent": 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise the job queue lifecycle against mongomock or MongoDB")
+    parser.add_argument("--mongo-uri", default=None, help="use a real MongoDB instead of mongomock")
+    args = parser.parse_args()
+
+    collection = _collection(args.mongo_uri)
+    try:
+        for step in run_lifecycle(collection):
+            print(f"ok  {step}")
+    finally:
+        if args.mongo_uri:
+            collection.drop()
@@ -0,0 +1,81 @@
+"""
+Drives the offline text batch mode through submit -> collect against the
+local fake OpenAI server and mongomock collections:
+
+  * two pending requests for the same video (a re-run while the first is
+    still pending) go into one batch with distinct custom_ids and both
+    finalise from their own result line,
+  * a failed result line fails only its own request,
+  * a batch whose results cannot be downloaded is marked failed without
+    holding up the other batches collected in the same pass.
+
+    python -m local_testing.text_batch_roundtrip
+
+Every step is checked; the first mismatch raises AssertionError.
+"""
+import json
+
+from bson import ObjectId
+
+from local_testing.fake_assemblyai import DEFAULT_FIXTURE
+from local_testing.fake_openai import FakeOpenAIServer
+import processors.text_batch as text_batch
+import processors.text_processor as text_processor
+
+
+def _use_collections(database):
+    for module in (text_batch, text_processor):
+        for name in ("text_analysis_collection", "text_batch_requests_collection", "text_batches_collection",
+                     "videos_collection"):
+            if hasattr(module, name):
+                setattr(module, name, database[name])
+
+
+def run_roundtrip(database, server):
+    _use_collections(database)
+    requests_collection, batches = database["text_batch_requests_collection"], database["text_batches_collection"]
+    with open(DEFAULT_FIXTURE) as f:
+        transcript = json.load(f)
+    processor = text_batch.TextBatchProcessor(api_url=server.url, api_key="local")
+    steps = []
+
+    rerun, other = ObjectId(), ObjectId()
+    for video_id in (rerun, rerun, other):
+        processor.enqueue(str(video_id), "Quarterly planning pitch", transcript)
+    first_batch = processor.submit_pending()
+    input_file = server.files[server.batches[first_batch]["input_file_id"]].decode("utf-8")
+    custom_ids = [json.loads(line)["custom_id"] for line in input_file.splitlines()]
+    assert len(custom_ids) == 3 and len(set(custom_ids)) == 3
+    steps.append("a video re-run while pending gets its own custom_id in the batch")
+
+    server.fail_custom_ids = {custom_ids[2]}
+    assert processor.collect() == 3
+    statuses = {str(doc["_id"]): doc["status"] for doc in requests_collection.find({"batch_id": first_batch})}
+    assert [statuses[c] for c in custom_ids] == ["completed", "completed", "failed"]
+    assert database["text_analysis_collection"].count_documents({"video_id": rerun, "analysis_results": {"$exists": True}}) == 2
+    steps.append("results map back through custom_id; a failed line fails only its request")
+
+    processor.enqueue(str(ObjectId()), "Broken batch", transcript)
+    broken_batch = processor.submit_pending()
+    processor.enqueue(str(ObjectId()), "Healthy batch", transcript)
+    healthy_batch = processor.submit_pending()
+    server._refresh_batch(broken_batch)
+    server.files.pop(server.batches[broken_batch]["output_file_id"])
+    assert processor.collect() == 2
+    assert batches.find_one({"batch_id": broken_batch})["status"] == "failed"
+    assert batches.find_one({"batch_id": healthy_batch})["status"] == "completed"
+    assert requests_collection.find_one({"batch_id": broken_batch})["status"] == "failed"
+    assert requests_collection.find_one({"batch_id": healthy_batch})["status"] == "completed"
+    steps.append("an undownloadable batch fails alone; the next batch in the pass still completes")
+    return steps
+
+
+if __name__ == "__main__":
+    import mongomock
+
+    server = FakeOpenAIServer().start()
+    try:
+        for step in run_roundtrip(mongomock.MongoClient()["text_batch_roundtrip"], server):
+            print(f"ok  {step}")
+    finally:
+        server.stop()
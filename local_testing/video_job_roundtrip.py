@@ -0,0 +1,96 @@
+"""
+Drives RekognitionVideoAnalyzer through a Rekognition Video job against the
+local fake client:
+
+  * a wait longer than wait_slice raises JobPending carrying video_job, and a
+    fresh analyzer resumes from it without starting a second job, counting
+    the calls of both runs,
+  * results spread over several NextToken pages are all collected,
+  * faces map to sample times only within match_tolerance_sec, largest first,
+  * a FAILED job and a job that outlives timeout raise,
+  * a start whose response was lost is retried with the same
+    ClientRequestToken and yields one job, not two.
+
+    python -m local_testing.video_job_roundtrip
+
+Every step is checked; the first mismatch raises AssertionError.
+"""
+import time
+
+from core.job_queue import JobPending
+from local_testing.fake_rekognition import FakeRekognitionClient
+from processors.visual_video_job import RekognitionVideoAnalyzer
+
+BUCKET, KEY = "local-bucket", "interview.mp4"
+
+
+def _analyzer(client, **kwargs):
+    kwargs.setdefault("poll_interval", 0.05)
+    return RekognitionVideoAnalyzer(rekognition_client=client, frame_selection_mode="sequential",
+                                    archive_responses=False, **kwargs)
+
+
+def run_roundtrip():
+    steps = []
+
+    client = FakeRekognitionClient(job_delay=0.3, video_duration=10.0)
+    try:
+        _analyzer(client, wait_slice=0.1).process_s3_video(BUCKET, KEY)
+        raise AssertionError("a wait longer than wait_slice must raise JobPending")
+    except JobPending as pending:
+        video_job = pending.payload["video_job"]
+    assert video_job["calls"] >= 2 and len(client.jobs) == 1
+    time.sleep(0.3)
+    results = _analyzer(client).process_s3_video(BUCKET, KEY, video_job)
+    stats = results["processing_stats"]
+    assert len(client.jobs) == 1 and stats["job_id"] == video_job["job_id"]
+    assert stats["rekognition_calls"] == client.stats["calls"]
+    steps.append("JobPending carries video_job; the resumed run reuses the job and counts every call")
+
+    client = FakeRekognitionClient(video_duration=30.0, sample_interval_ms=10)
+    stats = _analyzer(client).process_s3_video(BUCKET, KEY)["processing_stats"]
+    assert stats["result_pages"] == 3 and stats["faces_returned"] == 3000
+    steps.append("results spread over NextToken pages are all collected")
+
+    small = {"BoundingBox": {"Width": 0.1, "Height": 0.1}, "Pose": {"Yaw": 5.0, "Pitch": -3.0}}
+    large = {"BoundingBox": {"Width": 0.3, "Height": 0.4}, "Pose": {"Yaw": 1.0, "Pitch": 2.0}}
+    faces = [{"Timestamp": 1000, "Face": small}, {"Timestamp": 1000, "Face": large}, {"Timestamp": 2400, "Face": small}]
+    responses = _analyzer(FakeRekognitionClient(), match_tolerance_sec=0.5)._responses_at(faces, [1.0, 1.4, 1.6, 2.0, 3.0])
+    assert [len(r["FaceDetails"]) for r in responses] == [2, 2, 0, 1, 0]
+    assert responses[0]["FaceDetails"][0]["BoundingBox"] == large["BoundingBox"]
+    assert responses[3]["FaceDetails"][0]["EyeDirection"] == {"Yaw": 5.0, "Pitch": -3.0}
+    client = FakeRekognitionClient(video_duration=10.0, sample_interval_ms=3000)
+    stats = _analyzer(client, match_tolerance_sec=0.5).process_s3_video(BUCKET, KEY)["processing_stats"]
+    assert stats["samples_without_face"] == 10 - 4
+    steps.append("faces map to samples within match_tolerance_sec, largest first, gaze from head pose")
+
+    try:
+        _analyzer(FakeRekognitionClient(fail_jobs=True)).process_s3_video(BUCKET, KEY)
+        raise AssertionError("a FAILED job must raise")
+    except RuntimeError as e:
+        assert "failed: Unsupported codec" in str(e)
+    try:
+        _analyzer(FakeRekognitionClient(job_delay=60), timeout=0.2, wait_slice=0).process_s3_video(BUCKET, KEY)
+        raise AssertionError("a job outliving timeout must raise")
+    except TimeoutError:
+        pass
+    client = FakeRekognitionClient(job_delay=60)
+    video_job = {"job_id": client.start_face_detection(Video={"S3Object": {"Bucket": BUCKET, "Name": KEY}})["JobId"],
+                 "started_at": time.time() - 10}
+    try:
+        _analyzer(client, timeout=5).process_s3_video(BUCKET, KEY, video_job)
+        raise AssertionError("a resumed job past its original start + timeout must raise")
+    except TimeoutError:
+        pass
+    steps.append("FAILED jobs and jobs outliving timeout (counted from the first start) raise")
+
+    client = FakeRekognitionClient(lost_starts=1)
+    stats = _analyzer(client).process_s3_video(BUCKET, KEY)["processing_stats"]
+    assert len(client.jobs) == 1 and stats["job_id"] in client.jobs
+    steps.append("a start retried after a lost response reuses its ClientRequestToken: one job")
+    return steps
+
+
+if __name__ == "__main__":
+    for step in run_roundtrip():
+        print(f"ok  {step}")
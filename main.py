@@ -1,9 +1,11 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from settings import settings
-from api import videos, processing, results, auth_routes, orgs,users
+from api import videos, processing, results, auth_routes, orgs,users, system
 
 app = FastAPI(
     title="PitchMentor Backend",
@@ -27,5 +29,31 @@ app.include_router(results.router, prefix="/api/videos", tags=["Results"])
 app.include_router(auth_routes.router)  # 👈 add this
 app.include_router(orgs.router) 
 app.include_router(users.router)
+app.include_router(system.router)
+
+
+# --- Embedded job consumer ---
+@app.on_event("startup")
+async def start_job_consumer():
+    if not settings.JOB_EMBEDDED_CONSUMER:
+        return
+    from core.job_queue import JobConsumer
+    from processors.jobs import JOB_HANDLERS, processing_queue
+
+    queue = processing_queue()
+    queue.ensure_indexes()
+    app.state.job_consumer = JobConsumer(queue, JOB_HANDLERS, concurrency=settings.JOB_EMBEDDED_CONCURRENCY)
+    app.state.job_consumer_task = asyncio.create_task(app.state.job_consumer.run())
+
+
+@app.on_event("shutdown")
+async def stop_job_consumer():
+    consumer = getattr(app.state, "job_consumer", None)
+    if consumer is None:
+        return
+    # Unfinished jobs are picked up again once their lease expires
+    consumer.stop()
+    app.state.job_consumer_task.cancel()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(settings.PORT or 8000))
@@ -325,18 +325,8 @@ async def process_video_audio(video_id: str, s3_bucket: str, s3_key: str):
     except Exception as e:
         logger.error(f"Error processing audio for video ID {video_id}: {e}")
         logger.error(traceback.format_exc())
-
-        audio_analysis_collection.insert_one({
-            "video_id": ObjectId(video_id),
-            "error": str(e),
-            "traceback": traceback.format_exc(),
-            "processed_at": datetime.utcnow()
-        })
-
-        videos_collection.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": {"status_audio": "failed"}}
-        )
+        # The job queue retries, and marks status_audio failed once attempts run out
+        raise
 
     finally:
         if temp_dir and os.path.exists(temp_dir):
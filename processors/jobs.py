@@ -0,0 +1,40 @@
+"""
+Job kinds run by the queue consumers, and what happens to the video once a job
+is dead-lettered. Payloads are the processors' keyword arguments.
+"""
+from typing import Any, Dict
+
+from core.job_queue import JobQueue
+from core.org_scheduling import fair_job_queue
+from core.logger import logger
+from db import videos_collection
+from processors.audio_processor import process_video_audio
+from processors.text_processor import process_video_text
+from processors.visual_processor import process_visual_analysis
+
+JOB_HANDLERS = {
+    "audio": process_video_audio,
+    "text": process_video_text,
+    "image": process_visual_analysis,
+}
+
+STATUS_FIELDS = {
+    "audio": "status_audio",
+    "text": "status_text",
+    "image": "status_image",
+}
+
+
+def mark_video_failed(job: Dict, error: Any) -> None:
+    """Dead-letter hook: the modality's status flips from processing to failed."""
+    if job.get("video_id") is None:
+        return
+    videos_collection.update_one(
+        {"_id": job["video_id"]},
+        {"$set": {STATUS_FIELDS[job["kind"]]: "failed"}}
+    )
+    logger.error("%s processing failed for video %s: %s", job["kind"], job["video_id"], error)
+
+
+def processing_queue(**kwargs) -> JobQueue:
+    return fair_job_queue(on_dead=mark_video_failed, **kwargs)
@@ -0,0 +1,261 @@
+from bson import ObjectId
+from datetime import datetime
+from typing import Dict, Any, Optional
+import argparse
+import json
+import time
+import uuid
+import requests
+
+from db import text_analysis_collection, text_batch_requests_collection, text_batches_collection, videos_collection
+from core.logger import logger
+from core.rate_limiter import outbound_limiter, is_throttled_response
+from processors.text_processor import TextProcessor, finalise_text_analysis
+from settings import settings
+
+# OpenAI batch states that will never produce more output
+TERMINAL_BATCH_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+class TextBatchProcessor:
+    """
+    Offline mode for the GPT-4o speech quality step.
+
+    Videos queued here already have their transcript and deterministic metrics;
+    only the LLM call is deferred. Pending requests are submitted together as one
+    OpenAI batch job, polled, and the results fanned back into text_analysis.
+    """
+
+    def __init__(self, api_url: str = None, api_key: str = None):
+        self.api_url = (api_url or settings.OPENAI_API_URL).rstrip("/")
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.processor = TextProcessor()
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        return outbound_limiter.call(
+            "openai",
+            lambda: requests.request(method, f"{self.api_url}{path}", headers=self._headers(), **kwargs),
+            key=self.api_key,
+            is_throttled=is_throttled_response,
+        )
+
+    # ---------- ENQUEUE ----------
+    def enqueue(self, video_id: str, description: str, transcript: Dict, word_timeline: Dict = None) -> None:
+        """Store the deterministic metrics and the pending GPT request for a video."""
+        metrics = self.processor.compute_transcript_metrics(transcript)
+        compact_text, compaction = self.processor.compact_transcript(transcript.get("text", "") or "")
+        metrics["prompt_compaction"] = compaction
+        text_batch_requests_collection.insert_one({
+            "video_id": ObjectId(video_id),
+            "status": "pending",
+            "description": description,
+            "metrics": metrics,
+            "request_body": self.processor.build_speech_quality_request(compact_text, description, compaction),
+            "word_timeline": word_timeline,
+            "created_at": datetime.utcnow(),
+        })
+        logger.info(f"Queued text analysis for batch LLM processing, video ID: {video_id}")
+
+    # ---------- SUBMIT ----------
+    def submit_pending(self, max_requests: int = None) -> Optional[str]:
+        """Submit up to max_requests pending analyses as one batch job. Returns the batch id."""
+        max_requests = max_requests or settings.TEXT_BATCH_MAX_REQUESTS
+        submit_token = uuid.uuid4().hex
+
+        # Claim pending requests so concurrent submitters never send a video twice
+        pending_ids = [
+            doc["_id"] for doc in text_batch_requests_collection.find(
+                {"status": "pending"}, {"_id": 1}
+            ).sort("created_at", 1).limit(max_requests)
+        ]
+        if not pending_ids:
+            return None
+
+        text_batch_requests_collection.update_many(
+            {"_id": {"$in": pending_ids}, "status": "pending"},
+            {"$set": {"status": "submitting", "submit_token": submit_token}}
+        )
+        claimed = list(text_batch_requests_collection.find({"submit_token": submit_token}))
+        if not claimed:
+            return None
+
+        # Keyed by the request, not the video: a video re-run while an earlier request is
+        # pending has two requests, and custom_id must be unique within a batch
+        lines = [
+            json.dumps({
+                "custom_id": str(doc["_id"]),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": doc["request_body"],
+            })
+            for doc in claimed
+        ]
+
+        try:
+            upload = self._request(
+                "POST",
+                "/files",
+                data={"purpose": "batch"},
+                files={"file": (f"text_batch_{submit_token}.jsonl", "\n".join(lines).encode("utf-8"))},
+                timeout=60,
+            )
+            if upload.status_code != 200:
+                raise Exception(f"OpenAI file upload error: {upload.status_code} - {upload.text}")
+
+            batch = self._request(
+                "POST",
+                "/batches",
+                json={
+                    "input_file_id": upload.json()["id"],
+                    "endpoint": "/v1/chat/completions",
+                    "completion_window": "24h",
+                },
+                timeout=60,
+            )
+            if batch.status_code != 200:
+                raise Exception(f"OpenAI batch create error: {batch.status_code} - {batch.text}")
+        except Exception:
+            # Release the claim so the next run retries these requests
+            text_batch_requests_collection.update_many(
+                {"submit_token": submit_token},
+                {"$set": {"status": "pending"}, "$unset": {"submit_token": ""}}
+            )
+            raise
+
+        batch_id = batch.json()["id"]
+        text_batches_collection.insert_one({
+            "batch_id": batch_id,
+            "status": batch.json().get("status", "validating"),
+            "request_count": len(claimed),
+            "submitted_at": datetime.utcnow(),
+        })
+        text_batch_requests_collection.update_many(
+            {"submit_token": submit_token},
+            {"$set": {"status": "submitted", "batch_id": batch_id}, "$unset": {"submit_token": ""}}
+        )
+
+        logger.info(f"Submitted OpenAI batch {batch_id} with {len(claimed)} text analyses")
+        return batch_id
+
+    # ---------- COLLECT ----------
+    def collect(self) -> int:
+        """Poll open batches and fan finished results back into text_analysis. Returns videos finalised."""
+        finalised = 0
+        for batch_doc in text_batches_collection.find({"status": {"$nin": list(TERMINAL_BATCH_STATES)}}):
+            # One broken batch must not hold up the others collected in this pass
+            try:
+                finalised += self._collect_batch(batch_doc)
+            except Exception as e:
+                logger.error(f"Failed to collect OpenAI batch {batch_doc['batch_id']}: {str(e)}")
+                text_batches_collection.update_one(
+                    {"_id": batch_doc["_id"]},
+                    {"$set": {"status": "failed", "error": str(e), "completed_at": datetime.utcnow()}}
+                )
+                # Fail its requests too, so their videos don't stay in processing
+                finalised += self._fan_out(batch_doc["batch_id"], {})
+        return finalised
+
+    def _collect_batch(self, batch_doc: Dict) -> int:
+        batch_id = batch_doc["batch_id"]
+        response = self._request("GET", f"/batches/{batch_id}", timeout=30)
+        if response.status_code != 200:
+            logger.error(f"Failed to poll OpenAI batch {batch_id}: {response.status_code} - {response.text}")
+            return 0
+
+        batch = response.json()
+        status = batch.get("status")
+        if status not in TERMINAL_BATCH_STATES:
+            text_batches_collection.update_one({"_id": batch_doc["_id"]}, {"$set": {"status": status}})
+            return 0
+
+        results = {}
+        for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+            if file_id:
+                results.update(self._download_results(file_id))
+
+        finalised = self._fan_out(batch_id, results)
+        text_batches_collection.update_one(
+            {"_id": batch_doc["_id"]},
+            {"$set": {"status": status, "completed_at": datetime.utcnow()}}
+        )
+        logger.info(f"OpenAI batch {batch_id} finished with status {status}")
+        return finalised
+
+    def _download_results(self, file_id: str) -> Dict[str, Dict[str, Any]]:
+        response = self._request("GET", f"/files/{file_id}/content", timeout=120)
+        if response.status_code != 200:
+            raise Exception(f"OpenAI file download error: {response.status_code} - {response.text}")
+
+        results = {}
+        for line in response.text.splitlines():
+            if line.strip():
+                item = json.loads(line)
+                results[item["custom_id"]] = item
+        return results
+
+    def _fan_out(self, batch_id: str, results: Dict[str, Dict[str, Any]]) -> int:
+        finalised = 0
+        for request_doc in text_batch_requests_collection.find({"batch_id": batch_id, "status": "submitted"}):
+            video_id = str(request_doc["video_id"])
+            item = results.get(str(request_doc["_id"]))
+            try:
+                if item is None:
+                    raise Exception("No result returned for this request")
+                response = item.get("response") or {}
+                if item.get("error") or response.get("status_code") != 200:
+                    raise Exception(f"OpenAI batch item error: {item.get('error') or response.get('body')}")
+
+                gpt_insights = self.processor.parse_speech_quality_response(response["body"])
+                analysis_results = self.processor.merge_gpt_insights(request_doc["metrics"], gpt_insights)
+                finalise_text_analysis(video_id, analysis_results, request_doc["description"], request_doc.get("word_timeline"))
+                status = "completed"
+            except Exception as e:
+                logger.error(f"Error in batch text analysis for video ID {video_id}: {str(e)}")
+                text_analysis_collection.insert_one({
+                    'video_id': request_doc["video_id"],
+                    'error': str(e),
+                    'processed_at': datetime.utcnow(),
+                    'description_context': request_doc["description"]
+                })
+                videos_collection.update_one({"_id": request_doc["video_id"]}, {"$set": {"status_text": "failed"}})
+                status = "failed"
+
+            text_batch_requests_collection.update_one(
+                {"_id": request_doc["_id"]},
+                {"$set": {"status": status, "finished_at": datetime.utcnow()}}
+            )
+            finalised += 1
+        return finalised
+
+
+def run_batch_loop(poll_interval: float = None, once: bool = False) -> None:
+    """Submit pending analyses and collect finished batches until interrupted."""
+    poll_interval = poll_interval or settings.TEXT_BATCH_POLL_INTERVAL
+    batch_processor = TextBatchProcessor()
+    while True:
+        try:
+            batch_processor.submit_pending()
+            batch_processor.collect()
+        except Exception as e:
+            logger.error(f"Text batch loop error: {str(e)}")
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Submit and collect offline GPT text analysis batches")
+    parser.add_argument("command", choices=["submit", "collect", "run"])
+    parser.add_argument("--max-requests", type=int, default=None)
+    parser.add_argument("--poll-interval", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        print(TextBatchProcessor().submit_pending(args.max_requests))
+    elif args.command == "collect":
+        print(TextBatchProcessor().collect())
+    else:
+        run_batch_loop(args.poll_interval)
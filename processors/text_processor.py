@@ -1,20 +1,39 @@
 from bson import ObjectId
 from datetime import datetime
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+import asyncio
 import requests
 import time
 from urllib.parse import urlparse
 import json
+import re
+import argparse
 from db import text_analysis_collection, videos_collection
 from core.logger import logger
 from core.s3_client import s3_client
+from core.rate_limiter import outbound_limiter, is_throttled_response
+from processors.word_timeline import encode_word_timeline, decode_word_timeline
 from settings import settings
 import torch
 
 class TextProcessor:
-    def get_transcript(self, s3_url: str) -> Dict:
-        """Fetch transcript from AssemblyAI using pre-signed S3 URL."""
+    # Pure hesitation sounds; dropped from the GPT prompt when filler_words counts them (discourse fillers like "so" are kept)
+    DISFLUENCY_FILLERS = {"uh", "um", "uhm", "umm", "er", "erm", "ah", "hmm"}
+    FILLER_WORDS = ["uh", "um", "like", "you know", "so", "basically", "actually"]
+
+    def __init__(self, prompt_token_budget: int = None, poll_interval: float = None,
+                 pause_threshold: float = 0.3, long_pause_threshold: float = 2.0, filler_words: list = None,
+                 collapse_repeats: bool = None):
+        self.prompt_token_budget = prompt_token_budget or settings.TRANSCRIPT_TOKEN_BUDGET
+        self.poll_interval = poll_interval if poll_interval is not None else settings.ASSEMBLYAI_POLL_INTERVAL
+        self.pause_threshold = pause_threshold
+        self.long_pause_threshold = long_pause_threshold
+        self.filler_words = set(filler_words if filler_words is not None else self.FILLER_WORDS)
+        self.collapse_repeats = settings.TRANSCRIPT_COLLAPSE_REPEATS if collapse_repeats is None else collapse_repeats
+
+    def submit_transcript(self, s3_url: str) -> str:
+        """Start an AssemblyAI transcription of the S3 object (via a pre-signed URL); returns its id."""
         parsed = urlparse(s3_url)
         bucket = parsed.netloc.split('.')[0]
         key = parsed.path.lstrip('/')
@@ -25,32 +44,86 @@ class TextProcessor:
         )
 
         headers = {"authorization": settings.ASSEMBLYAI_API_KEY}
-        response = requests.post(
-            f"{settings.ASSEMBLYAI_API_URL}/transcript",
-            json={"audio_url": presigned_url, "speaker_labels": False},
-            headers=headers,
+        response = outbound_limiter.call(
+            "assemblyai",
+            lambda: requests.post(
+                f"{settings.ASSEMBLYAI_API_URL}/transcript",
+                json={"audio_url": presigned_url, "speaker_labels": False},
+                headers=headers,
+            ),
+            key=settings.ASSEMBLYAI_API_KEY,
+            is_throttled=is_throttled_response,
         )
         if response.status_code != 200:
             raise Exception(f"AssemblyAI error: {response.json().get('error')}")
 
-        transcript_id = response.json()["id"]
+        return response.json()["id"]
 
-        while True:
-            status_response = requests.get(
+    def transcript_status(self, transcript_id: str) -> Optional[Dict]:
+        """The finished transcript, or None while AssemblyAI is still processing."""
+        status_response = outbound_limiter.call(
+            "assemblyai",
+            lambda: requests.get(
                 f"{settings.ASSEMBLYAI_API_URL}/transcript/{transcript_id}",
-                headers=headers,
-            )
-            status_data = status_response.json()
-            if status_data["status"] == "completed":
-                return status_data
-            elif status_data["status"] == "error":
-                raise Exception(f"Transcription failed: {status_data.get('error')}")
-            time.sleep(5)
-
-    def analyze_speech_quality(self, full_text: str, description: str) -> Dict[str, Any]:
+                headers={"authorization": settings.ASSEMBLYAI_API_KEY},
+            ),
+            key=settings.ASSEMBLYAI_API_KEY,
+            is_throttled=is_throttled_response,
+        )
+        status_data = status_response.json()
+        if status_data["status"] == "completed":
+            return status_data
+        elif status_data["status"] == "error":
+            raise Exception(f"Transcription failed: {status_data.get('error')}")
+        return None
+
+    def get_transcript(self, s3_url: str) -> Dict:
+        """Fetch transcript from AssemblyAI using pre-signed S3 URL."""
+        transcript_id = self.submit_transcript(s3_url)
+        while True:
+            transcript = self.transcript_status(transcript_id)
+            if transcript is not None:
+                return transcript
+            time.sleep(self.poll_interval)
+
+    async def get_transcript_async(self, s3_url: str) -> Dict:
+        """get_transcript that waits between polls without blocking the event loop."""
+        transcript_id = await asyncio.to_thread(self.submit_transcript, s3_url)
+        while True:
+            transcript = await asyncio.to_thread(self.transcript_status, transcript_id)
+            if transcript is not None:
+                return transcript
+            await asyncio.sleep(self.poll_interval)
+
+    def analyze_speech_quality(self, full_text: str, description: str, compaction: Dict[str, Any] = None) -> Dict[str, Any]:
         """Send transcript text to OpenAI for advanced communication analysis."""
 
+        request_body = self.build_speech_quality_request(full_text, description, compaction)
+        response = outbound_limiter.call(
+            "openai",
+            lambda: requests.post(
+                f"{settings.OPENAI_API_URL}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+                json=request_body,
+                timeout=15,
+            ),
+            key=settings.OPENAI_API_KEY,
+            is_throttled=is_throttled_response,
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"OpenAI API Error: {response.status_code} - {response.text}")
+
+        return self.parse_speech_quality_response(response.json())
+
+    def build_speech_quality_request(self, full_text: str, description: str, compaction: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Chat completion body shared by the synchronous and batch paths."""
+
         safe_text = full_text.replace("{", "{{").replace("}", "}}")
+        compaction_note = self._compaction_note(compaction)
 
         prompt = f"""
         You are an elite communication analyst. Analyze this spoken transcript about: "{description}".
@@ -80,33 +153,24 @@ class TextProcessor:
         \"\"\"
         {safe_text}
         \"\"\"
-
+        {compaction_note}
         DO NOT explain. DO NOT add notes. DO NOT use markdown. Return ONLY valid JSON.
         """
 
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "gpt-4o",
-                "messages": [
-                    {"role": "system", "content": "You are a precise communication analyst. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                "temperature": 0.1,
-                "max_tokens": 600,
-                "response_format": {"type": "json_object"},
-            },
-            timeout=15,
-        )
-
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API Error: {response.status_code} - {response.text}")
+        return {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": "You are a precise communication analyst. Respond only with valid JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.1,
+            "max_tokens": 600,
+            "response_format": {"type": "json_object"},
+        }
 
-        gpt_response = response.json()["choices"][0]["message"]["content"]
+    def parse_speech_quality_response(self, completion: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the GPT JSON payload from a chat completion response body."""
+        gpt_response = completion["choices"][0]["message"]["content"]
 
         try:
             gpt_dict = json.loads(gpt_response)
@@ -256,10 +320,100 @@ class TextProcessor:
     #         "strategic_way_forward": gpt_insights["strategic_way_forward"]
     #     }
 
+    # ---------- PROMPT COMPACTION ----------
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough BPE token estimate: one token per ~4 characters of each word or punctuation mark."""
+        return sum(max(1, (len(piece) + 3) // 4) for piece in re.findall(r"\w+|[^\w\s]", text))
+
+    def compact_transcript(self, full_text: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Shrink the transcript before it is embedded in the GPT prompt.
+
+        Only hesitation sounds the deterministic filler metrics already count
+        (DISFLUENCY_FILLERS that are also in filler_words, matched the same way)
+        are removed, and their total is passed to GPT in a note. Other
+        disfluencies stay for GPT to judge. Collapsing immediately repeated
+        words is opt-in (TRANSCRIPT_COLLAPSE_REPEATS), since it also rewrites
+        legitimate text such as "had had". If the result still exceeds the token
+        budget, the middle of the transcript is elided.
+        """
+        counted_fillers = self.DISFLUENCY_FILLERS & self.filler_words
+        tokens, norms = [], []
+        fillers_removed = 0
+        for tok in full_text.split():
+            if tok.lower() in counted_fillers:
+                fillers_removed += 1
+                continue
+            tokens.append(tok)
+            norms.append(re.sub(r"[^\w']", "", tok.lower()))
+
+        kept = tokens
+        repeats_collapsed = 0
+        if self.collapse_repeats:
+            # Collapse "I I think" / "it is it is" style repetitions (up to 3-word phrases)
+            kept, kept_norms = [], []
+            i = 0
+            while i < len(tokens):
+                for n in (3, 2, 1):
+                    window = norms[i:i + n]
+                    if len(window) == n and all(window) and kept_norms[-n:] == window:
+                        i += n
+                        repeats_collapsed += n
+                        break
+                else:
+                    kept.append(tokens[i])
+                    kept_norms.append(norms[i])
+                    i += 1
+
+        token_costs = [self._estimate_tokens(tok) for tok in kept]
+        truncated = sum(token_costs) > self.prompt_token_budget
+        if truncated:
+            # Keep the opening and the close, where framing and call-to-action usually sit
+            head_budget = int(self.prompt_token_budget * 2 / 3)
+            tail_budget = self.prompt_token_budget - head_budget
+            head_end = int(np.searchsorted(np.cumsum(token_costs), head_budget, side="right"))
+            tail_start = len(kept) - int(np.searchsorted(np.cumsum(token_costs[::-1]), tail_budget, side="right"))
+            kept = kept[:head_end] + ["[...]"] + kept[max(head_end, tail_start):]
+
+        compact_text = " ".join(kept)
+        return compact_text, {
+            "tokens_before": self._estimate_tokens(full_text),
+            "tokens_after": self._estimate_tokens(compact_text),
+            "token_budget": self.prompt_token_budget,
+            "fillers_removed": fillers_removed,
+            "repeats_collapsed": repeats_collapsed,
+            "truncated": truncated
+        }
+
+    def _compaction_note(self, compaction: Dict[str, Any] = None) -> str:
+        if not compaction:
+            return ""
+        notes = []
+        if compaction["fillers_removed"] or compaction["repeats_collapsed"]:
+            notes.append(
+                f"Note: the transcript was cleaned before analysis — {compaction['fillers_removed']} hesitation sounds "
+                f"and {compaction['repeats_collapsed']} repeated words were removed. Account for them when scoring "
+                "repetition and confidence."
+            )
+        if compaction["truncated"]:
+            notes.append("Note: part of the middle of the transcript was omitted ([...]) to fit the length limit.")
+        return "\n        ".join(notes) + "\n" if notes else ""
+
     def analyze_transcript(self, transcript: Dict, description: str) -> Dict:
         """Main analysis pipeline — AssemblyAI + GPT-4o + Silero VAD pause detection."""
+        metrics = self.compute_transcript_metrics(transcript)
+        if not transcript.get("words"):
+            return metrics
+
+        # GPT analysis on the compacted transcript
+        compact_text, compaction = self.compact_transcript(transcript.get("text", "") or "")
+        metrics["prompt_compaction"] = compaction
+        gpt_insights = self.analyze_speech_quality(compact_text, description, compaction)
+        return self.merge_gpt_insights(metrics, gpt_insights)
+
+    def compute_transcript_metrics(self, transcript: Dict) -> Dict:
+        """Deterministic pace, pause and filler metrics derived from the word timings."""
         words_info = transcript.get("words", [])
-        full_text = transcript.get("text", "") or ""
 
         if not words_info:
             return self._get_empty_analysis()
@@ -273,7 +427,7 @@ class TextProcessor:
         prev_end = 0.0
         for w in words_info:
             start_sec = float(w.get("start", 0)) / 1000.0
-            if start_sec - prev_end > 0.3:
+            if start_sec - prev_end > self.pause_threshold:
                 pauses.append({
                     "start_time": round(prev_end, 2),
                     "end_time": round(start_sec, 2),
@@ -282,35 +436,38 @@ class TextProcessor:
             prev_end = float(w.get("end", prev_end * 1000)) / 1000.0
 
         # Classify pauses
-        long_pause_threshold = 2.0
         for p in pauses:
-            p["type"] = "awkward" if p["duration"] > long_pause_threshold else "legitimate"
+            p["type"] = "awkward" if p["duration"] > self.long_pause_threshold else "legitimate"
 
         total_pause_time = sum(p["duration"] for p in pauses)
         speech_time = max(0.1, audio_duration - total_pause_time)
 
         # Filler word analysis
-        filler_words_list = ["uh", "um", "like", "you know", "so", "basically", "actually"]
         filler_events = [
             {"word": w["text"].lower(), "start_time": w["start"]/1000.0, "end_time": w["end"]/1000.0}
-            for w in words_info if w["text"].lower() in filler_words_list
+            for w in words_info if w["text"].lower() in self.filler_words
         ]
         total_fillers = len(filler_events)
-        total_words = len([w for w in words_info if w["text"].strip().isalpha()])
+        is_word = np.array([w["text"].strip().isalpha() for w in words_info], dtype=bool)
+        total_words = int(is_word.sum())
 
         wpm = (total_words / speech_time) * 60.0
         effective_wpm = (total_words / audio_duration) * 60.0
 
-        # Pace analysis
+        # Pace analysis — bucket word starts into 5s chunks in one pass
         chunk_duration = 5.0
         num_chunks = int(np.ceil(audio_duration / chunk_duration))
+        starts_sec = np.array([w["start"] for w in words_info], dtype=np.float64) / 1000.0
+        in_range = is_word & (starts_sec >= 0) & (starts_sec < audio_duration)
+        chunk_counts = np.bincount(
+            (starts_sec[in_range] // chunk_duration).astype(np.int64), minlength=num_chunks
+        )[:num_chunks]
         pace_chunks = []
         chunk_wpms = []
         for i in range(num_chunks):
             start_time = i * chunk_duration
             end_time = min((i+1) * chunk_duration, audio_duration)
-            chunk_words = [w for w in words_info if start_time <= w["start"]/1000.0 < end_time]
-            word_count = len([w for w in chunk_words if w["text"].strip().isalpha()])
+            word_count = int(chunk_counts[i])
             wpm_chunk = (word_count / chunk_duration) * 60.0
             pace_chunks.append({
                 "start_time": round(start_time, 2),
@@ -330,9 +487,6 @@ class TextProcessor:
         awkward_pauses = len([p for p in pauses if p["type"]=="awkward"])
         pause_percentage = (total_pause_time / audio_duration) * 100 if audio_duration>0 else 0
 
-        # GPT analysis
-        gpt_insights = self.analyze_speech_quality(full_text, description)
-
         return {
             "wpm": round(wpm,2),
             "effective_wpm": round(effective_wpm,2),
@@ -356,7 +510,13 @@ class TextProcessor:
                 "total_duration": round(total_pause_time,2),
                 "percentage": round(pause_percentage,2),
                 "events": pauses
-            },
+            }
+        }
+
+    def merge_gpt_insights(self, metrics: Dict, gpt_insights: Dict[str, Any]) -> Dict:
+        """Attach the GPT qualitative fields to the deterministic metrics."""
+        return {
+            **metrics,
             "clarity": gpt_insights["clarity"],
             "confidence_level": gpt_insights["confidence_level"],
             "emotional_tone": gpt_insights["emotional_tone"],
@@ -386,29 +546,93 @@ class TextProcessor:
         }
 
 
+def finalise_text_analysis(video_id: str, analysis_results: Dict, description: str, word_timeline: Dict = None) -> None:
+    """Persist a finished text analysis and mark the video completed."""
+    doc = {
+        'video_id': ObjectId(video_id),
+        'analysis_results': analysis_results,
+        'processed_at': datetime.utcnow(),
+        'description_context': description
+    }
+    if word_timeline:
+        doc['word_timeline'] = word_timeline
+    text_analysis_collection.insert_one(doc)
+    videos_collection.update_one({"_id": ObjectId(video_id)}, {"$set": {"status_text": "completed"}})
+
+
 # Background task
-async def process_video_text(video_id: str, s3_url: str, description: str):
+async def process_video_text(video_id: str, s3_url: str, description: str, llm_mode: str = "sync"):
+    """
+    llm_mode="sync" runs GPT-4o inline (interactive uploads). llm_mode="batch" stores
+    the transcript metrics and defers the GPT call to processors.text_batch.
+    Blocking calls run in threads, so many text jobs can share one event loop.
+    """
     try:
         processor = TextProcessor()
-        transcript = processor.get_transcript(s3_url)
-        analysis_results = processor.analyze_transcript(transcript, description)
+        transcript = await processor.get_transcript_async(s3_url)
 
-        text_analysis_collection.insert_one({
-            'video_id': ObjectId(video_id),
-            'analysis_results': analysis_results,
-            'processed_at': datetime.utcnow(),
-            'description_context': description
-        })
+        # Keep the word timings so metrics can be recomputed without re-transcribing
+        word_timeline = encode_word_timeline(transcript.get("words") or [], transcript.get("audio_duration"))
 
-        videos_collection.update_one({"_id": ObjectId(video_id)}, {"$set": {"status_text": "completed"}})
+        if llm_mode == "batch" and transcript.get("words"):
+            from processors.text_batch import TextBatchProcessor
+            await asyncio.to_thread(TextBatchProcessor().enqueue, video_id, description, transcript, word_timeline)
+            return
+
+        analysis_results = await asyncio.to_thread(processor.analyze_transcript, transcript, description)
+        await asyncio.to_thread(finalise_text_analysis, video_id, analysis_results, description, word_timeline)
 
         logger.info(f"✨ Text processing completed with GPT-4o precision for video ID: {video_id}")
 
     except Exception as e:
         logger.error(f"Error processing text for video ID {video_id}: {str(e)}")
-        text_analysis_collection.insert_one({
-            'video_id': ObjectId(video_id),
-            'error': str(e),
-            'processed_at': datetime.utcnow(),
-            'description_context': description
-        })
+        # The job queue retries, and marks status_text failed once attempts run out
+        raise
+
+
+def reanalyze_text_metrics(video_id: str, processor: TextProcessor = None) -> Dict[str, Any]:
+    """
+    Recompute the deterministic text metrics from the stored word timeline,
+    keeping the GPT fields untouched. No AssemblyAI or OpenAI calls are made.
+    """
+    processor = processor or TextProcessor()
+    doc = text_analysis_collection.find_one(
+        {"video_id": ObjectId(video_id), "word_timeline": {"$exists": True}},
+        sort=[("processed_at", -1)]
+    )
+    if not doc:
+        raise ValueError(f"No stored word timeline for video {video_id}")
+
+    metrics = processor.compute_transcript_metrics(decode_word_timeline(doc["word_timeline"]))
+    analysis_results = {**doc.get("analysis_results", {}), **metrics}
+    text_analysis_collection.update_one(
+        {"_id": doc["_id"]},
+        {"$set": {"analysis_results": analysis_results, "reanalyzed_at": datetime.utcnow()}}
+    )
+    return analysis_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute text metrics from stored word timelines")
+    parser.add_argument("video_ids", nargs="*", help="videos to re-analyse (default: every stored timeline)")
+    parser.add_argument("--pause-threshold", type=float, default=0.3)
+    parser.add_argument("--long-pause-threshold", type=float, default=2.0)
+    parser.add_argument("--filler-words", default=None, help="comma-separated filler lexicon")
+    args = parser.parse_args()
+
+    text_processor = TextProcessor(
+        pause_threshold=args.pause_threshold,
+        long_pause_threshold=args.long_pause_threshold,
+        filler_words=args.filler_words.split(",") if args.filler_words else None,
+    )
+    video_ids = args.video_ids or [
+        str(v) for v in text_analysis_collection.distinct("video_id", {"word_timeline": {"$exists": True}})
+    ]
+
+    started = time.perf_counter()
+    for vid in video_ids:
+        try:
+            reanalyze_text_metrics(vid, text_processor)
+        except Exception as e:
+            logger.error(f"Text re-analysis failed for video ID {vid}: {str(e)}")
+    logger.info(f"Re-analysed {len(video_ids)} videos in {time.perf_counter() - started:.2f}s")
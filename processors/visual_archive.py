@@ -0,0 +1,198 @@
+"""
+Archive of the raw Rekognition FaceDetails behind each visual analysis, and
+offline re-scoring over it.
+
+Every sampled frame becomes one record:
+
+    {"t": timestamp, "status": "ok" | "skipped" | "error",
+     "faces": FaceDetails or None, "quality": local quality row or None,
+     "quality_source": "rekognition_face" for backends scored from face Quality,
+     "reused_from": frame id whose response a near-duplicate frame reused}
+
+Records are stored in rekognition_archive as zlib-compressed JSON, in chunks
+of VISUAL_ARCHIVE_CHUNK_FRAMES records keyed by video_id, chunk number and
+time range. Re-scoring replays VisualAnalyzer's scoring, stability windows and
+averages over the records without any Rekognition call, so a threshold change
+can be backfilled across every archived video:
+
+    python -m processors.visual_archive rescore --video-id <id>
+    python -m processors.visual_archive backfill --limit 5000
+"""
+import argparse
+import json
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import Binary, ObjectId
+
+from core.logger import logger
+from db import image_analysis_collection, rekognition_archive_collection
+from processors.visual_encoding import decode_visual_insights, encode_visual_insights
+from settings import settings
+
+ARCHIVE_CODEC = "zlib-json-v1"
+
+
+def archive_record(timestamp: float, response: Optional[Dict], call_stats: Optional[Dict]) -> Dict:
+    """One archive record for a sampled frame; quality is attached once the timeline is scored."""
+    if response is not None:
+        status, faces = "ok", response.get("FaceDetails") or []
+    elif call_stats is not None and "skipped" in call_stats:
+        status, faces = "skipped", None
+    else:
+        status, faces = "error", None
+    record = {"t": timestamp, "status": status, "faces": faces}
+    if call_stats is not None and "reused_from" in call_stats:
+        record["reused_from"] = call_stats["reused_from"]
+    return record
+
+
+def pack_records(records: List[Dict]) -> bytes:
+    return zlib.compress(json.dumps(records, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def unpack_records(data: bytes) -> List[Dict]:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def archive_responses(video_id: str, records: List[Dict], collection=None) -> int:
+    """Replace the video's archive with records; returns the number of chunks written."""
+    collection = collection if collection is not None else rekognition_archive_collection
+    size = max(1, settings.VISUAL_ARCHIVE_CHUNK_FRAMES)
+    now = datetime.utcnow()
+    docs = []
+    for chunk, start in enumerate(range(0, len(records), size)):
+        part = records[start:start + size]
+        docs.append({
+            "video_id": ObjectId(video_id),
+            "chunk": chunk,
+            "t_start": part[0]["t"],
+            "t_end": part[-1]["t"],
+            "frames": len(part),
+            "codec": ARCHIVE_CODEC,
+            "data": Binary(pack_records(part)),
+            "created_at": now,
+        })
+
+    collection.delete_many({"video_id": ObjectId(video_id)})
+    if docs:
+        collection.insert_many(docs)
+    logger.info("Archived %d Rekognition responses for video %s in %d chunks", len(records), video_id, len(docs))
+    return len(docs)
+
+
+def load_archive(video_id: str, collection=None) -> List[Dict]:
+    collection = collection if collection is not None else rekognition_archive_collection
+    records = []
+    for doc in collection.find({"video_id": ObjectId(video_id)}).sort("chunk", 1):
+        if doc.get("codec") != ARCHIVE_CODEC:
+            raise ValueError(f"Unsupported archive codec {doc.get('codec')} for video {video_id}")
+        records.extend(unpack_records(doc["data"]))
+    return records
+
+
+# ---------- RE-SCORING ----------
+class _NoRekognition:
+    """Stands in for the boto3 client during re-scoring, so any call is a bug rather than a bill."""
+
+    def __getattr__(self, name):
+        raise RuntimeError(f"re-scoring attempted a Rekognition call ({name})")
+
+
+def offline_analyzer(**kwargs):
+    from processors.visual_processor import VisualAnalyzer
+    return VisualAnalyzer(rekognition_client=_NoRekognition(), archive_responses=False, **kwargs)
+
+
+def rescore_records(records: List[Dict], analyzer=None) -> Dict:
+    """visual_insights sections and overall averages recomputed from archived records."""
+    analyzer = analyzer or offline_analyzer()
+    frames = []
+    for record in records:
+        analysis = None
+        if record["status"] == "ok":
+            analysis = analyzer._score_frame(None, {"FaceDetails": record["faces"]}, record.get("quality_source"))
+        if analysis is not None:
+            if record.get("reused_from") is not None:
+                analyzer._mark_reused(analysis, record["reused_from"])
+            frames.append((record["t"], analysis, True))
+        else:
+            expression = "error" if record["status"] == "error" else "no_face"
+            frames.append((record["t"], analyzer._get_default_response(expression=expression), False))
+
+    analyzer._apply_local_quality(frames, {r["t"]: r["quality"] for r in records if r.get("quality")})
+    return analyzer._build_results(frames)
+
+
+def rescore_video(video_id: str, analyzer=None, store: bool = True) -> Optional[Dict]:
+    """
+    Re-score one archived video. With store, its image_analysis document is updated
+    in place; quality_timeline and processing_stats are kept from the original run.
+    Returns the new insights, or None if the video has no archive.
+    """
+    records = load_archive(video_id)
+    if not records:
+        logger.warning("No Rekognition archive for video %s", video_id)
+        return None
+
+    insights = rescore_records(records, analyzer)
+    if store:
+        existing = image_analysis_collection.find_one({"video_id": ObjectId(video_id)}, {"visual_insights": 1}) or {}
+        previous = decode_visual_insights(existing.get("visual_insights") or {})
+        for key in ("quality_timeline", "processing_stats"):
+            if key in previous:
+                insights[key] = previous[key]
+        stored = encode_visual_insights(insights) if settings.VISUAL_COMPACT_STORAGE else insights
+        image_analysis_collection.update_one(
+            {"video_id": ObjectId(video_id)},
+            {"$set": {"visual_insights": stored, "rescored_at": datetime.utcnow()}}
+        )
+    return insights
+
+
+def backfill(limit: int = None, store: bool = True, **analyzer_kwargs) -> Dict:
+    """Re-score every archived video (or the first `limit`) with one shared offline analyzer."""
+    analyzer = offline_analyzer(**analyzer_kwargs)
+    video_ids = rekognition_archive_collection.distinct("video_id", {"chunk": 0})
+    if limit:
+        video_ids = video_ids[:limit]
+
+    started, done, failed = time.perf_counter(), 0, 0
+    for video_id in video_ids:
+        try:
+            if rescore_video(str(video_id), analyzer, store) is not None:
+                done += 1
+        except Exception as e:
+            failed += 1
+            logger.error("Re-scoring failed for video %s: %s", video_id, str(e))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "videos": len(video_ids),
+        "rescored": done,
+        "failed": failed,
+        "elapsed_sec": round(elapsed, 2),
+        "videos_per_sec": round(done / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score archived Rekognition responses without new API calls")
+    parser.add_argument("command", choices=["rescore", "backfill"])
+    parser.add_argument("--video-id", default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="compute but do not write image_analysis")
+    parser.add_argument("--confidence-threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.command == "rescore":
+        if not args.video_id:
+            parser.error("rescore needs --video-id")
+        insights = rescore_video(args.video_id, offline_analyzer(confidence_threshold=args.confidence_threshold),
+                                 store=not args.dry_run)
+        print(json.dumps(insights["overall_averages"] if insights else None, indent=2))
+    else:
+        print(json.dumps(backfill(args.limit, store=not args.dry_run, confidence_threshold=args.confidence_threshold),
+                         indent=2))
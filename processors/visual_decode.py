@@ -0,0 +1,155 @@
+"""
+Frame decoding for the visual pipeline, serial or split across processes.
+
+iter_sampled_frames is the single-capture sampler. SegmentDecoder splits the
+frames to decode into contiguous time segments. A process pool decodes them,
+each worker opening its own capture and seeking to its segment's start, and
+the results are yielded in timestamp order. Workers ship back the quality
+thumbnail for every decoded frame, and a BGR image only for Rekognition targets,
+already shrunk to the Rekognition payload's long-side cap. Segments in flight
+are bounded by count and by their estimated pickled size, so inter-process
+traffic and parent memory stay small whatever the source resolution.
+
+This module avoids importing db/settings, so spawned workers start quickly.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import cv2
+
+from processors.visual_quality import QUALITY_THUMB_WIDTH, quality_thumbnail
+
+
+def iter_sampled_frames(cap, target_frames, fps, seek_min_gap_sec):
+    """
+    Yield (frame_id, frame) for each target frame in ascending order.
+
+    Skipped frames are only grab()bed (demuxed, never converted to BGR). When the
+    next target is further away than seek_min_gap_sec, the capture seeks instead,
+    so sparse samples cost roughly one GOP decode rather than every frame between.
+    """
+    targets = sorted(set(target_frames))
+    seek_gap = max(1, int(fps * seek_min_gap_sec))
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    for target in targets:
+        if target < position or target - position > seek_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = target
+        while position < target:
+            if not cap.grab():
+                return
+            position += 1
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        position += 1
+        yield target, frame
+
+
+def capped_size(width, height, max_long_side):
+    """(width, height) shrunk so the long side is at most max_long_side; never upscales."""
+    scale = min(1.0, max_long_side / max(width, height, 1)) if max_long_side else 1.0
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def cap_frame(frame, max_long_side):
+    """frame shrunk (INTER_AREA) so its long side is at most max_long_side."""
+    size = capped_size(frame.shape[1], frame.shape[0], max_long_side)
+    if size == (frame.shape[1], frame.shape[0]):
+        return frame
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def decode_segment(source, frame_ids, target_ids, fps, seek_min_gap_sec, max_long_side=None):
+    """
+    Worker: [(frame_id, frame or None, thumbnail)] for one contiguous segment. The
+    thumbnail comes from the full decoded frame; target frames are then shrunk to
+    max_long_side before they are pickled back.
+    """
+    cap = cv2.VideoCapture(source)
+    try:
+        if frame_ids:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_ids[0])
+        decoded = []
+        for frame_id, frame in iter_sampled_frames(cap, frame_ids, fps, seek_min_gap_sec):
+            thumb = quality_thumbnail(frame)
+            decoded.append((frame_id, cap_frame(frame, max_long_side) if frame_id in target_ids else None, thumb))
+        return decoded
+    finally:
+        cap.release()
+
+
+class SegmentDecoder:
+    """Process pool that decodes contiguous segments of one video, reused across passes."""
+
+    def __init__(self, source, fps, workers, segment_sec, seek_min_gap_sec, frame_size=None, max_long_side=None,
+                 max_inflight_bytes=None):
+        self.source = source
+        self.fps = fps
+        self.workers = max(1, workers)
+        self.segment_frames = max(1, int(round(segment_sec * fps)))
+        self.seek_min_gap_sec = seek_min_gap_sec
+        self.max_long_side = max_long_side
+        self.max_inflight_bytes = max_inflight_bytes
+        self.segments_decoded = 0
+        self.peak_inflight_bytes = 0
+
+        # Per-frame size estimates for the in-flight byte bound (frame_size is the source's (width, height))
+        width, height = frame_size or (0, 0)
+        target_width, target_height = capped_size(width, height, max_long_side)
+        thumb_width = min(width, QUALITY_THUMB_WIDTH)
+        self._target_bytes = target_width * target_height * 3 if width and height else 0
+        self._thumb_bytes = thumb_width * int(round(height * thumb_width / width)) if width and height else 0
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+
+    def _segments(self, frame_ids):
+        segment, segment_start = [], None
+        for frame_id in sorted(set(frame_ids)):
+            if segment and frame_id - segment_start >= self.segment_frames:
+                yield segment
+                segment = []
+            if not segment:
+                segment_start = frame_id
+            segment.append(frame_id)
+        if segment:
+            yield segment
+
+    def _segment_bytes(self, segment, segment_targets):
+        return len(segment_targets) * self._target_bytes + len(segment) * self._thumb_bytes
+
+    def iter_frames(self, frame_ids, target_ids):
+        """
+        Yield (frame_id, frame or None, thumbnail) in frame order. At most two segments
+        per worker, and no more than max_inflight_bytes of decoded frames (at least one
+        segment), are in flight, so memory stays bounded however long the video is.
+        """
+        targets = frozenset(target_ids)
+        pending = deque()
+        self._inflight_bytes = 0
+        for segment in self._segments(frame_ids):
+            segment_targets = targets.intersection(segment)
+            size = self._segment_bytes(segment, segment_targets)
+            while pending and (len(pending) >= 2 * self.workers or (
+                    self.max_inflight_bytes and self._inflight_bytes + size > self.max_inflight_bytes)):
+                yield from self._take(pending)
+            pending.append((self._pool.submit(
+                decode_segment, self.source, segment, segment_targets, self.fps, self.seek_min_gap_sec,
+                self.max_long_side
+            ), size))
+            self._inflight_bytes += size
+            self.peak_inflight_bytes = max(self.peak_inflight_bytes, self._inflight_bytes)
+        while pending:
+            yield from self._take(pending)
+
+    def _take(self, pending):
+        future, size = pending.popleft()
+        decoded = future.result()
+        self._inflight_bytes -= size
+        self.segments_decoded += 1
+        return decoded
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
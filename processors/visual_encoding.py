@@ -0,0 +1,188 @@
+"""
+Compact storage encoding for visual_insights.
+
+The in-memory layout keeps four parallel per-frame lists of {"time", "analysis"}
+wrappers. Every frame repeats the same long tip strings and a full raw_emotions
+array. The stored layout is columnar:
+
+  time          the shared timestamps, stored once
+  sections      one list per analysis field, in frame order
+    *_tip       integer codes into TIP_TABLES[tip_table]. A tip missing from the
+                table is kept inline as a string, so encoding never loses text.
+    labels      other string fields are codes into that section's "labels" list
+  emotions      raw_emotions as fixed EMOTION_ORDER confidence vectors (None for
+                a type not reported, or for the whole vector when there was no face)
+
+overall_averages, quality_timeline and processing_stats are stored unchanged.
+decode_visual_insights returns documents written before this encoding as they are.
+
+TIP_TABLES is append-only per version. When a tip's wording changes, add a new
+version rather than editing an old one, so stored codes keep their meaning.
+"""
+from typing import Dict, List
+
+ENCODING_VERSION = 1
+SECTIONS = ("eye_contact_analysis", "posture_analysis", "facial_expressions", "technical_quality")
+EMOTION_ORDER = ("CALM", "HAPPY", "CONFUSED", "SURPRISED", "SAD", "FEAR", "ANGRY", "DISGUSTED", "UNKNOWN")
+
+TIP_TABLES = {
+    1: (
+        # no face / errors (VisualAnalyzer._get_default_response)
+        "No face detected",
+        "No data",
+        "No nervousness data available",
+        "No Face",
+        "Error",
+        # eye contact confidence
+        "🌟 Excellent eye contact — you're fully engaging your audience!",
+        "✅ Good — maintain this level, try to reduce glances away.",
+        "⚠️ Low eye contact — practice looking at the camera to build connection.",
+        # eye stability
+        "🧘‍♂️ Steady gaze — projects calm and focus.",
+        "👀 Occasional darting — try to pause and anchor your gaze.",
+        "⚠️ Restless eyes — may signal nervousness or distraction.",
+        # head orientation
+        "🎯 Perfect — you're addressing your audience directly.",
+        "⬅️ Looking left — check if you're reading notes or avoiding camera.",
+        "➡️ Looking right — same as above, try to re-center.",
+        "⬆️ Looking up — may seem distracted or searching for words.",
+        "⬇️ Looking down — can signal hesitation or low confidence.",
+        "🫣 Head tilt — adds curiosity, but overuse may seem uncertain.",
+        "🫣 Head tilt — same as above.",
+        "❓ Orientation unclear — ensure proper camera positioning.",
+        "Unknown orientation.",
+        # posture stability
+        "🏆 Rock-solid presence — you own the space!",
+        "📈 Generally aligned — minor shifts are natural.",
+        "⚠️ Frequent posture shifts — may reduce perceived confidence.",
+        # expression
+        "Great! Smiling builds warmth and trust with your audience.",
+        "Excellent — calmness conveys confidence and control.",
+        "Try to pause and collect your thoughts — clarity builds credibility.",
+        "It's okay to feel nervous — focus on your message, not the fear.",
+        "Check your energy — smiling or standing tall can shift your mood.",
+        "Channel that energy into passion, not frustration.",
+        "Use surprise intentionally — avoid looking startled.",
+        "Re-evaluate your delivery — ensure tone matches message.",
+        "Add subtle expressions to connect — even a small smile helps.",
+        "Expression unclear — ensure good lighting and frontal view.",
+        "Keep practicing — awareness leads to improvement.",
+        # nervousness
+        "🚨 High nervousness detected — Take deep breaths, pause, and ground yourself. Remember, your audience wants you to succeed!",
+        "⚠️ Moderate nervousness — Channel this energy into passion! Smile, slow down your pace, and trust your preparation.",
+        "💛 Slight nervous energy — This is normal! Use it to stay alert and engaged. Focus on your message, not the anxiety.",
+        "✅ Minimal nervousness — Great balance! You're alert but composed. Keep this steady energy.",
+        "🌟 Very calm and composed — Excellent! You're projecting confidence and control.",
+    ),
+}
+TIP_TABLE_VERSION = max(TIP_TABLES)
+
+_TIP_CODES = {tip: code for code, tip in enumerate(TIP_TABLES[TIP_TABLE_VERSION])}
+
+
+def is_compact(insights) -> bool:
+    return isinstance(insights, dict) and "encoding" in insights
+
+
+def _encode_emotions(raw_emotions: List[Dict]):
+    if not raw_emotions:
+        return None
+    by_type = {e["Type"]: e["Confidence"] for e in raw_emotions}
+    return [by_type.get(t) for t in EMOTION_ORDER]
+
+
+def _decode_emotions(vector) -> List[Dict]:
+    if vector is None:
+        return []
+    emotions = [{"Type": t, "Confidence": c} for t, c in zip(EMOTION_ORDER, vector) if c is not None]
+    return sorted(emotions, key=lambda e: e["Confidence"], reverse=True)
+
+
+def _encode_section(analyses: List[Dict]) -> Dict:
+    fields = list(dict.fromkeys(k for a in analyses for k in a if k != "raw_emotions"))
+    string_fields = [f for f in fields if _is_string_column(analyses, f)]
+    label_codes, columns, absent = {}, {}, {}
+
+    for field in fields:
+        column = []
+        for i, analysis in enumerate(analyses):
+            if field not in analysis:
+                absent.setdefault(field, []).append(i)
+                column.append(None)
+                continue
+            value = analysis[field]
+            if field in string_fields and value is not None:
+                if field.endswith("_tip"):
+                    value = _TIP_CODES.get(value, value)
+                else:
+                    value = label_codes.setdefault(value, len(label_codes))
+            column.append(value)
+        columns[field] = column
+
+    section = {"columns": columns, "string_fields": string_fields}
+    if label_codes:
+        section["labels"] = list(label_codes)
+    if absent:
+        section["absent"] = absent
+    return section
+
+
+def _is_string_column(analyses: List[Dict], field: str) -> bool:
+    # Only columns holding nothing but strings (or None) are coded, so decoding is unambiguous
+    values = [a[field] for a in analyses if a.get(field) is not None]
+    return bool(values) and all(isinstance(v, str) for v in values)
+
+
+def encode_visual_insights(insights: Dict) -> Dict:
+    """Columnar, table-coded copy of a _build_results dict for storage."""
+    times = [f["time"] for f in insights.get(SECTIONS[0], [])]
+    if any([f["time"] for f in insights.get(s, [])] != times for s in SECTIONS):
+        return insights  # sections out of step; store the plain layout rather than guess
+
+    encoded = {
+        "encoding": ENCODING_VERSION,
+        "tip_table": TIP_TABLE_VERSION,
+        "time": times,
+        "sections": {s: _encode_section([f["analysis"] for f in insights[s]]) for s in SECTIONS},
+        "emotions": [_encode_emotions(f["analysis"].get("raw_emotions")) for f in insights["facial_expressions"]],
+    }
+    encoded.update({k: v for k, v in insights.items() if k not in SECTIONS})
+    return encoded
+
+
+def decode_visual_insights(stored: Dict) -> Dict:
+    """Rehydrate the per-frame layout the results API has always returned."""
+    if not is_compact(stored):
+        return stored
+    if stored["encoding"] != ENCODING_VERSION:
+        raise ValueError(f"Unsupported visual_insights encoding {stored['encoding']}")
+
+    tips = TIP_TABLES[stored["tip_table"]]
+    times = stored["time"]
+    insights = {}
+    for name in SECTIONS:
+        section = stored["sections"][name]
+        labels = section.get("labels", [])
+        string_fields = set(section.get("string_fields", []))
+
+        # Decode column by column, then zip the columns back into per-frame dicts
+        columns = []
+        for field, column in section["columns"].items():
+            if field in string_fields:
+                table = tips if field.endswith("_tip") else labels
+                column = [table[v] if isinstance(v, int) else v for v in column]
+            columns.append((field, column))
+        fields = [field for field, _ in columns]
+        rows = [dict(zip(fields, values)) for values in zip(*(column for _, column in columns))] or [{} for _ in times]
+
+        for field, missing in section.get("absent", {}).items():
+            for i in missing:
+                del rows[i][field]
+        if name == "facial_expressions":
+            for row, vector in zip(rows, stored["emotions"]):
+                row["raw_emotions"] = _decode_emotions(vector)
+        insights[name] = [{"time": t, "analysis": row} for t, row in zip(times, rows)]
+
+    reserved = {"encoding", "tip_table", "time", "sections", "emotions"}
+    insights.update({k: v for k, v in stored.items() if k not in reserved})
+    return insights
@@ -1,40 +1,105 @@
 from bson import ObjectId
+import asyncio
 import boto3
 import os
 import numpy as np
 import tempfile
 from settings import settings
 import cv2
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
 from db import image_analysis_collection
+from core.job_queue import JobPending
 from core.logger import logger
 from core.s3_client import s3_client
+from core.rate_limiter import BOTO_NO_RETRY, outbound_limiter
+from processors.visual_archive import archive_record, archive_responses
+from processors.visual_decode import SegmentDecoder, cap_frame, iter_sampled_frames
+from processors.visual_encoding import encode_visual_insights
+from processors.visual_progress import ProgressTracker, RunningAverages
+from processors.visual_quality import QualityTimeline, frame_quality_batch, normalise_quality, quality_thumbnail
 import json
+import time
+from datetime import datetime
+
+
+class VideoSourceError(ValueError):
+    """The video could not be opened or its frame rate read."""
+
+
+class VideoTruncatedError(VideoSourceError):
+    """Decoding stopped before the sampled frames were all read (dropped connection, expired URL, cut file)."""
+
 
 class VisualAnalyzer:
     def __init__(self, frame_interval=1, max_frames=None, confidence_threshold=0.5,
-                 frame_selection_mode="timestamps", specific_frames=None, timestamps=None):
+                 frame_selection_mode="timestamps", specific_frames=None, timestamps=None,
+                 seek_min_gap_sec=2.0, max_in_flight=None, rekognition_client=None, jpeg_max_bytes=None,
+                 face_prefilter=None, duplicate_threshold=None, quality_fps=None, call_budget=None,
+                 adaptive_min_gap_sec=0.25, adaptive_min_change=None, progress_every=None,
+                 archive_responses=None, decode_workers=None, decode_segment_sec=None):
         self.frame_interval = frame_interval
         self.max_frames = max_frames if isinstance(max_frames, int) and max_frames > 0 else None
         self.confidence_threshold = confidence_threshold
         self.frame_selection_mode = frame_selection_mode
         self.timestamps = timestamps or []
         self.specific_frames = specific_frames or []
-
-        self.rekognition = boto3.client(
+        self.seek_min_gap_sec = seek_min_gap_sec
+        self.max_in_flight = max(1, int(max_in_flight or settings.REKOGNITION_MAX_IN_FLIGHT))
+
+        # Rekognition payload encoding
+        self.jpeg_max_bytes = jpeg_max_bytes or settings.REKOGNITION_JPEG_MAX_BYTES
+        self.jpeg_quality = settings.REKOGNITION_JPEG_QUALITY
+        self.jpeg_min_quality = settings.REKOGNITION_JPEG_MIN_QUALITY
+        self.jpeg_max_long_side = settings.REKOGNITION_MAX_LONG_SIDE
+        self.jpeg_min_long_side = settings.REKOGNITION_MIN_LONG_SIDE
+        self.jpeg_target_face_px = settings.REKOGNITION_TARGET_FACE_PX
+        self._face_height_ratio = None
+
+        # Local face-presence prefilter; cascades are per thread as detectMultiScale is not thread-safe
+        self.face_prefilter = settings.VISUAL_FACE_PREFILTER if face_prefilter is None else face_prefilter
+        self._cascades = threading.local()
+
+        # Near-duplicate reuse: mean absolute difference (0-255) of 64x36 grayscale thumbnails
+        self.duplicate_threshold = settings.VISUAL_DUPLICATE_THRESHOLD if duplicate_threshold is None else duplicate_threshold
+        self.duplicate_max_run = settings.VISUAL_DUPLICATE_MAX_RUN
+
+        # Local technical-quality timeline, sampled independently of Rekognition
+        self.quality_fps = settings.VISUAL_QUALITY_FPS if quality_fps is None else quality_fps
+        self.quality_batch = settings.VISUAL_QUALITY_BATCH
+
+        # frame_selection_mode="adaptive": per-video call budget and refinement thresholds
+        self.call_budget = call_budget
+        self.adaptive_min_gap_sec = adaptive_min_gap_sec
+        self.adaptive_min_change = settings.VISUAL_ADAPTIVE_MIN_CHANGE if adaptive_min_change is None else adaptive_min_change
+
+        # Live progress: process_video reports every progress_every analysed frames
+        self.progress_every = progress_every or settings.VISUAL_PROGRESS_EVERY
+        self._progress = None
+
+        # Keep each sample's raw response so results can be re-scored offline (processors/visual_archive.py)
+        self.archive_responses = settings.VISUAL_ARCHIVE_RESPONSES if archive_responses is None else archive_responses
+        self._raw_responses = None
+
+        # Decode in worker processes, one contiguous segment each, when decode_workers > 1
+        self.decode_workers = max(1, decode_workers or settings.VISUAL_DECODE_WORKERS)
+        self.decode_segment_sec = decode_segment_sec or settings.VISUAL_DECODE_SEGMENT_SEC
+        self._decoder = None
+        self._frame_count = 0  # CAP_PROP_FRAME_COUNT of the video being processed
+        if self.face_prefilter and not self._load_cascades():
+            logger.warning("Face prefilter disabled: Haar cascades not found in %s", self._cascade_dir())
+            self.face_prefilter = False
+
+        self.rekognition = rekognition_client or boto3.client(
             "rekognition",
             region_name=settings.AWS_REGION,
             aws_access_key_id=settings.AWS_ACCESS_KEY,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            config=BOTO_NO_RETRY,
         )
 
         self.WINDOW_SIZE = 5
-        self._eye_yaw_hist = []      #  for EyeDirection.Yaw
-        self._eye_pitch_hist = []    #  for EyeDirection.Pitch
-        self._head_yaw_hist = []     #  for Pose.Yaw
-        self._head_pitch_hist = []   #  for Pose.Pitch
-        self._head_roll_hist = []    #  for Pose.Roll
-        self._conn_hist = []  
 
     def _get_default_response(self, expression="no_face"):
         return {
@@ -202,13 +267,20 @@ class VisualAnalyzer:
         total_deviation = max(yaw_deviation, pitch_deviation)
         return max(0.0, 1.0 - total_deviation)
 
-    def _compute_eye_stability_from_eye_history(self, yaw_hist, pitch_hist):
-        if len(yaw_hist) < 2:
-            return 1.0
-        yaw_std = np.std(yaw_hist)
-        pitch_std = np.std(pitch_hist)
+    def _trailing_windows(self, values):
+        """
+        (n, WINDOW_SIZE) view of the trailing window ending at each sample. The first
+        WINDOW_SIZE - 1 windows are NaN-padded on the left, i.e. they only hold the
+        samples seen so far.
+        """
+        padded = np.concatenate([np.full(self.WINDOW_SIZE - 1, np.nan), np.asarray(values, dtype=float)])
+        return np.lib.stride_tricks.sliding_window_view(padded, self.WINDOW_SIZE)
+
+    def _compute_eye_stability(self, eye_yaw, eye_pitch, counts):
+        yaw_std = np.nanstd(self._trailing_windows(eye_yaw), axis=1)
+        pitch_std = np.nanstd(self._trailing_windows(eye_pitch), axis=1)
         avg_std = (yaw_std + pitch_std) / 2
-        return max(0.0, 1.0 - avg_std / 15.0)
+        return np.where(counts < 2, 1.0, np.maximum(0.0, 1.0 - avg_std / 15.0))
 
     def _compute_head_orientation_from_pose(self, yaw, pitch, roll):
         """
@@ -257,24 +329,57 @@ class VisualAnalyzer:
         final_score = max(0.0, base_score - multi_axis_penalty)
         return round(final_score, 2)
 
-    def _compute_connection_strength_from_pose(self, yaw, pitch, roll):
+    def _compute_connection_strength_from_pose(self, yaw, pitch):
         """
-        Calculate connection strength based on pose
+        Calculate connection strength based on pose (element-wise over arrays)
         """
-        if abs(yaw) <= 25 and abs(pitch) <= 20:
-            return 1.0
-        else:
-            yaw_ratio = max(0.0, 1.0 - abs(yaw)/45.0)
-            pitch_ratio = max(0.0, 1.0 - abs(pitch)/30.0)
-            return (yaw_ratio + pitch_ratio) / 2
+        yaw, pitch = np.abs(yaw), np.abs(pitch)
+        yaw_ratio = np.maximum(0.0, 1.0 - yaw / 45.0)
+        pitch_ratio = np.maximum(0.0, 1.0 - pitch / 30.0)
+        return np.where((yaw <= 25) & (pitch <= 20), 1.0, (yaw_ratio + pitch_ratio) / 2)
 
-    def _compute_posture_stability(self, conn_hist):
+    def _compute_posture_stability(self, connection_strength, counts):
         """
-        Calculate posture stability from connection history
+        Calculate posture stability as the share of well-connected frames per window
         """
-        if len(conn_hist) == 0:
-            return 1.0
-        return sum(1 for c in conn_hist if c > 0.7) / len(conn_hist)
+        return (self._trailing_windows(connection_strength) > 0.7).sum(axis=1) / counts
+
+    def _apply_stability_windows(self, analyses, has_face):
+        """
+        Fill the window-dependent fields (eye_stability, posture_stability and
+        timestamp_sec) for a timestamp-ordered sequence of per-frame analyses in one
+        vectorised pass. Only frames with a scored face take part in the windows,
+        matching the old per-call histories.
+        """
+        face_idx = np.flatnonzero(has_face)
+        if face_idx.size == 0:
+            return
+
+        def column(section, key):
+            return np.array([analyses[i][section][key] for i in face_idx], dtype=float)
+
+        counts = np.minimum(np.arange(1, face_idx.size + 1), self.WINDOW_SIZE)
+        eye_stability = self._compute_eye_stability(
+            column("eye_contact_analysis", "raw_eye_yaw"), column("eye_contact_analysis", "raw_eye_pitch"), counts
+        )
+        connection_strength = self._compute_connection_strength_from_pose(
+            column("posture_analysis", "raw_head_yaw"), column("posture_analysis", "raw_head_pitch")
+        )
+        posture_stability = self._compute_posture_stability(connection_strength, counts)
+
+        for n, i in enumerate(face_idx):
+            eye = analyses[i]["eye_contact_analysis"]
+            eye["eye_stability"] = round(float(eye_stability[n]), 2)
+            eye["eye_stability_tip"] = self._get_eye_stability_tip(eye_stability[n])
+            eye["timestamp_sec"] = int(counts[n])
+
+            posture = analyses[i]["posture_analysis"]
+            posture["posture_stability"] = round(float(posture_stability[n]), 2)
+            posture["posture_stability_tip"] = self._get_posture_stability_tip(posture_stability[n])
+            posture["timestamp_sec"] = int(counts[n])
+
+            # Expressions were stamped before the frame joined the window
+            analyses[i]["facial_expressions"]["timestamp_sec"] = min(n, self.WINDOW_SIZE)
 
     def _get_eye_contact_confidence_tip(self, score):
         if score > 0.8: return "🌟 Excellent eye contact — you're fully engaging your audience!"
@@ -363,166 +468,446 @@ class VisualAnalyzer:
     # ==================== MAIN ANALYSIS METHODS ====================
 
     def analyze_frame(self, frame_rgb):
+        """Analyse a single frame on its own; process_video applies stability windows across frames."""
+        analysis, has_face, _, _ = self._analyze_frame_scores(frame_rgb)
+        self._apply_stability_windows([analysis], [has_face])
+        return analysis
+
+    def _analyze_sampled_frame(self, frame_bgr, thumb, reuse_from=None, publish_to=None):
+        """
+        Pool task for one decoded frame: technical quality is scored on thumb, the
+        quality thumbnail of the raw decoded frame, and only then does Rekognition get
+        the contrast-boosted frame at source resolution, encoded by _encode_for_rekognition.
+        """
         try:
-            if frame_rgb is None or frame_rgb.size == 0:
-                return self._get_default_response(expression="error")
+            return self._prepare_and_analyze(frame_bgr, thumb, reuse_from, publish_to)
+        finally:
+            # Never leave duplicates of this frame waiting if preprocessing failed
+            if publish_to is not None and not publish_to.done():
+                publish_to.set_result(None)
+
+    def _prepare_and_analyze(self, frame_bgr, thumb, reuse_from, publish_to):
+        # Quality first: the contrast boost below is for Rekognition only and would
+        # inflate brightness and sharpness if it were measured
+        quality_row = self._thumb_quality_row(thumb)
+        payload_bgr = cv2.convertScaleAbs(frame_bgr, alpha=1.5, beta=70)
+        return self._analyze_frame_scores(None, payload_bgr, reuse_from, publish_to, quality_row)
+
+    def _analyze_frame_scores(self, frame_rgb, payload_bgr=None, reuse_from=None, publish_to=None, quality_row=None):
+        """
+        Detect and score one frame without touching analyzer state, so frames can be
+        analysed concurrently. Returns (analysis, has_face, call_stats, response), where
+        response is the raw Rekognition response scored (None if no call succeeded);
+        window-dependent fields are left for _apply_stability_windows. frame_rgb may be None when
+        payload_bgr is given; technical quality then comes from quality_row, the local
+        engine's row for the unprocessed frame, or is filled in later.
+
+        reuse_from is a Future holding a near-identical earlier frame's raw response,
+        used instead of a new call when it is not None. publish_to receives this
+        frame's raw response (or None) for later duplicates.
+        """
+        response = None
+        try:
+            if payload_bgr is None and (frame_rgb is None or frame_rgb.size == 0):
+                return self._get_default_response(expression="error"), False, None, None
 
-            _, encoded = cv2.imencode(".jpg", cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR), [int(cv2.IMWRITE_JPEG_QUALITY), 95])
-            if encoded is None:
-                return self._get_default_response(expression="error")
+            if reuse_from is not None:
+                response = reuse_from.result()
+                call_stats = {"reused": True}
 
-            try:
-                response = self.rekognition.detect_faces(
-                    Image={"Bytes": encoded.tobytes()},
-                    Attributes=["ALL"]
-                )
-            except Exception:
-                return self._get_default_response(expression="error")
-
-            if response.get("FaceDetails"):
-                for face in response["FaceDetails"]:
-                    if face.get("Confidence", 0.0) < self.confidence_threshold:
-                        continue
-
-                    # ---- Modularized analysis ----
-                    expression_info = self._analyze_emotions(face)
-                    expression = expression_info.get("type", "UNKNOWN")
-                    emotional_score = expression_info.get("score", 0.0)
-                    nervousness_score = expression_info.get("nervousness_score", 0.0)
-
-                    # ==================== TECHNICAL QUALITY ====================
-                    brightness_raw = self._compute_brightness(frame_rgb)
-                    sharpness_raw = self._compute_sharpness(frame_rgb)
-                    occlusion_ratio = self._compute_face_occlusion(face)
-
-                    # Normalize
-                    brightness_norm = max(0.0, min(1.0, (brightness_raw - 50) / 150))
-                    sharpness_norm = max(0.0, min(1.0, sharpness_raw / 200))
-                    occlusion_norm = 1.0 - occlusion_ratio  # invert: higher = better
-
-                    technical_quality_avg = (brightness_norm + sharpness_norm + occlusion_norm) / 3.0
-
-                    technical_quality = {
-                        "brightness": round(brightness_norm, 2),
-                        "sharpness": round(sharpness_norm, 2),
-                        "occlusion": round(occlusion_norm, 2),
-                        "average_score": round(technical_quality_avg, 2),
-                        "raw_brightness": brightness_raw,
-                        "raw_sharpness": sharpness_raw,
-                        "raw_occlusion_ratio": occlusion_ratio
-                    }
-
-                    # ==================== FACIAL EXPRESSIONS WITH NERVOUSNESS ====================
-                    facial_expressions = {
-                        "type": expression,
-                        "score": round(emotional_score, 2),
-                        "nervousness_score": round(nervousness_score, 2),
-                        "expression_tip": self._get_expression_tip(expression),
-                        "nervousness_tip": self._get_nervousness_tip(nervousness_score),
-                        "timestamp_sec": len(self._eye_yaw_hist),
-                        "window_size_sec": self.WINDOW_SIZE,
-                        "raw_emotions": face.get("Emotions", [])
-                    }
-
-                    # ==================== EYE & POSTURE METRICS ====================
-                    eye_direction = face.get("EyeDirection", {})
-                    eye_yaw = round(eye_direction.get("Yaw", 0.0), 2)
-                    eye_pitch = round(eye_direction.get("Pitch", 0.0), 2)
-
-                    pose = face.get("Pose", {})
-                    head_yaw = round(pose.get("Yaw", 0.0), 2)
-                    head_pitch = round(pose.get("Pitch", 0.0), 2)
-                    head_roll = round(pose.get("Roll", 0.0), 2)
-
-                    # Eye contact analysis
-                    eye_contact_confidence = self._compute_eye_contact_confidence_from_eye_direction(eye_yaw, eye_pitch)
-                    self._eye_yaw_hist.append(eye_yaw)
-                    self._eye_pitch_hist.append(eye_pitch)
-
-                    # Head posture analysis
-                    head_orientation = self._compute_head_orientation_from_pose(head_yaw, head_pitch, head_roll)
-                    head_orientation_score = self._map_orientation_to_score(head_orientation, head_yaw, head_pitch, head_roll)
-                    connection_strength = self._compute_connection_strength_from_pose(head_yaw, head_pitch, head_roll)
-                    
-                    self._head_yaw_hist.append(head_yaw)
-                    self._head_pitch_hist.append(head_pitch)
-                    self._head_roll_hist.append(head_roll)
-                    self._conn_hist.append(connection_strength)
-
-                    # Trim histories to maintain window size
-                    for hist in [
-                        self._eye_yaw_hist, self._eye_pitch_hist,
-                        self._head_yaw_hist, self._head_pitch_hist, self._head_roll_hist,
-                        self._conn_hist
-                    ]:
-                        if len(hist) > self.WINDOW_SIZE:
-                            hist.pop(0)
-
-                    eye_stability = self._compute_eye_stability_from_eye_history(self._eye_yaw_hist, self._eye_pitch_hist)
-                    posture_stability = self._compute_posture_stability(self._conn_hist)
-
-                    eye_contact_analysis = {
-                        "eye_contact_confidence": round(eye_contact_confidence, 2),
-                        "eye_contact_confidence_tip": self._get_eye_contact_confidence_tip(eye_contact_confidence),
-                        "eye_stability": round(eye_stability, 2),
-                        "eye_stability_tip": self._get_eye_stability_tip(eye_stability),
-                        "timestamp_sec": len(self._eye_yaw_hist),
-                        "window_size_sec": self.WINDOW_SIZE,
-                        "raw_eye_yaw": eye_yaw,
-                        "raw_eye_pitch": eye_pitch
-                    }
-
-                    posture_analysis = {
-                        "head_orientation": head_orientation,
-                        "head_orientation_score": head_orientation_score,  # Added for graphing
-                        "head_orientation_tip": self._get_head_orientation_tip(head_orientation),
-                        "posture_stability": round(posture_stability, 2),
-                        "posture_stability_tip": self._get_posture_stability_tip(posture_stability),
-                        "timestamp_sec": len(self._eye_yaw_hist),
-                        "window_size_sec": self.WINDOW_SIZE,
-                        "raw_head_yaw": head_yaw,
-                        "raw_head_pitch": head_pitch,
-                        "raw_head_roll": head_roll
-                    }
-
-                    return {
-                        "eye_contact_analysis": eye_contact_analysis,
-                        "posture_analysis": posture_analysis,
-                        "facial_expressions": facial_expressions,
-                        "technical_quality": technical_quality
-                    }
-
-            return self._get_default_response(expression="no_face")
+            if response is None:
+                if payload_bgr is None:
+                    payload_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+                if self.face_prefilter and not self._has_face_candidate(payload_bgr):
+                    return self._get_default_response(expression="no_face"), False, {"skipped": "no_face_candidate"}, None
+
+                response, call_stats = self._detect_faces(payload_bgr)
+                if response is None:
+                    return self._get_default_response(expression="error"), False, call_stats, None
+
+            analysis = self._score_frame(frame_rgb, response, quality_row=quality_row)
+            if analysis is None:
+                return self._get_default_response(expression="no_face"), False, call_stats, response
+            return analysis, True, call_stats, response
 
         except Exception as e:
             logger.error("Frame analysis error: %s", str(e))
-            return self._get_default_response(expression="error")
+            return self._get_default_response(expression="error"), False, None, None
 
-    def process_video(self, video_path):
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            logger.error("Cannot open video file: %s", video_path)
-            raise ValueError(f"Cannot open video file: {video_path}")
+        finally:
+            if publish_to is not None and not publish_to.done():
+                publish_to.set_result(response)
+
+    def _frame_signature(self, thumb):
+        """Tiny version of the quality thumbnail used to spot near-duplicate consecutive samples."""
+        return cv2.resize(thumb, (64, 36), interpolation=cv2.INTER_AREA)
+
+    def _quality_frames(self, total_frames, fps):
+        """Frame ids for the local quality timeline at quality_fps (none if disabled)."""
+        if not self.quality_fps or self.quality_fps <= 0:
+            return set()
+        step = max(1.0, fps / self.quality_fps)
+        return set(np.round(np.arange(0, total_frames, step)).astype(int).tolist()) - {total_frames}
+
+    def _technical_quality(self, row, occlusion_ratio, source):
+        """technical_quality fields from a 0-1 brightness/sharpness row; all None when there is no row."""
+        occlusion_norm = 1.0 - occlusion_ratio  # invert: higher = better
+        if row is None:
+            return {
+                "brightness": None,
+                "sharpness": None,
+                "occlusion": round(occlusion_norm, 2),
+                "average_score": None,
+                "raw_brightness": None,
+                "raw_sharpness": None,
+                "raw_occlusion_ratio": occlusion_ratio,
+                "source": None
+            }
+        return {
+            "brightness": round(row["brightness"], 2),
+            "sharpness": round(row["sharpness"], 2),
+            "occlusion": round(occlusion_norm, 2),
+            "average_score": round((row["brightness"] + row["sharpness"] + occlusion_norm) / 3.0, 2),
+            "raw_brightness": round(row["raw_brightness"], 2),
+            "raw_sharpness": round(row["raw_sharpness"], 2),
+            "raw_occlusion_ratio": occlusion_ratio,
+            "source": source
+        }
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        if fps == 0:
-            logger.error("FPS could not be determined for video: %s", video_path)
-            raise ValueError("FPS could not be determined")
+    def _local_quality_row(self, frame_rgb):
+        """The local engine's quality row for one in-memory frame (same scale as the timeline)."""
+        return self._thumb_quality_row(quality_thumbnail(cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)))
 
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        video_duration = total_frames / fps if fps > 0 else 0
+    def _thumb_quality_row(self, thumb):
+        """The local engine's quality row for one quality thumbnail."""
+        raw = frame_quality_batch(thumb[np.newaxis])
+        return {
+            **{k: float(v[0]) for k, v in normalise_quality(raw).items()},
+            **{f"raw_{k}": float(v[0]) for k, v in raw.items()},
+        }
 
-        if self.max_frames is None:
-            self.max_frames = max(1, int(video_duration))
-            logger.debug("Auto-set max_frames to %d (video duration: %.2f sec)", self.max_frames, video_duration)
+    def _apply_local_quality(self, frames, quality_rows):
+        """
+        Fill the technical_quality of face frames still waiting for it from the local
+        timeline row at their timestamp, or the nearest one within a quality sampling
+        interval (the offset is recorded). With no such row the fields stay None.
+        """
+        times = np.array(sorted(quality_rows), dtype=np.float64)
+        max_offset = 1.0 / self.quality_fps if self.quality_fps and self.quality_fps > 0 else 0.0
+        for timestamp, analysis, has_face in frames:
+            if not has_face or analysis["technical_quality"].get("source") is not None or not len(times):
+                continue
+            i = int(np.searchsorted(times, timestamp))
+            nearest = min((j for j in (i - 1, i) if 0 <= j < len(times)), key=lambda j: abs(times[j] - timestamp))
+            offset = float(times[nearest] - timestamp)
+            if abs(offset) > max_offset + 1e-6:
+                continue
+            previous = analysis["technical_quality"]
+            analysis["technical_quality"] = self._technical_quality(quality_rows[times[nearest]], previous["raw_occlusion_ratio"], "local")
+            if "reused_from" in previous:
+                analysis["technical_quality"]["reused_from"] = previous["reused_from"]
+            if offset:
+                analysis["technical_quality"]["quality_offset_sec"] = round(offset, 3)
+
+    def _cascade_dir(self):
+        return settings.VISUAL_CASCADE_DIR or cv2.data.haarcascades
+
+    def _load_cascades(self):
+        cascades = getattr(self._cascades, "value", None)
+        if cascades is None and not hasattr(cv2, "CascadeClassifier"):
+            cascades = self._cascades.value = []  # OpenCV built without objdetect
+        elif cascades is None:
+            cascades = [
+                cv2.CascadeClassifier(os.path.join(self._cascade_dir(), name))
+                for name in ("haarcascade_frontalface_default.xml", "haarcascade_profileface.xml")
+            ]
+            cascades = [c for c in cascades if not c.empty()]
+            self._cascades.value = cascades
+        return cascades
+
+    def _has_face_candidate(self, frame_bgr):
+        """
+        Cheap local check for any frontal or profile face (either direction) on a
+        downscaled grayscale copy. Tuned to be lenient: a false positive only costs
+        the Rekognition call we would have made anyway.
+        """
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        scale = min(1.0, 320.0 / max(gray.shape[:2]))
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.equalizeHist(gray)
+
+        for image in (gray, cv2.flip(gray, 1)):
+            for cascade in self._load_cascades():
+                if len(cascade.detectMultiScale(image, scaleFactor=1.2, minNeighbors=3, minSize=(20, 20))):
+                    return True
+        return False
+
+    def _encoding_scale(self, height, width):
+        """
+        Downscale factor for the Rekognition payload: cap the long side and, once the
+        speaker's face size is known, shrink until the face is about jpeg_target_face_px
+        tall. Never upscales.
+        """
+        long_side = max(height, width)
+        scale = min(1.0, self.jpeg_max_long_side / long_side)
+        if self._face_height_ratio:
+            face_scale = self.jpeg_target_face_px / (self._face_height_ratio * height)
+            scale = min(scale, max(face_scale, self.jpeg_min_long_side / long_side))
+        return min(1.0, scale)
+
+    def _encode_for_rekognition(self, frame_bgr):
+        """
+        JPEG-encode a frame under jpeg_max_bytes: lower the quality step by step down
+        to jpeg_min_quality, then keep shrinking the resolution. Returns (bytes, info).
+        """
+        height, width = frame_bgr.shape[:2]
+        scale = self._encoding_scale(height, width)
+        quality = self.jpeg_quality
+
+        while True:
+            if scale < 1.0:
+                size = (max(1, int(width * scale)), max(1, int(height * scale)))
+                resized = cv2.resize(frame_bgr, size, interpolation=cv2.INTER_AREA)
+            else:
+                resized = frame_bgr
+            ok, encoded = cv2.imencode(".jpg", resized, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            if not ok:
+                return None, None
+
+            if encoded.size <= self.jpeg_max_bytes or max(resized.shape[:2]) <= 64:
+                break
+            if quality - 10 >= self.jpeg_min_quality:
+                quality -= 10
+            else:
+                scale *= 0.8
+
+        return encoded.tobytes(), {
+            "width": int(resized.shape[1]),
+            "height": int(resized.shape[0]),
+            "quality": quality,
+            "bytes": int(encoded.size),
+        }
 
-        if self.frame_selection_mode == "specific_frames" and self.specific_frames:
-            target_frames = sorted(self.specific_frames)[:self.max_frames]
-        elif self.frame_selection_mode == "sequential":
-            target_frames = list(range(0, total_frames, int(fps)))[:self.max_frames]
-        else:
-            target_frames = [int(t * fps) for t in self.timestamps][:self.max_frames]
+    def _detect_faces(self, frame_bgr):
+        """
+        Encode one frame and send it to Rekognition. Returns (response, call_stats);
+        response is None if encoding or the call failed. Holds no analyzer state, so
+        it is safe to run on several frames concurrently.
+        """
+        image_bytes, call_stats = self._encode_for_rekognition(frame_bgr)
+        if image_bytes is None:
+            return None, None
+
+        started = time.perf_counter()
+        try:
+            # Throttling is retried with backoff by the shared limiter instead of becoming an error frame
+            response = outbound_limiter.call(
+                "rekognition",
+                lambda: self.rekognition.detect_faces(
+                    Image={"Bytes": image_bytes},
+                    Attributes=["ALL"]
+                ),
+                key=settings.AWS_ACCESS_KEY,
+            )
+        except Exception as e:
+            logger.error("Rekognition detect_faces failed: %s", str(e))
+            response = None
+
+        call_stats["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        faces = [f for f in (response or {}).get("FaceDetails") or [] if f.get("Confidence", 0.0) >= self.confidence_threshold]
+        if faces:
+            call_stats["face_height_ratio"] = faces[0].get("BoundingBox", {}).get("Height")
+        return response, call_stats
+
+    def _score_frame(self, frame_rgb, response, quality_source=None, quality_row=None):
+        """
+        Score the first confident face in one Rekognition response, or None if there
+        is none. frame_rgb may be None when only the response is available; technical
+        quality then comes from quality_row (the local engine's row, already measured),
+        from quality_source ("rekognition_face" for backends with no pixels) or is left
+        empty for _apply_local_quality.
+        """
+        for face in response.get("FaceDetails") or []:
+            if face.get("Confidence", 0.0) < self.confidence_threshold:
+                continue
+
+            # ---- Modularized analysis ----
+            expression_info = self._analyze_emotions(face)
+            expression = expression_info.get("type", "UNKNOWN")
+            emotional_score = expression_info.get("score", 0.0)
+            nervousness_score = expression_info.get("nervousness_score", 0.0)
+
+            # ==================== TECHNICAL QUALITY ====================
+            occlusion_ratio = self._compute_face_occlusion(face)
+            source = "local" if frame_rgb is not None or quality_row is not None else quality_source
+            if quality_row is not None:
+                row = quality_row
+            elif frame_rgb is not None:
+                row = self._local_quality_row(frame_rgb)
+            elif quality_source == "rekognition_face":
+                # No pixels (Rekognition Video jobs): every sample uses Rekognition's own 0-100 face quality
+                quality = face.get("Quality", {})
+                brightness_raw, sharpness_raw = quality.get("Brightness", 0.0), quality.get("Sharpness", 0.0)
+                row = {
+                    "brightness": max(0.0, min(1.0, brightness_raw / 100)),
+                    "sharpness": max(0.0, min(1.0, sharpness_raw / 100)),
+                    "raw_brightness": brightness_raw,
+                    "raw_sharpness": sharpness_raw,
+                }
+            else:
+                # Filled in from the local quality timeline by _apply_local_quality
+                row = None
+            technical_quality = self._technical_quality(row, occlusion_ratio, source if row is not None else None)
+
+            # ==================== FACIAL EXPRESSIONS WITH NERVOUSNESS ====================
+            facial_expressions = {
+                "type": expression,
+                "score": round(emotional_score, 2),
+                "nervousness_score": round(nervousness_score, 2),
+                "expression_tip": self._get_expression_tip(expression),
+                "nervousness_tip": self._get_nervousness_tip(nervousness_score),
+                "timestamp_sec": None,  # set by _apply_stability_windows
+                "window_size_sec": self.WINDOW_SIZE,
+                "raw_emotions": face.get("Emotions", [])
+            }
+
+            # ==================== EYE & POSTURE METRICS ====================
+            eye_direction = face.get("EyeDirection", {})
+            eye_yaw = round(eye_direction.get("Yaw", 0.0), 2)
+            eye_pitch = round(eye_direction.get("Pitch", 0.0), 2)
+
+            pose = face.get("Pose", {})
+            head_yaw = round(pose.get("Yaw", 0.0), 2)
+            head_pitch = round(pose.get("Pitch", 0.0), 2)
+            head_roll = round(pose.get("Roll", 0.0), 2)
+
+            eye_contact_confidence = self._compute_eye_contact_confidence_from_eye_direction(eye_yaw, eye_pitch)
+            head_orientation = self._compute_head_orientation_from_pose(head_yaw, head_pitch, head_roll)
+            head_orientation_score = self._map_orientation_to_score(head_orientation, head_yaw, head_pitch, head_roll)
+
+            # Stability fields depend on neighbouring frames and are filled in afterwards
+            eye_contact_analysis = {
+                "eye_contact_confidence": round(eye_contact_confidence, 2),
+                "eye_contact_confidence_tip": self._get_eye_contact_confidence_tip(eye_contact_confidence),
+                "eye_stability": None,
+                "eye_stability_tip": None,
+                "timestamp_sec": None,
+                "window_size_sec": self.WINDOW_SIZE,
+                "raw_eye_yaw": eye_yaw,
+                "raw_eye_pitch": eye_pitch
+            }
+
+            posture_analysis = {
+                "head_orientation": head_orientation,
+                "head_orientation_score": head_orientation_score,  # Added for graphing
+                "head_orientation_tip": self._get_head_orientation_tip(head_orientation),
+                "posture_stability": None,
+                "posture_stability_tip": None,
+                "timestamp_sec": None,
+                "window_size_sec": self.WINDOW_SIZE,
+                "raw_head_yaw": head_yaw,
+                "raw_head_pitch": head_pitch,
+                "raw_head_roll": head_roll
+            }
 
+            return {
+                "eye_contact_analysis": eye_contact_analysis,
+                "posture_analysis": posture_analysis,
+                "facial_expressions": facial_expressions,
+                "technical_quality": technical_quality
+            }
+
+        return None
+
+    def _iter_sampled_frames(self, cap, target_frames, fps):
+        """Yield (frame_id, frame) for each target frame in ascending order (see visual_decode)."""
+        return iter_sampled_frames(cap, target_frames, fps, self.seek_min_gap_sec)
+
+    def _decoded_frames(self, cap, fps, target_frames, quality_frames):
+        """
+        Yield (frame_id, frame, thumbnail) for target_frames | quality_frames in order,
+        from the segment decoder's worker processes when one is running. frame may be
+        None for frames that are not Rekognition targets; targets are already capped at
+        the Rekognition payload's long side, thumbnails come from the full frame.
+        """
+        if self._decoder is not None:
+            yield from self._decoder.iter_frames(target_frames | quality_frames, target_frames)
+            return
+        for frame_id, frame in self._iter_sampled_frames(cap, target_frames | quality_frames, fps):
+            thumb = quality_thumbnail(frame)
+            yield frame_id, cap_frame(frame, self.jpeg_max_long_side) if frame_id in target_frames else None, thumb
+
+    def _collect_frame(self, frames, call_stats, timestamp, future, reused_from=None):
+        """
+        Wait for one frame's analysis and append (timestamp, analysis, has_face) to frames.
+        reused_from is the frame id whose response this frame was offered; when it was
+        actually reused, every section of the analysis and the call stats record it.
+        """
+        try:
+            analysis, has_face, stats, response = future.result() if future is not None else (None, False, None, None)
+        except Exception as e:
+            logger.error("Failed processing frame at %.2fs: %s", timestamp, str(e))
+            analysis, has_face, stats, response = None, False, None, None
+
+        if analysis is None:
+            analysis = self._get_default_response(expression="error")
+        if reused_from is not None and stats is not None and stats.get("reused"):
+            stats = {**stats, "reused_from": reused_from}
+            self._mark_reused(analysis, reused_from)
+        frames.append((timestamp, analysis, has_face))
+        if self._raw_responses is not None:
+            self._raw_responses.append(archive_record(timestamp, response, stats))
+        if self._progress is not None:
+            self._progress.frame_done(analysis)
+        if stats is not None:
+            call_stats.append({"time": timestamp, **stats})
+
+    def _mark_reused(self, analysis, frame_id):
+        """Record, in every section, the frame whose Rekognition response this analysis reused."""
+        for section in ("eye_contact_analysis", "posture_analysis", "facial_expressions", "technical_quality"):
+            analysis[section]["reused_from"] = frame_id
+
+    def _summarize_call_stats(self, call_stats):
+        calls = [s for s in call_stats if "skipped" not in s and "reused" not in s]
+        skipped = sum(1 for s in call_stats if "skipped" in s)
+        reused = sum(1 for s in call_stats if "reused" in s)
+        latencies = [s["latency_ms"] for s in calls]
+        sizes = [s["bytes"] for s in calls]
+        return {
+            "rekognition_calls": len(calls),
+            "prefilter": {
+                "enabled": self.face_prefilter,
+                "frames_skipped": skipped,
+                "skip_rate": round(skipped / len(call_stats), 3) if call_stats else 0.0,
+            },
+            "frame_reuse": {
+                "threshold": self.duplicate_threshold,
+                "max_run": self.duplicate_max_run,
+                "frames_reused": reused,
+                "reuse_rate": round(reused / len(call_stats), 3) if call_stats else 0.0,
+            },
+            "bytes_sent_total": int(sum(sizes)),
+            "avg_bytes_per_call": round(float(np.mean(sizes)), 1) if sizes else 0.0,
+            "avg_call_latency_ms": round(float(np.mean(latencies)), 1) if latencies else 0.0,
+            "p95_call_latency_ms": round(float(np.percentile(latencies, 95)), 1) if latencies else 0.0,
+            "face_height_ratio": self._face_height_ratio,
+            "frames": call_stats,
+        }
+
+    def _compute_overall_averages(self, r):
+        averages = RunningAverages()
+        sections = ("eye_contact_analysis", "posture_analysis", "facial_expressions", "technical_quality")
+        for row in zip(*(r[section] for section in sections)):
+            averages.add({section: frame["analysis"] for section, frame in zip(sections, row)})
+        return averages.averages()
+
+    def _build_results(self, frames):
+        """
+        Turn timestamp-ordered (time, analysis, has_face) tuples into the stored
+        visual_insights layout: stability windows, per-section lists, overall
+        averages and their tips.
+        """
         results = {
             "eye_contact_analysis": [],
             "posture_analysis": [],
@@ -530,153 +915,18 @@ class VisualAnalyzer:
             "technical_quality": []
         }
 
-        frame_id = processed_frames = 0
+        self._apply_stability_windows([f[1] for f in frames], [f[2] for f in frames])
 
-        while cap.isOpened() and processed_frames < self.max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if frame_id in target_frames:
-                timestamp = frame_id / fps
-                try:
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frame_rgb = cv2.resize(frame_rgb, (1920, 1080))
-                    frame_rgb = cv2.convertScaleAbs(frame_rgb, alpha=1.5, beta=70)
-                    frame_rgb = cv2.GaussianBlur(frame_rgb, (5, 5), 0)
-
-                    analysis = self.analyze_frame(frame_rgb)
-
-                    # STORE EYE CONTACT ANALYSIS
-                    eye_analysis = analysis.get("eye_contact_analysis", self._get_default_response()["eye_contact_analysis"])
-                    results["eye_contact_analysis"].append({
-                        "time": timestamp,
-                        "analysis": eye_analysis
-                    })
-
-                    # STORE POSTURE ANALYSIS
-                    posture_analysis = analysis.get("posture_analysis", self._get_default_response()["posture_analysis"])
-                    results["posture_analysis"].append({
-                        "time": timestamp,
-                        "analysis": posture_analysis
-                    })
-
-                    # STORE FACIAL EXPRESSIONS
-                    facial_expressions = analysis.get("facial_expressions", self._get_default_response()["facial_expressions"])
-                    results["facial_expressions"].append({
-                        "time": timestamp,
-                        "analysis": facial_expressions
-                    })
-
-                    # STORE TECHNICAL QUALITY
-                    technical_quality = analysis.get("technical_quality", self._get_default_response()["technical_quality"])
-                    results["technical_quality"].append({
-                        "time": timestamp,
-                        "analysis": technical_quality
-                    })
-
-                except Exception as e:
-                    logger.error("Failed processing frame %d: %s", frame_id, str(e))
-                    default = self._get_default_response(expression="error")
-
-                    results["eye_contact_analysis"].append({
-                        "time": timestamp,
-                        "analysis": default["eye_contact_analysis"]
-                    })
-
-                    results["posture_analysis"].append({
-                        "time": timestamp,
-                        "analysis": default["posture_analysis"]
-                    })
-
-                    results["facial_expressions"].append({
-                        "time": timestamp,
-                        "analysis": default["facial_expressions"]
-                    })
-
-                    results["technical_quality"].append({
-                        "time": timestamp,
-                        "analysis": default["technical_quality"]
-                    })
-
-                processed_frames += 1
-                target_frames.remove(frame_id)
-
-            frame_id += 1
-
-        cap.release()
-        logger.info("Video processing completed for %s", video_path)
+        default = self._get_default_response()
+        for timestamp, analysis, _ in frames:
+            for section in ("eye_contact_analysis", "posture_analysis", "facial_expressions", "technical_quality"):
+                results[section].append({
+                    "time": timestamp,
+                    "analysis": analysis.get(section, default[section])
+                })
 
         # ===== COMPUTE OVERALL AVERAGES =====
-        def compute_overall_averages(r):
-            metrics = {
-                "avg_eye_contact_confidence": 0.0,
-                "avg_eye_stability": 0.0,
-                "avg_posture_stability": 0.0,
-                "avg_head_orientation_score": 0.0,
-                "avg_emotional_score": 0.0,  # Added
-                "avg_dominant_emotion": "NEUTRAL",  # Added
-                "avg_nervousness_score": 0.0,
-                "avg_technical_quality": 0.0,
-                "avg_brightness": 0.0,  # Added individual technical metrics
-                "avg_sharpness": 0.0,   # Added
-                "avg_occlusion": 0.0    # Added (lower is better - less occlusion)
-            }
-
-            if r["eye_contact_analysis"]:
-                metrics["avg_eye_contact_confidence"] = np.mean([
-                    f["analysis"]["eye_contact_confidence"] for f in r["eye_contact_analysis"]
-                ])
-                metrics["avg_eye_stability"] = np.mean([
-                    f["analysis"]["eye_stability"] for f in r["eye_contact_analysis"]
-                ])
-
-            if r["posture_analysis"]:
-                metrics["avg_posture_stability"] = np.mean([
-                    f["analysis"]["posture_stability"] for f in r["posture_analysis"]
-                ])
-                metrics["avg_head_orientation_score"] = np.mean([
-                    f["analysis"]["head_orientation_score"] for f in r["posture_analysis"]
-                ])
-
-            if r["facial_expressions"]:
-                # Calculate average emotional score
-                emotional_scores = [f["analysis"]["score"] for f in r["facial_expressions"]]
-                metrics["avg_emotional_score"] = np.mean(emotional_scores)
-                
-                # Find most common emotion (mode)
-                emotions = [f["analysis"]["type"] for f in r["facial_expressions"]]
-                if emotions:
-                    from collections import Counter
-                    emotion_counts = Counter(emotions)
-                    metrics["avg_dominant_emotion"] = emotion_counts.most_common(1)[0][0]
-                
-                metrics["avg_nervousness_score"] = np.mean([
-                    f["analysis"]["nervousness_score"] for f in r["facial_expressions"]
-                ])
-
-            if r["technical_quality"]:
-                metrics["avg_technical_quality"] = np.mean([
-                    f["analysis"]["average_score"] for f in r["technical_quality"]
-                ])
-                
-                # Individual technical quality metrics
-                metrics["avg_brightness"] = np.mean([
-                    f["analysis"]["brightness"] for f in r["technical_quality"]
-                ])
-                
-                metrics["avg_sharpness"] = np.mean([
-                    f["analysis"]["sharpness"] for f in r["technical_quality"]
-                ])
-                
-                metrics["avg_occlusion"] = np.mean([
-                    f["analysis"]["occlusion"] for f in r["technical_quality"]
-                ])
-
-            return {k: round(v, 2) if isinstance(v, (int, float)) else v for k, v in metrics.items()}
-
-        results["overall_averages"] = compute_overall_averages(results)
-
+        results["overall_averages"] = self._compute_overall_averages(results)
 
         # ===== GENERATE TOOLTIPS FOR OVERALL AVERAGES =====
         oa = results["overall_averages"]
@@ -698,58 +948,392 @@ class VisualAnalyzer:
             oa[tip_key] = self._get_overall_tip(field, oa[field])
 
         return results
-    
-# Background task for image processing
-async def process_visual_analysis(video_id: str, s3_url: str, description: str, frame_selection_mode: str = "sequential", specific_frames: list = None, timestamps: list = None, max_frames: int = None, frame_interval: float = 1):
-    logger.info(f"[INFO] Starting visual analysis for video ID {video_id}")
 
-    bucket = s3_url.split("/")[2].split(".")[0]
-    key = "/".join(s3_url.split("/")[3:])
+    def _target_frames(self, total_frames, fps):
+        video_duration = total_frames / fps if fps > 0 else 0
+
+        if self.max_frames is None:
+            self.max_frames = max(1, int(video_duration))
+            logger.debug("Auto-set max_frames to %d (video duration: %.2f sec)", self.max_frames, video_duration)
+
+        if self.frame_selection_mode == "specific_frames" and self.specific_frames:
+            return sorted(self.specific_frames)[:self.max_frames]
+        elif self.frame_selection_mode in ("sequential", "adaptive"):
+            # adaptive picks its own frames in process_video; this grid is for other backends
+            return list(range(0, total_frames, int(fps)))[:self.max_frames]
+        else:
+            return [int(t * fps) for t in self.timestamps][:self.max_frames]
+
+    def _analyze_frame_ids(self, cap, fps, pool, target_frames, quality_frames, quality, frames, call_stats,
+                           allow_reuse=True):
+        """
+        One decode pass over target_frames | quality_frames. Decode happens here;
+        preprocess + encode + detect + score run on the pool, and results for the
+        Rekognition targets are appended to frames in timestamp order as the oldest
+        frame completes. allow_reuse=False sends every target to Rekognition, for
+        target sets whose consecutive frames are not neighbours in the video.
+        """
+        in_flight = deque()
+        anchor_signature, anchor_response, anchor_id, reuse_run = None, None, None, 0
+        decoded_targets = set()
+        for frame_id, frame, thumb in self._decoded_frames(cap, fps, target_frames, quality_frames):
+            timestamp = frame_id / fps
+            if self._first_frame_at is None:
+                self._first_frame_at = time.perf_counter()
+
+            # Every decoded frame feeds the local quality timeline; only the
+            # Rekognition targets go on to the pool
+            quality.add(timestamp, thumb)
+            if frame_id not in target_frames:
+                continue
+            decoded_targets.add(frame_id)
+
+            # Near-duplicates of the last frame actually sent reuse its raw response
+            # (the pool is FIFO, so the anchor's task always starts first)
+            signature = self._frame_signature(thumb)
+            if (allow_reuse and anchor_signature is not None and self.duplicate_threshold > 0
+                    and reuse_run < self.duplicate_max_run
+                    and float(np.mean(cv2.absdiff(signature, anchor_signature))) <= self.duplicate_threshold):
+                reuse_run += 1
+                future = pool.submit(self._analyze_sampled_frame, frame, thumb, anchor_response)
+                in_flight.append((timestamp, future, anchor_id))
+            else:
+                anchor_signature, anchor_response, anchor_id, reuse_run = signature, Future(), frame_id, 0
+                future = pool.submit(self._analyze_sampled_frame, frame, thumb, None, anchor_response)
+                in_flight.append((timestamp, future, None))
+
+            # The first frame is analysed alone so its face size can steer the
+            # encoding of every later frame, independent of max_in_flight
+            if not frames:
+                self._collect_frame(frames, call_stats, *in_flight.popleft())
+                self._face_height_ratio = (call_stats[0].get("face_height_ratio") if call_stats else None)
+            elif len(in_flight) >= self.max_in_flight:
+                self._collect_frame(frames, call_stats, *in_flight.popleft())
+
+        while in_flight:
+            self._collect_frame(frames, call_stats, *in_flight.popleft())
+        self._check_complete(target_frames, decoded_targets, fps)
+
+    def _check_complete(self, target_frames, decoded_targets, fps):
+        """
+        Raise VideoTruncatedError when the decoder stopped early. A failed grab()/read()
+        only ends the frame iterator, so without this a dropped stream would be stored as
+        a complete analysis of part of the video. Targets within a second of the reported
+        frame count are allowed to be missing, since containers often overstate it.
+        """
+        complete_before = self._frame_count - max(1, int(round(fps)))
+        missing = sorted(f for f in target_frames if f not in decoded_targets and f < complete_before)
+        if missing:
+            last = max(decoded_targets) if decoded_targets else None
+            raise VideoTruncatedError(
+                f"decoding stopped at frame {last} of {self._frame_count}; "
+                f"{len(missing)} sampled frames from frame {missing[0]} on were never read"
+            )
+
+    # ==================== ADAPTIVE SCHEDULING ====================
 
+    def _change_score(self, a, b):
+        """
+        How sharply things changed between two analysed samples (0 = identical,
+        about 1 = a large change in head pose, gaze, expression or face presence).
+        """
+        (analysis_a, face_a), (analysis_b, face_b) = a, b
+        if face_a != face_b:
+            return 1.0
+        if not face_a:
+            return 0.0
+
+        pose_a, pose_b = analysis_a["posture_analysis"], analysis_b["posture_analysis"]
+        eye_a, eye_b = analysis_a["eye_contact_analysis"], analysis_b["eye_contact_analysis"]
+        expr_a, expr_b = analysis_a["facial_expressions"], analysis_b["facial_expressions"]
+
+        head = abs(pose_a["raw_head_yaw"] - pose_b["raw_head_yaw"]) / 30.0 + abs(pose_a["raw_head_pitch"] - pose_b["raw_head_pitch"]) / 20.0
+        gaze = abs(eye_a["raw_eye_yaw"] - eye_b["raw_eye_yaw"]) / 25.0 + abs(eye_a["raw_eye_pitch"] - eye_b["raw_eye_pitch"]) / 20.0
+        emotions_a = {e["Type"]: e["Confidence"] for e in expr_a.get("raw_emotions", [])}
+        emotions_b = {e["Type"]: e["Confidence"] for e in expr_b.get("raw_emotions", [])}
+        expression = sum(abs(emotions_a.get(k, 0.0) - emotions_b.get(k, 0.0)) for k in set(emotions_a) | set(emotions_b)) / 200.0
+        if expr_a["type"] != expr_b["type"]:
+            expression = max(expression, 0.5)
+
+        return max(head, gaze, expression)
+
+    def _call_budget(self, total_frames, fps):
+        duration = total_frames / fps if fps > 0 else 0
+        budget = self.call_budget or max(2, int(np.ceil(duration / 60.0 * settings.VISUAL_CALLS_PER_MINUTE)))
+        return min(budget, self.max_frames) if self.max_frames else budget
+
+    def _run_adaptive_schedule(self, cap, fps, total_frames, pool, quality_frames, quality, frames, call_stats):
+        """
+        Spend a per-video Rekognition call budget unevenly. Half of it goes to a coarse
+        uniform pass. The rest refines, round by round, the intervals between neighbouring
+        samples whose head pose, gaze or expression changed most, by sampling their
+        midpoints. Stops early once no interval changes by adaptive_min_change.
+        """
+        budget = self._call_budget(total_frames, fps)
+
+        coarse = set(np.round(np.linspace(0, max(0, total_frames - 1), max(2, budget // 2))).astype(int).tolist())
+        self._analyze_frame_ids(cap, fps, pool, coarse, quality_frames, quality, frames, call_stats)
+
+        min_gap = max(2, int(round(fps * self.adaptive_min_gap_sec)))
+        remaining, rounds = budget - len(coarse), 0
+        while remaining > 0:
+            by_frame = {int(round(t * fps)): (analysis, has_face) for t, analysis, has_face in frames}
+            ids = sorted(by_frame)
+            intervals = [
+                (self._change_score(by_frame[left], by_frame[right]), right - left, left, right)
+                for left, right in zip(ids, ids[1:])
+                if right - left >= 2 * min_gap
+            ]
+            intervals = [i for i in intervals if i[0] >= self.adaptive_min_change]
+            if not intervals:
+                break
+
+            intervals.sort(reverse=True)
+            picked = intervals[:min(remaining, max(4, self.max_in_flight))]
+            midpoints = {(left + right) // 2 for _, _, left, right in picked}
+            # Consecutive midpoints belong to different intervals, and each was picked
+            # because its endpoints differ, so none may reuse another's response
+            self._analyze_frame_ids(cap, fps, pool, midpoints, set(), quality, frames, call_stats, allow_reuse=False)
+            frames.sort(key=lambda f: f[0])
+            remaining -= len(midpoints)
+            rounds += 1
+
+        return {
+            "mode": "adaptive",
+            "call_budget": budget,
+            "coarse_samples": len(coarse),
+            "refined_samples": len(frames) - len(coarse),
+            "refinement_rounds": rounds,
+        }
+
+    def process_video(self, video_path, on_progress=None):
+        """
+        Analyse a local file or an http(s) URL such as a presigned S3 link (read with ranged GETs).
+        on_progress, if given, receives a ProgressTracker snapshot every progress_every frames.
+        """
+        started = time.perf_counter()
+        self._first_frame_at = None
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            logger.error("Cannot open video file: %s", _redact_url(video_path))
+            raise VideoSourceError(f"Cannot open video file: {_redact_url(video_path)}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps == 0:
+            cap.release()
+            logger.error("FPS could not be determined for video: %s", _redact_url(video_path))
+            raise VideoSourceError("FPS could not be determined")
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._frame_count = total_frames
+        target_frames = set(self._target_frames(total_frames, fps))
+        quality_frames = self._quality_frames(total_frames, fps)
+        quality = QualityTimeline(batch_size=self.quality_batch)
+
+        expected = self._call_budget(total_frames, fps) if self.frame_selection_mode == "adaptive" else len(target_frames)
+        self._progress = ProgressTracker(expected, on_progress, self.progress_every)
+        self._raw_responses = [] if self.archive_responses else None
+
+        self._face_height_ratio = None
+        frames, call_stats = [], []
+        if self.decode_workers > 1:
+            frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            self._decoder = SegmentDecoder(video_path, fps, self.decode_workers, self.decode_segment_sec, self.seek_min_gap_sec,
+                                           frame_size=frame_size, max_long_side=self.jpeg_max_long_side,
+                                           max_inflight_bytes=int(settings.VISUAL_DECODE_MAX_INFLIGHT_MB * 1024 * 1024))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                if self.frame_selection_mode == "adaptive":
+                    scheduler_stats = self._run_adaptive_schedule(cap, fps, total_frames, pool, quality_frames, quality, frames, call_stats)
+                else:
+                    self._analyze_frame_ids(cap, fps, pool, target_frames, quality_frames, quality, frames, call_stats)
+                    scheduler_stats = {"mode": self.frame_selection_mode}
+            decode_stats = {"workers": self.decode_workers}
+            if self._decoder is not None:
+                decode_stats["segments"] = self._decoder.segments_decoded
+                decode_stats["peak_inflight_bytes"] = self._decoder.peak_inflight_bytes
+        finally:
+            if self._decoder is not None:
+                self._decoder.close()
+                self._decoder = None
+            cap.release()
+        logger.info("Video processing completed for %s", _redact_url(video_path))
+        self._progress.flush(done=True)
+        self._progress = None
+
+        frames.sort(key=lambda f: f[0])
+        call_stats.sort(key=lambda s: s["time"])
+
+        quality_rows = quality.rows_by_time()
+        self._apply_local_quality(frames, quality_rows)
+        results = self._build_results(frames)
+        if self._raw_responses is not None:
+            # What offline re-scoring needs: the raw FaceDetails plus the local quality row of each sample
+            for record in self._raw_responses:
+                record["quality"] = quality_rows.get(record["t"])
+            results["raw_responses"] = sorted(self._raw_responses, key=lambda r: r["t"])
+            self._raw_responses = None
+        results["quality_timeline"] = quality.to_dict(self.quality_fps)
+        results["processing_stats"] = self._summarize_call_stats(call_stats)
+        results["processing_stats"]["scheduler"] = scheduler_stats
+        results["processing_stats"]["decode"] = decode_stats
+        results["processing_stats"]["time_to_first_frame_sec"] = (
+            round(self._first_frame_at - started, 3) if self._first_frame_at is not None else None
+        )
+        return results
+    
+def _store_visual_results(video_id: str, s3_url: str, description: str, analysis_results: dict):
+    raw_responses = analysis_results.pop("raw_responses", None)
+    if raw_responses is not None:
+        try:
+            archive_responses(video_id, raw_responses)
+        except Exception as e:
+            # The archive only serves re-scoring; never fail the analysis over it
+            logger.warning("Could not archive Rekognition responses for video %s: %s", video_id, str(e))
+
+    image_analysis_collection.insert_one({
+        "video_id": ObjectId(video_id),
+        "s3_url": s3_url,
+        "description": description,
+        "visual_insights": encode_visual_insights(analysis_results) if settings.VISUAL_COMPACT_STORAGE else analysis_results
+    })
+    from db import videos_collection
+    videos_collection.update_one(
+        {"_id": ObjectId(video_id)},
+        {"$set": {"status_image": "completed"}}
+    )
+
+    logger.info(f"[INFO] Visual analysis data stored for video ID {video_id}")
+
+
+def _progress_publisher(video_id: str):
+    """Callback that records a ProgressTracker snapshot as image_progress on the video doc."""
+    from db import videos_collection
+
+    def publish(progress: dict):
+        videos_collection.update_one(
+            {"_id": ObjectId(video_id)},
+            {"$set": {"image_progress": {**progress, "updated_at": datetime.utcnow()}}}
+        )
+    return publish
+
+
+def _resolve_visual_backend(backend: str, bucket: str, key: str) -> str:
+    backend = (backend or settings.VISUAL_BACKEND).lower()
+    if backend != "auto":
+        return backend
+    try:
+        size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    except Exception as e:
+        logger.warning("Could not size s3://%s/%s, sampling frames locally: %s", bucket, key, str(e))
+        return "frames"
+    return "video_job" if size >= settings.VISUAL_VIDEO_JOB_MIN_MB * 1024 * 1024 else "frames"
+
+
+def _redact_url(source: str) -> str:
+    # Presigned URLs carry credentials in the query string
+    return source.split("?", 1)[0]
+
+
+def _analyze_streamed(analyzer_kwargs: dict, bucket: str, key: str, s3=None, on_progress=None):
+    """
+    Sample frames straight from a presigned URL: FFmpeg reads the object with ranged
+    GETs, so decoding starts as soon as the index is read and nothing touches disk.
+    Returns None when the URL cannot be opened, so the caller can fall back to a download.
+    """
+    s3 = s3 or s3_client
+    url = s3.generate_presigned_url(
+        "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=settings.VISUAL_PRESIGNED_URL_TTL
+    )
+    try:
+        results = VisualAnalyzer(**analyzer_kwargs).process_video(url, on_progress)
+    except VideoSourceError as e:
+        # Includes a stream cut off part way (VideoTruncatedError); the partial run is discarded
+        logger.warning("Could not stream s3://%s/%s, downloading instead: %s", bucket, key, str(e))
+        return None
+    results["processing_stats"]["input"] = {"mode": "stream", "temp_disk_bytes": 0}
+    return results
+
+
+def _analyze_downloaded(analyzer_kwargs: dict, bucket: str, key: str, s3=None, on_progress=None):
+    """Download the object to a temp file, analyse it and delete it."""
+    s3 = s3 or s3_client
+    started = time.perf_counter()
     with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_video:
+        local_video_path = temp_video.name
+    try:
         try:
             logger.debug("[DEBUG] Downloading video from s3://%s/%s", bucket, key)
-            s3_client.download_file(bucket, key, temp_video.name)
-            logger.debug("[DEBUG] Downloaded video to %s", temp_video.name)
-        except s3_client.exceptions.ClientError as e:
+            s3.download_file(bucket, key, local_video_path)
+            logger.debug("[DEBUG] Downloaded video to %s", local_video_path)
+        except s3.exceptions.ClientError as e:
             logger.error(f"[ERROR] Failed to download from S3: {e}")
             raise
-
-        local_video_path = temp_video.name
+        download_sec = time.perf_counter() - started
 
         try:
-            analyzer = VisualAnalyzer(
-                frame_interval=frame_interval,
-                max_frames=max_frames,  # Allow None for dynamic calculation
-                confidence_threshold=0.5,
-                frame_selection_mode=frame_selection_mode,
-                specific_frames=specific_frames,
-                timestamps=timestamps
-            )
-            analysis_results = analyzer.process_video(local_video_path)
-
-            image_analysis_collection.insert_one({
-                "video_id": ObjectId(video_id),
-                "s3_url": s3_url,
-                "description": description,
-                "visual_insights": analysis_results
-            })
-            from db import videos_collection
-            videos_collection.update_one(
-                {"_id": ObjectId(video_id)},
-                {"$set": {"status_image": "completed"}}
-            )
+            results = VisualAnalyzer(**analyzer_kwargs).process_video(local_video_path, on_progress)
+        except VideoTruncatedError as e:
+            # The whole object is on disk, so there is nothing left to fall back to
+            logger.error(f"[ERROR] Downloaded video s3://{bucket}/{key} is truncated or damaged: {e}")
+            raise
+        stats = results["processing_stats"]
+        if stats.get("time_to_first_frame_sec") is not None:
+            stats["time_to_first_frame_sec"] = round(stats["time_to_first_frame_sec"] + download_sec, 3)
+        stats["input"] = {
+            "mode": "download",
+            "download_sec": round(download_sec, 3),
+            "temp_disk_bytes": os.path.getsize(local_video_path),
+        }
+        return results
+    finally:
+        try:
+            os.remove(local_video_path)
+            logger.info(f"[INFO] Temporary file deleted: {local_video_path}")
+        except Exception as e:
+            logger.error(f"[ERROR] Failed to delete temporary file: {e}")
 
-            logger.info(f"[INFO] Visual analysis data stored for video ID {video_id}")
 
+# Background task for image processing
+async def process_visual_analysis(video_id: str, s3_url: str, description: str, frame_selection_mode: str = None, specific_frames: list = None, timestamps: list = None, max_frames: int = None, frame_interval: float = 1, backend: str = None, video_job: dict = None):
+    logger.info(f"[INFO] Starting visual analysis for video ID {video_id}")
+
+    bucket = s3_url.split("/")[2].split(".")[0]
+    key = "/".join(s3_url.split("/")[3:])
+
+    analyzer_kwargs = dict(
+        frame_interval=frame_interval,
+        max_frames=max_frames,  # Allow None for dynamic calculation
+        confidence_threshold=0.5,
+        frame_selection_mode=frame_selection_mode or settings.VISUAL_FRAME_SELECTION_MODE,
+        specific_frames=specific_frames,
+        timestamps=timestamps
+    )
+
+    # Rekognition calls block on the shared rate limiter, so all of this runs off the event loop
+    if await asyncio.to_thread(_resolve_visual_backend, backend, bucket, key) == "video_job":
+        # Rekognition reads the object from S3 itself; nothing is downloaded here
+        from processors.visual_video_job import RekognitionVideoAnalyzer
+        try:
+            analysis_results = await asyncio.to_thread(RekognitionVideoAnalyzer(**analyzer_kwargs).process_s3_video, bucket, key, video_job)
+            await asyncio.to_thread(_store_visual_results, video_id, s3_url, description, analysis_results)
+        except JobPending:
+            # Still running on Rekognition's side; the queue requeues the wait with video_job set
+            logger.info(f"[INFO] Rekognition video job for video ID {video_id} still running; requeued")
+            raise
         except Exception as e:
             logger.error(f"[ERROR] Visual analysis failed for video ID {video_id}: {str(e)}")
             raise
-
-        finally:
-            try:
-                os.remove(local_video_path)
-                logger.info(f"[INFO] Temporary file deleted: {local_video_path}")
-            except Exception as e:
-                logger.error(f"[ERROR] Failed to delete temporary file: {e}")
-
+        return
+
+    try:
+        analysis_results = None
+        on_progress = _progress_publisher(video_id)
+        if settings.VISUAL_INPUT_MODE == "stream":
+            analysis_results = await asyncio.to_thread(_analyze_streamed, analyzer_kwargs, bucket, key, on_progress=on_progress)
+        if analysis_results is None:
+            analysis_results = await asyncio.to_thread(_analyze_downloaded, analyzer_kwargs, bucket, key, on_progress=on_progress)
+        await asyncio.to_thread(_store_visual_results, video_id, s3_url, description, analysis_results)
+    except Exception as e:
+        logger.error(f"[ERROR] Visual analysis failed for video ID {video_id}: {str(e)}")
+        raise
@@ -0,0 +1,116 @@
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from core.logger import logger
+
+# overall_averages key -> (section, field) it averages
+AVERAGED_FIELDS = {
+    "avg_eye_contact_confidence": ("eye_contact_analysis", "eye_contact_confidence"),
+    "avg_eye_stability": ("eye_contact_analysis", "eye_stability"),
+    "avg_posture_stability": ("posture_analysis", "posture_stability"),
+    "avg_head_orientation_score": ("posture_analysis", "head_orientation_score"),
+    "avg_emotional_score": ("facial_expressions", "score"),
+    "avg_nervousness_score": ("facial_expressions", "nervousness_score"),
+    "avg_technical_quality": ("technical_quality", "average_score"),
+    "avg_brightness": ("technical_quality", "brightness"),
+    "avg_sharpness": ("technical_quality", "sharpness"),
+    "avg_occlusion": ("technical_quality", "occlusion"),
+}
+
+# Averages that are final as soon as a frame is scored. Stability needs the
+# trailing window and technical quality is replaced by the local quality timeline
+# afterwards, so those are left out of live progress.
+LIVE_AVERAGES = (
+    "avg_eye_contact_confidence",
+    "avg_head_orientation_score",
+    "avg_emotional_score",
+    "avg_nervousness_score",
+    "avg_dominant_emotion",
+)
+
+
+class RunningAverages:
+    """
+    Single-pass means and dominant-emotion tally over per-frame analyses. Sums are
+    compensated (Neumaier), so a mean sitting on a rounding boundary such as 0.795
+    rounds the same way as the exact value.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self._sums = dict.fromkeys(AVERAGED_FIELDS, 0.0)
+        self._compensation = dict.fromkeys(AVERAGED_FIELDS, 0.0)
+        self._counts = dict.fromkeys(AVERAGED_FIELDS, 0)
+        self._emotions = Counter()
+
+    def add(self, analysis: Dict) -> None:
+        """analysis maps section name -> that section's fields for one frame."""
+        self.frames += 1
+        for key, (section, field) in AVERAGED_FIELDS.items():
+            value = analysis.get(section, {}).get(field)
+            if value is None:
+                continue
+            total = self._sums[key] + value
+            if abs(self._sums[key]) >= abs(value):
+                self._compensation[key] += (self._sums[key] - total) + value
+            else:
+                self._compensation[key] += (value - total) + self._sums[key]
+            self._sums[key] = total
+            self._counts[key] += 1
+        emotion = analysis.get("facial_expressions", {}).get("type")
+        if emotion is not None:
+            self._emotions[emotion] += 1
+
+    def averages(self, keys=None) -> Dict:
+        """overall_averages-shaped dict (rounded to 2 places); keys limits it to a subset."""
+        result = {}
+        for key in AVERAGED_FIELDS:
+            total = self._sums[key] + self._compensation[key]
+            result[key] = round(total / self._counts[key], 2) if self._counts[key] else 0.0
+        result["avg_dominant_emotion"] = self._emotions.most_common(1)[0][0] if self._emotions else "NEUTRAL"
+        if keys is not None:
+            result = {k: result[k] for k in keys}
+        return result
+
+
+class ProgressTracker:
+    """
+    Counts analysed frames against an expected total and hands a progress snapshot
+    (frames done/total, ETA, live averages) to on_flush every `every` frames.
+    A failing on_flush is logged and never interrupts the analysis.
+    """
+
+    def __init__(self, total: int, on_flush: Optional[Callable[[Dict], None]] = None, every: int = 10):
+        self.total = max(0, total)
+        self.on_flush = on_flush
+        self.every = max(1, every)
+        self.averages = RunningAverages()
+        self._started = time.monotonic()
+
+    def frame_done(self, analysis: Dict) -> None:
+        self.averages.add(analysis)
+        if self.averages.frames % self.every == 0:
+            self.flush()
+
+    def snapshot(self, done: bool = False) -> Dict:
+        frames_done = self.averages.frames
+        total = max(self.total, frames_done)
+        elapsed = time.monotonic() - self._started
+        eta = 0.0 if done else (elapsed / frames_done * (total - frames_done) if frames_done else None)
+        return {
+            "frames_done": frames_done,
+            "frames_total": total,
+            "percent": round(100.0 * frames_done / total, 1) if total else (100.0 if done else 0.0),
+            "elapsed_sec": round(elapsed, 1),
+            "eta_sec": round(eta, 1) if eta is not None else None,
+            "averages": self.averages.averages(LIVE_AVERAGES),
+        }
+
+    def flush(self, done: bool = False) -> None:
+        if self.on_flush is None:
+            return
+        try:
+            self.on_flush(self.snapshot(done))
+        except Exception as e:
+            logger.warning("Could not publish visual progress: %s", str(e))
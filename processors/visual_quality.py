@@ -0,0 +1,114 @@
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+QUALITY_THUMB_WIDTH = 320
+
+
+def quality_thumbnail(frame_bgr: np.ndarray, width: int = QUALITY_THUMB_WIDTH) -> np.ndarray:
+    """The one grayscale, downscaled copy of a frame that all local metrics read from."""
+    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+    if gray.shape[1] <= width:
+        return gray
+    height = max(3, int(round(gray.shape[0] * width / gray.shape[1])))
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def frame_quality_batch(thumbs: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Raw technical-quality measures for an (n, h, w) uint8 stack of thumbnails,
+    computed for the whole batch at once:
+
+      brightness     mean gray level (0-255)
+      sharpness      variance of the 4-neighbour Laplacian
+      noise_sigma    Immerkaer's fast noise estimate, in gray levels
+      clipped_ratio  share of pixels crushed to black or blown to white
+    """
+    g = thumbs.astype(np.float32)
+    center = g[:, 1:-1, 1:-1]
+    up, down = g[:, :-2, 1:-1], g[:, 2:, 1:-1]
+    left, right = g[:, 1:-1, :-2], g[:, 1:-1, 2:]
+
+    laplacian = up + down + left + right - 4 * center
+    noise_response = (
+        g[:, :-2, :-2] + g[:, :-2, 2:] + g[:, 2:, :-2] + g[:, 2:, 2:]
+        - 2 * (up + down + left + right) + 4 * center
+    )
+    h, w = g.shape[1:]
+
+    return {
+        "brightness": g.mean(axis=(1, 2), dtype=np.float64),
+        "sharpness": laplacian.var(axis=(1, 2), dtype=np.float64),
+        "noise_sigma": np.sqrt(np.pi / 2) * np.abs(noise_response).sum(axis=(1, 2), dtype=np.float64) / (6 * (w - 2) * (h - 2)),
+        "clipped_ratio": ((thumbs <= 2) | (thumbs >= 253)).mean(axis=(1, 2)),
+    }
+
+
+def normalise_quality(raw: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Map raw measures to 0-1 scores where higher is better, calibrated for QUALITY_THUMB_WIDTH."""
+    return {
+        "brightness": np.clip((raw["brightness"] - 30) / 120, 0.0, 1.0),
+        "sharpness": np.clip(raw["sharpness"] / 300, 0.0, 1.0),
+        "noise": np.clip(1.0 - raw["noise_sigma"] / 10, 0.0, 1.0),
+        "exposure_clipping": np.clip(1.0 - raw["clipped_ratio"] * 5, 0.0, 1.0),
+    }
+
+
+class QualityTimeline:
+    """
+    Collects thumbnails as frames are decoded and scores them in vectorised
+    batches, independently of any Rekognition calls.
+    """
+
+    def __init__(self, batch_size: int = 32):
+        self.batch_size = max(1, batch_size)
+        self.times: List[float] = []
+        self._pending: List[np.ndarray] = []
+        self._raw: Dict[str, List[np.ndarray]] = {}
+        self._seen = set()
+
+    def add(self, timestamp: float, thumb: np.ndarray) -> None:
+        if timestamp in self._seen:
+            return
+        self._seen.add(timestamp)
+        self.times.append(timestamp)
+        self._pending.append(thumb)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        for key, values in frame_quality_batch(np.stack(self._pending)).items():
+            self._raw.setdefault(key, []).append(values)
+        self._pending = []
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        self.flush()
+        if not self._raw:
+            return {}
+        return {key: np.concatenate(chunks) for key, chunks in self._raw.items()}
+
+    def rows_by_time(self) -> Dict[float, Dict[str, float]]:
+        raw = self._columns()
+        if not raw:
+            return {}
+        scores = normalise_quality(raw)
+        return {
+            t: {**{k: float(v[i]) for k, v in scores.items()}, **{f"raw_{k}": float(v[i]) for k, v in raw.items()}}
+            for i, t in enumerate(self.times)
+        }
+
+    def to_dict(self, fps: float) -> Dict:
+        """Columnar timeline for visual_insights: shared times plus one list per metric."""
+        raw = self._columns()
+        if not raw:
+            return {"fps": fps, "time": [], "summary": {}}
+        scores = normalise_quality(raw)
+        order = np.argsort(self.times, kind="stable")  # adaptive refinement adds samples out of order
+        timeline = {"fps": fps, "time": [round(self.times[i], 3) for i in order]}
+        timeline.update({k: np.round(v[order], 3).tolist() for k, v in scores.items()})
+        timeline.update({f"raw_{k}": np.round(v[order], 3).tolist() for k, v in raw.items()})
+        timeline["summary"] = {f"avg_{k}": round(float(v.mean()), 2) for k, v in scores.items()}
+        return timeline
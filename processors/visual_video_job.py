@@ -0,0 +1,164 @@
+import time
+import uuid
+
+import numpy as np
+
+from core.job_queue import JobPending
+from core.logger import logger
+from core.rate_limiter import outbound_limiter
+from processors.visual_archive import archive_record
+from processors.visual_processor import VisualAnalyzer
+from settings import settings
+
+
+class RekognitionVideoAnalyzer(VisualAnalyzer):
+    """
+    Visual backend that runs an asynchronous Rekognition Video face-detection job
+    directly on the S3 object instead of downloading and sampling it locally, so
+    worker disk and bandwidth stay flat whatever the video size.
+
+    Job results are matched to the same sample times process_video would use and
+    fed through the same scoring, stability windows and averages. Two inputs
+    differ from the frame backend: Rekognition Video reports no EyeDirection,
+    so gaze falls back to head pose, and brightness/sharpness come from each
+    face's Rekognition Quality because no pixels are available (recorded as
+    technical_quality.source "rekognition_face").
+    """
+
+    def __init__(self, poll_interval=None, timeout=None, wait_slice=None, match_tolerance_sec=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.poll_interval = settings.REKOGNITION_VIDEO_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.timeout = timeout or settings.REKOGNITION_VIDEO_TIMEOUT
+        # Longest one worker thread polls before handing the wait back to the job queue
+        # (JobPending); never longer than a job lease. 0 polls until timeout in one go.
+        wait_slice = settings.REKOGNITION_VIDEO_WAIT_SLICE if wait_slice is None else wait_slice
+        self.wait_slice = min(wait_slice, settings.JOB_VISIBILITY_TIMEOUT) if wait_slice > 0 else 0
+        self.match_tolerance_sec = match_tolerance_sec
+        self._calls = 0
+
+    def _call(self, fn):
+        self._calls += 1
+        return outbound_limiter.call("rekognition", fn, key=settings.AWS_ACCESS_KEY)
+
+    # ---------- JOB ----------
+    def start_job(self, bucket, key):
+        # One token for every retry of this start, so a call that succeeded but timed
+        # out on our side returns the same job instead of starting a second billed one
+        token = uuid.uuid4().hex
+        response = self._call(lambda: self.rekognition.start_face_detection(
+            Video={"S3Object": {"Bucket": bucket, "Name": key}},
+            FaceAttributes="ALL",
+            ClientRequestToken=token,
+        ))
+        logger.info("Started Rekognition face detection job %s for s3://%s/%s", response["JobId"], bucket, key)
+        return response["JobId"]
+
+    def wait_for_job(self, job_id, started_at=None):
+        """
+        Poll until the job leaves IN_PROGRESS; returns the first result page. started_at
+        (epoch seconds) is when the job was started, so timeout covers every resumed wait.
+        After wait_slice seconds of polling, raises JobPending carrying the job so the
+        queue re-runs the analysis later and it resumes here.
+        """
+        started_at = time.time() if started_at is None else started_at
+        slice_end = time.monotonic() + self.wait_slice if self.wait_slice else None
+        while True:
+            page = self._call(lambda: self.rekognition.get_face_detection(JobId=job_id, MaxResults=1000))
+            status = page.get("JobStatus")
+            if status == "SUCCEEDED":
+                return page
+            if status == "FAILED":
+                raise RuntimeError(f"Rekognition face detection job {job_id} failed: {page.get('StatusMessage')}")
+            if time.time() - started_at > self.timeout:
+                raise TimeoutError(f"Rekognition face detection job {job_id} did not finish in {self.timeout}s")
+            if slice_end is not None and time.monotonic() + self.poll_interval > slice_end:
+                raise JobPending(self.poll_interval, {"video_job": {"job_id": job_id, "started_at": started_at, "calls": self._calls}})
+            time.sleep(self.poll_interval)
+
+    def collect_faces(self, job_id, first_page):
+        """Page through NextToken; returns (faces, video_metadata, pages)."""
+        faces, page, pages = list(first_page.get("Faces", [])), first_page, 1
+        while page.get("NextToken"):
+            token = page["NextToken"]
+            page = self._call(lambda: self.rekognition.get_face_detection(JobId=job_id, MaxResults=1000, NextToken=token))
+            faces.extend(page.get("Faces", []))
+            pages += 1
+        return faces, first_page.get("VideoMetadata", {}), pages
+
+    # ---------- MAPPING ----------
+    def _responses_at(self, faces, sample_times):
+        """
+        DetectFaces-shaped responses for each sample time, built from the job's faces
+        at the nearest reported timestamp within match_tolerance_sec (largest face first).
+        """
+        by_timestamp = {}
+        for item in faces:
+            face = dict(item["Face"])
+            if "EyeDirection" not in face:
+                pose = face.get("Pose", {})
+                face["EyeDirection"] = {"Yaw": pose.get("Yaw", 0.0), "Pitch": pose.get("Pitch", 0.0)}
+            by_timestamp.setdefault(item["Timestamp"], []).append(face)
+
+        if not by_timestamp:
+            return [{"FaceDetails": []} for _ in sample_times]
+
+        keys = sorted(by_timestamp)
+        timestamps = np.array(keys, dtype=float) / 1000.0
+        responses = []
+        for t in sample_times:
+            i = int(np.searchsorted(timestamps, t))
+            candidates = [j for j in (i - 1, i) if 0 <= j < len(timestamps)]
+            nearest = min(candidates, key=lambda j: abs(timestamps[j] - t))
+            if abs(timestamps[nearest] - t) > self.match_tolerance_sec:
+                responses.append({"FaceDetails": []})
+                continue
+            responses.append({"FaceDetails": sorted(by_timestamp[keys[nearest]], key=_face_area, reverse=True)})
+        return responses
+
+    def process_s3_video(self, bucket, key, video_job=None):
+        """
+        video_job ({"job_id", "started_at", "calls"}) resumes waiting on a job a previous
+        run started; its calls carry over so rekognition_calls counts the whole job.
+        """
+        if video_job is None:
+            video_job = {"job_id": self.start_job(bucket, key), "started_at": time.time()}
+        else:
+            self._calls = video_job.get("calls", 0)
+        job_id = video_job["job_id"]
+        first_page = self.wait_for_job(job_id, video_job["started_at"])
+        job_wait = time.time() - video_job["started_at"]
+        faces, metadata, pages = self.collect_faces(job_id, first_page)
+
+        fps = metadata.get("FrameRate") or 30.0
+        total_frames = int(metadata.get("DurationMillis", 0) / 1000.0 * fps)
+        sample_times = [frame_id / fps for frame_id in self._target_frames(total_frames, fps)]
+
+        frames, raw_responses = [], []
+        for t, response in zip(sample_times, self._responses_at(faces, sample_times)):
+            analysis = self._score_frame(None, response, quality_source="rekognition_face")
+            if analysis is None:
+                frames.append((t, self._get_default_response(expression="no_face"), False))
+            else:
+                frames.append((t, analysis, True))
+            raw_responses.append({**archive_record(t, response, None), "quality": None, "quality_source": "rekognition_face"})
+
+        logger.info("Rekognition video job %s mapped to %d samples", job_id, len(frames))
+        results = self._build_results(frames)
+        if self.archive_responses:
+            results["raw_responses"] = raw_responses
+        results["processing_stats"] = {
+            "backend": "rekognition_video",
+            "job_id": job_id,
+            "job_wait_sec": round(job_wait, 1),
+            "rekognition_calls": self._calls,
+            "result_pages": pages,
+            "faces_returned": len(faces),
+            "video_duration_sec": round(metadata.get("DurationMillis", 0) / 1000.0, 2),
+            "samples_without_face": sum(1 for _, _, has_face in frames if not has_face),
+        }
+        return results
+
+
+def _face_area(face):
+    box = face.get("BoundingBox", {})
+    return box.get("Width", 0.0) * box.get("Height", 0.0)
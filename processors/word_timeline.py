@@ -0,0 +1,47 @@
+from bson.binary import Binary
+from typing import Dict, Any, List
+import numpy as np
+
+WORD_TIMELINE_VERSION = 1
+
+
+def encode_word_timeline(words: List[Dict[str, Any]], audio_duration: float = 0.0) -> Dict[str, Any]:
+    """
+    Columnar encoding of the AssemblyAI word list for storage in Mongo.
+
+    start/end are little-endian int32 milliseconds, confidence is float32, and
+    word texts are stored once in a string table referenced by uint16/int32 ids.
+    """
+    strings: Dict[str, int] = {}
+    word_ids = [strings.setdefault(w.get("text", ""), len(strings)) for w in words]
+    id_dtype = "<u2" if len(strings) <= 0xFFFF else "<i4"
+
+    return {
+        "version": WORD_TIMELINE_VERSION,
+        "count": len(words),
+        "audio_duration": float(audio_duration or 0.0),
+        "start_ms": Binary(np.array([w.get("start", 0) for w in words], dtype="<i4").tobytes()),
+        "end_ms": Binary(np.array([w.get("end", 0) for w in words], dtype="<i4").tobytes()),
+        "confidence": Binary(np.array([w.get("confidence", 0.0) for w in words], dtype="<f4").tobytes()),
+        "word_ids": Binary(np.array(word_ids, dtype=id_dtype).tobytes()),
+        "word_id_dtype": id_dtype,
+        "strings": list(strings),
+    }
+
+
+def decode_word_timeline(timeline: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a transcript-shaped dict ({"words", "audio_duration"}) from the columnar form."""
+    if timeline.get("version") != WORD_TIMELINE_VERSION:
+        raise ValueError(f"Unsupported word timeline version: {timeline.get('version')}")
+
+    starts = np.frombuffer(timeline["start_ms"], dtype="<i4").tolist()
+    ends = np.frombuffer(timeline["end_ms"], dtype="<i4").tolist()
+    confidences = np.frombuffer(timeline["confidence"], dtype="<f4").astype(float).round(4).tolist()
+    word_ids = np.frombuffer(timeline["word_ids"], dtype=timeline["word_id_dtype"]).tolist()
+    strings = timeline["strings"]
+
+    words = [
+        {"text": strings[i], "start": s, "end": e, "confidence": c}
+        for i, s, e, c in zip(word_ids, starts, ends, confidences)
+    ]
+    return {"words": words, "audio_duration": timeline.get("audio_duration", 0.0)}
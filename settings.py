@@ -17,10 +17,146 @@ class Settings:
 
         # Optional with defaults
         self.ASSEMBLYAI_API_URL = os.getenv("ASSEMBLYAI_API_URL", "https://api.assemblyai.com/v2").strip()
+        self.ASSEMBLYAI_POLL_INTERVAL = float(os.getenv("ASSEMBLYAI_POLL_INTERVAL", "5"))
+        self.OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1").strip()
         self.AWS_REGION = os.getenv("AWS_REGION", "ap-south-1").strip()
         self.AUTH_SECRET = os.getenv("AUTH_SECRET", "him").strip()
         self.GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID","HIM").strip()
 
+        # Upper bound on transcript tokens embedded in the GPT prompt
+        self.TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "3000"))
+        # Collapse immediately repeated words/phrases in the prompt (also rewrites "had had")
+        self.TRANSCRIPT_COLLAPSE_REPEATS = os.getenv("TRANSCRIPT_COLLAPSE_REPEATS", "false").strip().lower() in ("1", "true", "yes")
+
+        # Offline LLM batch mode for low-priority text analysis
+        self.TEXT_BATCH_MAX_REQUESTS = int(os.getenv("TEXT_BATCH_MAX_REQUESTS", "500"))
+        self.TEXT_BATCH_POLL_INTERVAL = float(os.getenv("TEXT_BATCH_POLL_INTERVAL", "60"))
+
+        # Outbound API limits (token bucket rate + max in-flight, per provider and API key)
+        self.OPENAI_MAX_RPS = float(os.getenv("OPENAI_MAX_RPS", "8"))
+        self.OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+        self.ASSEMBLYAI_MAX_RPS = float(os.getenv("ASSEMBLYAI_MAX_RPS", "5"))
+        self.ASSEMBLYAI_MAX_CONCURRENCY = int(os.getenv("ASSEMBLYAI_MAX_CONCURRENCY", "16"))
+        self.REKOGNITION_MAX_RPS = float(os.getenv("REKOGNITION_MAX_RPS", "20"))
+        self.REKOGNITION_MAX_CONCURRENCY = int(os.getenv("REKOGNITION_MAX_CONCURRENCY", "16"))
+        self.OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "4"))
+
+        # Visual pipeline: concurrent detect_faces requests per worker
+        self.REKOGNITION_MAX_IN_FLIGHT = int(os.getenv("REKOGNITION_MAX_IN_FLIGHT", "8"))
+
+        # Visual pipeline: detect_faces payload encoding (never upscales the source frame)
+        self.REKOGNITION_JPEG_MAX_BYTES = int(os.getenv("REKOGNITION_JPEG_MAX_BYTES", "200000"))
+        self.REKOGNITION_JPEG_QUALITY = int(os.getenv("REKOGNITION_JPEG_QUALITY", "90"))
+        self.REKOGNITION_JPEG_MIN_QUALITY = int(os.getenv("REKOGNITION_JPEG_MIN_QUALITY", "60"))
+        self.REKOGNITION_MAX_LONG_SIDE = int(os.getenv("REKOGNITION_MAX_LONG_SIDE", "1920"))
+        self.REKOGNITION_MIN_LONG_SIDE = int(os.getenv("REKOGNITION_MIN_LONG_SIDE", "640"))
+        self.REKOGNITION_TARGET_FACE_PX = int(os.getenv("REKOGNITION_TARGET_FACE_PX", "200"))
+
+        # Visual pipeline: optional local Haar-cascade check that skips detect_faces on empty frames
+        self.VISUAL_FACE_PREFILTER = os.getenv("VISUAL_FACE_PREFILTER", "false").strip().lower() in ("1", "true", "yes")
+        self.VISUAL_CASCADE_DIR = os.getenv("VISUAL_CASCADE_DIR", "")  # empty = OpenCV's bundled cv2.data.haarcascades
+
+        # Visual pipeline: reuse the last Rekognition response for near-identical samples (0 disables).
+        # Off by default; reused frames are marked with reused_from in the stored results. 2.0 is a sensible start.
+        self.VISUAL_DUPLICATE_THRESHOLD = float(os.getenv("VISUAL_DUPLICATE_THRESHOLD", "0"))
+        self.VISUAL_DUPLICATE_MAX_RUN = int(os.getenv("VISUAL_DUPLICATE_MAX_RUN", "10"))  # force a fresh call after this many reuses
+
+        # Visual pipeline: local brightness/sharpness/noise/clipping timeline (0 = Rekognition frames only)
+        self.VISUAL_QUALITY_FPS = float(os.getenv("VISUAL_QUALITY_FPS", "5"))
+        self.VISUAL_QUALITY_BATCH = int(os.getenv("VISUAL_QUALITY_BATCH", "32"))
+
+        # Visual pipeline: frame selection ("sequential" = 1 call per second, "adaptive" = budgeted
+        # coarse pass refined where pose/gaze/expression change)
+        self.VISUAL_FRAME_SELECTION_MODE = os.getenv("VISUAL_FRAME_SELECTION_MODE", "sequential").strip().lower()
+        self.VISUAL_CALLS_PER_MINUTE = float(os.getenv("VISUAL_CALLS_PER_MINUTE", "30"))
+        self.VISUAL_ADAPTIVE_MIN_CHANGE = float(os.getenv("VISUAL_ADAPTIVE_MIN_CHANGE", "0.15"))
+
+        # Visual pipeline input: "stream" reads frames from a presigned URL with ranged GETs
+        # (no temp file; falls back to downloading if it cannot be opened), "download" fetches it first
+        self.VISUAL_INPUT_MODE = os.getenv("VISUAL_INPUT_MODE", "stream").strip().lower()
+        self.VISUAL_PRESIGNED_URL_TTL = int(os.getenv("VISUAL_PRESIGNED_URL_TTL", "3600"))
+
+        # Store visual_insights in the columnar, tip-table-coded layout (processors/visual_encoding.py);
+        # the results API reads both layouts
+        self.VISUAL_COMPACT_STORAGE = os.getenv("VISUAL_COMPACT_STORAGE", "true").strip().lower() in ("1", "true", "yes")
+
+        # Visual pipeline: write live progress (frames done, ETA, running averages) to the video doc every N frames
+        self.VISUAL_PROGRESS_EVERY = int(os.getenv("VISUAL_PROGRESS_EVERY", "10"))
+
+        # Visual pipeline: archive raw per-frame FaceDetails (zlib, chunked per video) for offline re-scoring
+        self.VISUAL_ARCHIVE_RESPONSES = os.getenv("VISUAL_ARCHIVE_RESPONSES", "true").strip().lower() in ("1", "true", "yes")
+        self.VISUAL_ARCHIVE_CHUNK_FRAMES = int(os.getenv("VISUAL_ARCHIVE_CHUNK_FRAMES", "600"))
+
+        # Visual pipeline: decode worker processes (1 = decode in the request process) and segment length
+        self.VISUAL_DECODE_WORKERS = int(os.getenv("VISUAL_DECODE_WORKERS", "1"))
+        self.VISUAL_DECODE_SEGMENT_SEC = float(os.getenv("VISUAL_DECODE_SEGMENT_SEC", "20"))
+        # Cap on decoded frames (estimated MB) waiting in or coming back from decode workers
+        self.VISUAL_DECODE_MAX_INFLIGHT_MB = float(os.getenv("VISUAL_DECODE_MAX_INFLIGHT_MB", "256"))
+
+        # Job queue (core/job_queue.py): lease length without a heartbeat, retries and their backoff
+        self.JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+        self.JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "30"))
+        self.JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "1800"))
+        self.JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+        # Run a consumer inside the API process (disable once dedicated workers are deployed)
+        self.JOB_EMBEDDED_CONSUMER = os.getenv("JOB_EMBEDDED_CONSUMER", "true").strip().lower() in ("1", "true", "yes")
+        self.JOB_EMBEDDED_CONCURRENCY = int(os.getenv("JOB_EMBEDDED_CONCURRENCY", "2"))
+        # Job scheduling across orgs: weighted fair queuing by org, with each org's licence tier
+        # (organisations.license_tier) setting its weight, a priority boost and a default cap on
+        # concurrently running jobs (0 = uncapped; organisations.max_concurrent_jobs overrides it)
+        self.JOB_FAIR_QUEUING = os.getenv("JOB_FAIR_QUEUING", "true").strip().lower() in ("1", "true", "yes")
+        self.JOB_TIER_STANDARD_WEIGHT = float(os.getenv("JOB_TIER_STANDARD_WEIGHT", "1"))
+        self.JOB_TIER_STANDARD_PRIORITY = int(os.getenv("JOB_TIER_STANDARD_PRIORITY", "0"))
+        self.JOB_TIER_STANDARD_MAX_CONCURRENT = int(os.getenv("JOB_TIER_STANDARD_MAX_CONCURRENT", "0"))
+        self.JOB_TIER_PREMIUM_WEIGHT = float(os.getenv("JOB_TIER_PREMIUM_WEIGHT", "2"))
+        self.JOB_TIER_PREMIUM_PRIORITY = int(os.getenv("JOB_TIER_PREMIUM_PRIORITY", "0"))
+        self.JOB_TIER_PREMIUM_MAX_CONCURRENT = int(os.getenv("JOB_TIER_PREMIUM_MAX_CONCURRENT", "0"))
+        self.JOB_TIER_ENTERPRISE_WEIGHT = float(os.getenv("JOB_TIER_ENTERPRISE_WEIGHT", "4"))
+        self.JOB_TIER_ENTERPRISE_PRIORITY = int(os.getenv("JOB_TIER_ENTERPRISE_PRIORITY", "1"))
+        self.JOB_TIER_ENTERPRISE_MAX_CONCURRENT = int(os.getenv("JOB_TIER_ENTERPRISE_MAX_CONCURRENT", "0"))
+        self.JOB_ORG_POLICY_TTL = float(os.getenv("JOB_ORG_POLICY_TTL", "60"))  # seconds an org's tier is cached
+        # Seconds a worker reuses its per-org running-job counts when skipping orgs at their cap
+        self.JOB_CAPPED_ORGS_TTL = float(os.getenv("JOB_CAPPED_ORGS_TTL", "2"))
+
+        # Admission control for /process/* (core/admission.py): 429 with Retry-After when a request's jobs would take
+        # a modality's backlog past its limit, or when its workers are saturated and the backlog would take longer
+        # than ADMISSION_MAX_WAIT_SEC to drain at the throughput observed over the window (estimated from
+        # live capacity and ADMISSION_<KIND>_EXPECTED_JOB_SEC while nothing has completed; 0 = no estimate)
+        self.ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").strip().lower() in ("1", "true", "yes")
+        self.ADMISSION_AUDIO_MAX_QUEUED = int(os.getenv("ADMISSION_AUDIO_MAX_QUEUED", "200"))
+        self.ADMISSION_TEXT_MAX_QUEUED = int(os.getenv("ADMISSION_TEXT_MAX_QUEUED", "1000"))
+        self.ADMISSION_IMAGE_MAX_QUEUED = int(os.getenv("ADMISSION_IMAGE_MAX_QUEUED", "300"))
+        self.ADMISSION_AUDIO_EXPECTED_JOB_SEC = float(os.getenv("ADMISSION_AUDIO_EXPECTED_JOB_SEC", "120"))
+        self.ADMISSION_TEXT_EXPECTED_JOB_SEC = float(os.getenv("ADMISSION_TEXT_EXPECTED_JOB_SEC", "60"))
+        self.ADMISSION_IMAGE_EXPECTED_JOB_SEC = float(os.getenv("ADMISSION_IMAGE_EXPECTED_JOB_SEC", "300"))
+        self.ADMISSION_SATURATION = float(os.getenv("ADMISSION_SATURATION", "0.9"))  # running / live worker capacity
+        self.ADMISSION_MAX_WAIT_SEC = float(os.getenv("ADMISSION_MAX_WAIT_SEC", "1800"))
+        self.ADMISSION_THROUGHPUT_WINDOW_SEC = float(os.getenv("ADMISSION_THROUGHPUT_WINDOW_SEC", "900"))
+        self.ADMISSION_MIN_RETRY_AFTER = int(os.getenv("ADMISSION_MIN_RETRY_AFTER", "5"))
+        self.ADMISSION_MAX_RETRY_AFTER = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "900"))
+        self.ADMISSION_CACHE_SEC = float(os.getenv("ADMISSION_CACHE_SEC", "2"))  # how long one load snapshot is reused
+
+        # Most videos accepted by one POST /api/videos/process/batch
+        self.PROCESS_BATCH_MAX_VIDEOS = int(os.getenv("PROCESS_BATCH_MAX_VIDEOS", "500"))
+
+        # Standalone worker (python -m worker): concurrent jobs per modality. Audio runs in a
+        # process pool, text on the worker's event loop, image in a thread pool
+        self.WORKER_AUDIO_CONCURRENCY = int(os.getenv("WORKER_AUDIO_CONCURRENCY", "2"))
+        self.WORKER_TEXT_CONCURRENCY = int(os.getenv("WORKER_TEXT_CONCURRENCY", "16"))
+        self.WORKER_IMAGE_CONCURRENCY = int(os.getenv("WORKER_IMAGE_CONCURRENCY", "4"))
+        self.WORKER_SHUTDOWN_GRACE = float(os.getenv("WORKER_SHUTDOWN_GRACE", "120"))  # seconds to finish running jobs
+
+        # Visual pipeline backend: "frames" (download + sample locally), "video_job" (Rekognition
+        # Video on the S3 object) or "auto" (video_job for objects of at least VISUAL_VIDEO_JOB_MIN_MB)
+        self.VISUAL_BACKEND = os.getenv("VISUAL_BACKEND", "frames").strip().lower()
+        self.VISUAL_VIDEO_JOB_MIN_MB = float(os.getenv("VISUAL_VIDEO_JOB_MIN_MB", "200"))
+        self.REKOGNITION_VIDEO_POLL_INTERVAL = float(os.getenv("REKOGNITION_VIDEO_POLL_INTERVAL", "10"))
+        self.REKOGNITION_VIDEO_TIMEOUT = int(os.getenv("REKOGNITION_VIDEO_TIMEOUT", "3600"))
+        # Seconds a worker polls a Rekognition Video job before requeueing the wait (capped at JOB_VISIBILITY_TIMEOUT)
+        self.REKOGNITION_VIDEO_WAIT_SLICE = float(os.getenv("REKOGNITION_VIDEO_WAIT_SLICE", "120"))
+
     def _get_env(self, key: str) -> str:
         """Fetch environment variable, strip whitespace, and fail fast if missing."""
         value = os.getenv(key)
@@ -0,0 +1,159 @@
+"""
+Standalone job worker: pulls audio, text and image jobs from the jobs queue,
+independently of the API process, so workers scale without API replicas.
+
+Each modality has its own consumer, concurrency limit and executor:
+
+  audio  process pool      CPU-bound (VAD, pitch/energy analysis)
+  text   the event loop    I/O-bound (AssemblyAI polling, OpenAI); one loop holds many jobs
+  image  thread pool       Rekognition-bound
+
+    python -m worker
+    python -m worker --kinds audio --audio-concurrency 4
+    python -m worker --kinds text image --text-concurrency 50
+
+Set JOB_EMBEDDED_CONSUMER=false on the API once workers are deployed. On
+SIGTERM/SIGINT a worker stops claiming and waits up to WORKER_SHUTDOWN_GRACE
+seconds for running jobs; anything still running is retried elsewhere once
+its lease expires.
+"""
+import argparse
+import asyncio
+import inspect
+import signal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable
+
+from core.job_queue import JobConsumer, default_worker_id, run_handler
+from core.logger import logger
+from settings import settings
+
+KINDS = ("audio", "text", "image")
+
+
+class ProcessRunner:
+    """Runs jobs in a spawned process pool. If a worker process dies, its jobs fail and the pool is rebuilt."""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+
+    async def __call__(self, handler: Callable, payload: Dict) -> Any:
+        pool = self._pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, run_handler, handler, payload)
+        except BrokenProcessPool:
+            if pool is self._pool:
+                logger.error("Audio worker process died; restarting the process pool")
+                self._pool = self._new_pool()
+                pool.shutdown(wait=False)
+            raise
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ThreadRunner:
+    def __init__(self, workers: int, name: str):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"{name}-job")
+
+    async def __call__(self, handler: Callable, payload: Dict) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, run_handler, handler, payload)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LoopRunner:
+    """Awaits coroutine handlers on the worker's own event loop."""
+
+    async def __call__(self, handler: Callable, payload: Dict) -> Any:
+        result = handler(**payload)
+        if inspect.isawaitable(result):
+            return await result
+        return result
+
+    def close(self):
+        pass
+
+
+def build_runner(kind: str, concurrency: int):
+    if kind == "audio":
+        return ProcessRunner(concurrency)
+    if kind == "text":
+        return LoopRunner()
+    return ThreadRunner(concurrency, kind)
+
+
+def default_concurrency() -> Dict[str, int]:
+    return {
+        "audio": settings.WORKER_AUDIO_CONCURRENCY,
+        "text": settings.WORKER_TEXT_CONCURRENCY,
+        "image": settings.WORKER_IMAGE_CONCURRENCY,
+    }
+
+
+async def run_worker(kinds: Iterable[str] = KINDS, concurrency: Dict[str, int] = None, queue=None,
+                     handlers: Dict[str, Callable] = None, stop: asyncio.Event = None) -> None:
+    if queue is None or handlers is None:
+        from processors.jobs import JOB_HANDLERS, processing_queue
+        queue = queue or processing_queue()
+        handlers = handlers or JOB_HANDLERS
+    concurrency = {**default_concurrency(), **(concurrency or {})}
+    queue.ensure_indexes()
+
+    worker_id = default_worker_id()
+    runners, consumers = [], []
+    for kind in kinds:
+        runner = build_runner(kind, concurrency[kind])
+        runners.append(runner)
+        consumers.append(JobConsumer(queue, handlers, kinds=[kind], concurrency=concurrency[kind],
+                                     worker_id=worker_id, runner=runner))
+    logger.info("Worker %s running %s", worker_id, {kind: concurrency[kind] for kind in kinds})
+
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+    tasks = [asyncio.create_task(consumer.run()) for consumer in consumers]
+    await stop.wait()
+
+    logger.info("Worker %s stopping; waiting up to %.0fs for running jobs", worker_id, settings.WORKER_SHUTDOWN_GRACE)
+    for consumer in consumers:
+        consumer.stop()
+
+    async def _finish():
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(consumer.drain() for consumer in consumers))
+
+    try:
+        await asyncio.wait_for(_finish(), settings.WORKER_SHUTDOWN_GRACE)
+    except asyncio.TimeoutError:
+        logger.warning("Worker %s left %d jobs running; they are retried once their leases expire",
+                       worker_id, sum(consumer.running for consumer in consumers))
+    finally:
+        for runner in runners:
+            runner.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run audio/text/image processing jobs from the job queue")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--audio-concurrency", type=int, default=None)
+    parser.add_argument("--text-concurrency", type=int, default=None)
+    parser.add_argument("--image-concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    overrides = {
+        kind: value for kind, value in (
+            ("audio", args.audio_concurrency), ("text", args.text_concurrency), ("image", args.image_concurrency)
+        ) if value is not None
+    }
+    asyncio.run(run_worker(args.kinds, overrides))